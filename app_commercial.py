@@ -1,26 +1,160 @@
 import streamlit as st
 import uuid
 import pandas as pd
+import numpy as np
 import plotly.express as px
-import plotly.graph_objects as go
 import re
+import json
+import zipfile
 from io import BytesIO
 from datetime import datetime
-from tunnel_master_logic import TunnelType, TunnelSafetySystem, TunnelSection, TunnelSpan, DataManager, ProjectMetadata, InspectionData
+from tunnel_master_logic import TunnelType, TunnelSafetySystem, TunnelSection, TunnelSpan, DataManager, ProjectMetadata, InspectionData, RevisionCache, ChainageIndex, BatchEvaluator, GradingCriteria
+from tunnel_charts import draw_screen_heatmap, draw_report_heatmap, GRADE_COLORS
+from tunnel_photos import PhotoStore
+from tunnel_export import build_excel_bytes
+from tunnel_table import SpanResultTable
+from tunnel_history import CampaignHistory
+from tunnel_import import SpanImport
+from tunnel_report import ReportBuilder, build_reports
+from tunnel_portfolio import PortfolioIndex
+from tunnel_uncertainty import UncertaintyEngine, Tolerance, default_workers
+from tunnel_undo import EditHistory, HistoryStep
+from collections import deque
+import tunnel_profile as prof
 
 # ---------------------------------------------------------
 # 1. 설정 및 스타일
 # ---------------------------------------------------------
 st.set_page_config(page_title="SM-PED Tunnel Tablet", layout="wide")
 
+# rerun 단위 성능 기록 (단계별 시간 + 핵심 함수 호출). 최근 기록은 세션에, 전체는 회전 JSONL 로그에 남김
+if 'profile_runs' not in st.session_state:
+    st.session_state['profile_runs'] = deque(maxlen=30)
+    st.session_state['profile_sid'] = uuid.uuid4().hex[:8]
+interrupted = prof.begin_run(session=st.session_state['profile_sid'])
+if interrupted: st.session_state['profile_runs'].append(interrupted)
+prof.mark("init")
+
+if 'recovered' not in st.session_state:
+    # 비정상 종료로 남은 변경 저널을 저장소에 반영
+    st.session_state['recovered'] = DataManager.recover()
 if 'projects' not in st.session_state:
-    st.session_state['projects'] = DataManager.load_all_projects()
+    # 열어 본 프로젝트만 보관. 목록 화면은 DataManager.load_index() 의 헤더 정보만 사용
+    st.session_state['projects'] = {}
 if 'active_project_id' not in st.session_state:
     st.session_state['active_project_id'] = None
+if 'system' not in st.session_state:
+    # 스판별 판정 캐시/증분 합계를 rerun 간에 유지하기 위해 세션에 보관
+    st.session_state['system'] = TunnelSafetySystem()
+if 'view_cache' not in st.session_state:
+    # 요약/히트맵/보고서 표를 프로젝트 revision 기준으로 재사용 (데이터 변경이 없는 rerun 은 재계산 생략)
+    st.session_state['view_cache'] = RevisionCache(maxsize=32)
+if 'chainage' not in st.session_state:
+    # 프로젝트별 누적 거리 색인. 길이/등급 변경은 색인에 직접 반영하고 구조가 바뀔 때만 다시 생성
+    st.session_state['chainage'] = {}
+if 'edits' not in st.session_state:
+    # 프로젝트별 편집 이력 (되돌리기/다시 실행, 스판·구간 복원). 스냅샷끼리 바뀌지 않은 부분을 공유
+    st.session_state['edits'] = {}
+
+EXCEL_AUTO_SPANS = 2000 # 이 이하의 스판 수는 보고서 탭을 열 때 엑셀을 바로 생성
+PAGE_SIZES = [20, 50, 100, 200]
 
 def reset_indices():
     st.session_state['sel_sec_idx'] = 0
     st.session_state['sel_span_idx'] = 0
+    st.session_state['nav_sec'] = 0
+    st.session_state['nav_span'] = 1
+
+def go_to_span(nav: ChainageIndex, i):
+    # 내비게이션 버튼 콜백: 위젯이 그려지기 전에 선택 상태를 옮김
+    if i is None:
+        st.toast("이동할 스판이 없습니다.")
+        return
+    k, j = nav.position(i)
+    st.session_state['nav_sec'], st.session_state['nav_span'] = k, j + 1
+    st.session_state['sel_sec_idx'], st.session_state['sel_span_idx'] = k, j
+
+def notify_conflicts(conflicts):
+    # 다른 태블릿과 겹쳐 반영되지 못한 변경은 rerun 후에도 보이도록 세션에 보관
+    if conflicts: st.session_state.setdefault('conflicts', []).extend(conflicts)
+
+def save_project(proj: ProjectMetadata):
+    rev = proj.revision
+    notify_conflicts(DataManager.save_project(proj))
+    # 저장 중 다른 태블릿의 변경을 병합했으면 (revision 변경) 스판 객체가 바뀌었으므로 거리 색인/편집 이력을 새로 시작
+    if proj.revision != rev:
+        st.session_state['chainage'].pop(proj.id, None)
+        st.session_state['edits'].pop(proj.id, None)
+    else:
+        edit_history(proj).mark_saved()
+
+def edit_history(proj: ProjectMetadata) -> EditHistory:
+    # 프로젝트 객체가 바뀌었으면(다시 불러옴) 새 이력
+    h = st.session_state['edits'].get(proj.id)
+    if h is None or h.project is not proj: h = st.session_state['edits'][proj.id] = EditHistory(proj)
+    return h
+
+def apply_step(proj: ProjectMetadata, step: HistoryStep, autosave: bool):
+    # 되돌리기/다시 실행/복원 결과를 화면과 저장소에 반영 (스판만 바뀌었으면 자동 저장 저널, 구간 구성이 바뀌었으면 저장)
+    if step is None:
+        st.toast("되돌릴 내용이 없습니다.")
+        return
+    st.session_state['chainage'].pop(proj.id, None)
+    for sec, span in step.spans: forget_span_widgets(sec, span)
+    if step.opinion: st.session_state.pop(f"op_{proj.id}", None)
+    if step.structure:
+        reset_indices()
+        save_project(proj)
+    elif autosave:
+        for sec, span in step.spans: DataManager.record_span_change(proj, sec, span)
+        if step.opinion: DataManager.record_project_change(proj)
+        DataManager.compact_journal()
+    st.toast(f"{step.label} ({len(step.spans):,}개 스판)" if step.spans else step.label)
+
+def sync_project(proj: ProjectMetadata):
+    # 다른 태블릿/저널 압축이 저장한 변경을 가져옴 (버전이 같으면 인덱스만 확인하고 끝)
+    before, opinion = viewing_span(proj)[1], proj.opinion
+    changed, conflicts = DataManager.sync(proj)
+    notify_conflicts(conflicts)
+    if not changed: return # 이 세션의 자동 저장만 압축된 경우도 여기서 끝 (사본/편집 이력 유지)
+    st.session_state['chainage'].pop(proj.id, None)
+    st.session_state['edits'].pop(proj.id, None) # 다른 태블릿 변경까지 되돌리지 않도록 이력을 새로 시작
+    # 보고 있던 스판/소견이 다른 태블릿 값으로 바뀌었으면 입력 위젯을 새 값으로 다시 채움
+    sec, after = viewing_span(proj)
+    if after is not None and after is not before: forget_span_widgets(sec, after)
+    if proj.opinion != opinion: st.session_state.pop(f"op_{proj.id}", None)
+
+def viewing_span(proj: ProjectMetadata) -> tuple:
+    # 화면에 보이는 (구간, 스판). 선택이 범위를 벗어났으면 (None, None)
+    try:
+        sec = proj.sections[st.session_state.get('nav_sec', 0)]
+        return sec, sec.spans[st.session_state.get('nav_span', 1) - 1]
+    except IndexError:
+        return None, None
+
+def forget_span_widgets(sec: TunnelSection, span: TunnelSpan):
+    # 입력 위젯 상태를 지워 다음 rerun 에 스판의 현재 값으로 다시 채움
+    suffix = f"_{sec.id}_{span.span_no}"
+    for k in [k for k in st.session_state if isinstance(k, str) and k.endswith(suffix)]: del st.session_state[k]
+
+def draw_diagnostics():
+    # 사이드바 진단 패널: 직전 rerun 의 단계별/함수별 시간 ("태블릿이 느리다" 신고 시 확인용)
+    if not st.toggle("🩺 성능 진단", key="diag"): return
+    runs = st.session_state['profile_runs']
+    if not runs:
+        st.caption("기록된 실행이 없습니다. 화면을 한 번 더 조작하면 표시됩니다.")
+        return
+    last = runs[-1]
+    size = f" · 스판 {last['spans']:,}개" if 'spans' in last else ""
+    st.caption(f"직전 실행 {last['total_ms']:.0f} ms{size}{' (중단됨)' if last['interrupted'] else ''} · 최근 {len(runs)}회 평균 {sum(r['total_ms'] for r in runs) / len(runs):.0f} ms")
+    if last['phases']:
+        st.dataframe(pd.DataFrame(list(last['phases'].items()), columns=["단계", "ms"]), hide_index=True, use_container_width=True)
+    if last['calls']:
+        st.dataframe(pd.DataFrame([[k, *v] for k, v in last['calls'].items()], columns=["함수", "호출", "누적 ms", "최대 ms"]).head(12),
+                     hide_index=True, use_container_width=True)
+    if last['counters']:
+        st.dataframe(pd.DataFrame(list(last['counters'].items()), columns=["카운터", "값"]), hide_index=True, use_container_width=True)
+    if prof.LOG_FILE: st.caption(f"로그: {prof.LOG_FILE}")
 
 st.markdown("""
     <style>
@@ -51,49 +185,61 @@ st.markdown(f"""
     </div>
 """, unsafe_allow_html=True)
 
-# ---------------------------------------------------------
-# 차트 함수
-# ---------------------------------------------------------
-def draw_report_heatmap(sections):
-    data = []
-    current_dist = 0
-    color_map = {'A': '#2ecc71', 'B': '#3498db', 'C': '#f1c40f', 'D': '#e67e22', 'E': '#e74c3c'}
-    for sec in sections:
-        for span in sec.spans:
-            grade = span.result_cache.get('grade', 'A')[0]
-            data.append(dict(Task=f"Span {span.span_no}", Start=current_dist, Finish=current_dist + span.length, Grade=grade, Color=color_map.get(grade, '#ccc')))
-            current_dist += span.length
-    if not data: return None
-    df = pd.DataFrame(data)
-    fig = go.Figure()
-    for _, row in df.iterrows():
-        fig.add_trace(go.Bar(x=[row['Finish'] - row['Start']], y=["Status"], base=[row['Start']], orientation='h', marker=dict(color=row['Color'], line=dict(color='black', width=1)), showlegend=False))
-    fig.update_layout(height=120, margin=dict(l=10, r=10, t=25, b=10), xaxis=dict(showticklabels=True, title="Distance (m)", color="black", gridcolor="#eee"), yaxis=dict(showticklabels=False, color="black"), title=dict(text="터널 상태 분포도", font=dict(size=14, color="black")), plot_bgcolor='white', paper_bgcolor='white', font=dict(color="black"))
-    return fig
-
-def draw_screen_heatmap(sections):
-    data = []
-    current_dist = 0
-    color_map = {'A': '#2ecc71', 'B': '#3498db', 'C': '#f1c40f', 'D': '#e67e22', 'E': '#e74c3c'}
-    for sec in sections:
-        for span in sec.spans:
-            grade = span.result_cache.get('grade', 'A')[0]
-            f_val = span.result_cache.get('f_value', 0.0)
-            data.append(dict(Task=f"Span {span.span_no}", Start=current_dist, Finish=current_dist + span.length, Grade=grade, F_Value=f_val, Section=f"Sec {sec.id} ({sec.type.label})", Color=color_map.get(grade, '#ccc')))
-            current_dist += span.length
-    if not data: return None
-    df = pd.DataFrame(data)
-    fig = go.Figure()
-    for _, row in df.iterrows():
-        fig.add_trace(go.Bar(x=[row['Finish'] - row['Start']], y=["Status"], base=[row['Start']], orientation='h', marker=dict(color=row['Color'], line=dict(color='white', width=1)), hovertemplate=f"<b>{row['Section']}</b><br>Span No.{row['Task'].split()[-1]}<br>등급: {row['Grade']}<br>F: {row['F_Value']:.4f}<extra></extra>", showlegend=False))
-    fig.update_layout(height=120, margin=dict(l=10, r=10, t=30, b=10), xaxis=dict(title="터널 거리 (m)", showgrid=True), yaxis=dict(showticklabels=False), title=dict(text="[터널 전체 구간별 안전등급 현황도]", font=dict(size=14, color="#002b5c")), plot_bgcolor='rgba(0,0,0,0)')
-    return fig
+RISK_KEYS = {"종합 결함지수(F) 높은 순": "final_f", "D/E 등급 연장 비율 높은 순": "bad_share", "경보 많은 순": "alerts"}
+
+def draw_portfolio():
+    # 전체 터널 순위/경보 검색. 프로젝트를 열지 않고 포트폴리오 색인만 읽음
+    # 판정 기준을 바꾸면 기준별 캐시 색인으로 일괄 재판정 (처음 한 번만 전체, 이후엔 바뀐 프로젝트만)
+    sets = DataManager.criteria_sets()
+    with st.expander("⚖️ 판정 기준 파일 추가"):
+        up = st.file_uploader("기준 파일 (JSON)", type=["json"], key="pf_criteria_up")
+        if up is not None and st.button("기준 등록", key="pf_criteria_add"):
+            try:
+                c = GradingCriteria(json.loads(up.getvalue().decode('utf-8')))
+            except ValueError as e:
+                st.error(f"기준 파일 오류: {e}")
+            else:
+                DataManager.save_criteria(c)
+                st.session_state['pf_criteria'] = c.key
+                st.rerun()
+    c1, c2, c3 = st.columns([1, 1, 2])
+    ckey = c1.selectbox("판정 기준", list(sets), format_func=lambda k: f"{sets[k].name} ({sets[k].version})", key="pf_criteria")
+    criteria = sets.get(ckey)
+    summary = DataManager.load_portfolio(criteria)
+    if not summary:
+        st.caption("저장된 프로젝트가 없습니다.")
+        return
+    base = summary if criteria is GradingCriteria.default() else DataManager.load_portfolio()
+    risk = c2.selectbox("위험도 기준", list(RISK_KEYS), key="pf_rank")
+    total_len = sum(e['total_length'] for e in summary.values())
+    c3.caption(f"터널 {len(summary):,}개 · 총 연장 {total_len / 1000:,.2f} km · 스판 {sum(e['span_count'] for e in summary.values()):,}개 · "
+               f"경보 {sum(sum(e['alert_counts']) for e in summary.values()):,}건")
+    system, default_system = TunnelSafetySystem(criteria), st.session_state['system']
+    st.dataframe(pd.DataFrame([{
+        "시설물명": e['name'], "점검일자": e['date_str'], "종합 등급": system.get_grade_str(e['final_f']) if e['span_count'] else "-",
+        **({"기본 기준 등급": default_system.get_grade_str(base[pid]['final_f']) if pid in base and e['span_count'] else "-"} if base is not summary else {}),
+        "종합 F": round(e['final_f'], 4), "총 연장(m)": round(e['total_length'], 1), "스판 수": e['span_count'],
+        **{g: n for g, n in zip("ABCDE", e['grade_counts'])},
+        "D/E 연장 비율(%)": round(100 * sum(e['grade_length'][3:]) / e['total_length'], 1) if e['total_length'] > 0 else 0.0,
+        "경보": sum(e['alert_counts']),
+    } for pid, e in PortfolioIndex.ranking(summary, RISK_KEYS[risk])]), hide_index=True, use_container_width=True)
+    kinds = st.multiselect("경보 종류", list(PortfolioIndex.ALERT_TYPES), default=[PortfolioIndex.ALERT_TYPES[-1]], key="pf_alerts")
+    if kinds:
+        limit = 1000
+        rows = DataManager.portfolio(criteria).find_alerts(summary, [PortfolioIndex.ALERT_TYPES.index(k) for k in kinds], limit=limit)
+        st.caption(f"경보 {len(rows):,}건" + (f" (처음 {limit:,}건만 표시)" if len(rows) >= limit else ""))
+        if rows:
+            st.dataframe(pd.DataFrame([{"시설물명": r['name'], "구간": r['sec_id'], "Span No": r['span_no'], "경보": r['type'], "결함지수(F)": r['f_value']} for r in rows]),
+                         hide_index=True, use_container_width=True)
 
 # ---------------------------------------------------------
 # [MODE 1] 프로젝트 선택
 # ---------------------------------------------------------
 if st.session_state['active_project_id'] is None:
+    prof.mark("project_list")
+    with st.sidebar: draw_diagnostics()
     st.info("Daum Engineering")
+    if st.toggle("📊 포트폴리오 현황 (전체 터널 순위 · 경보)", key="portfolio"): draw_portfolio()
     
     col1, col2 = st.columns([2, 1], gap="large")
     with col2:
@@ -106,30 +252,47 @@ if st.session_state['active_project_id'] is None:
                 if name:
                     pid = str(uuid.uuid4())[:8]
                     st.session_state['projects'][pid] = ProjectMetadata(pid, name, inspector, "특급", "(주)다음기술단", datetime.now().strftime("%Y-%m-%d"))
-                    DataManager.save_all_projects(st.session_state['projects'])
+                    DataManager.save_project(st.session_state['projects'][pid])
                     st.rerun()
                 else:
                     st.error("시설물명을 입력해주세요.")
 
     with col1:
         st.markdown("### 📂 내 프로젝트 목록")
-        if not st.session_state['projects']: 
+        project_index = DataManager.load_index()
+        if not project_index: 
             st.warning("등록된 프로젝트가 없습니다.")
         else:
-            for pid, p in st.session_state['projects'].items():
+            if st.button("📚 전체 보고서 일괄 생성 (HTML)", use_container_width=True):
+                # 저장된 프로젝트 기준. 내용이 바뀌지 않은 프로젝트는 캐시 파일을 그대로 사용
+                with st.spinner(f"{len(project_index)}개 프로젝트 보고서 생성 중..."):
+                    results = build_reports(list(project_index))
+                buf = BytesIO()
+                with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+                    for rpid, (path, err) in results.items():
+                        if path: zf.write(path, re.sub(r'[\\/*?:"<>|]', "", project_index[rpid]['name']) + f"_{rpid}.html")
+                        else: st.error(f"{project_index[rpid]['name']}: {err}")
+                st.download_button("📥 보고서 묶음 다운로드 (ZIP)", data=buf.getvalue(), file_name="보고서_전체.zip", mime="application/zip", use_container_width=True)
+            for pid, e in project_index.items():
                 with st.container(border=True):
                     c_info, c_btn = st.columns([3, 1])
                     with c_info:
-                        st.markdown(f"**{p.name}**")
-                        st.caption(f"{p.date_str} | {p.inspector} | 구간: {len(p.sections)}개")
+                        st.markdown(f"**{e['name']}**")
+                        st.caption(f"{e['date_str']} | {e['inspector']} | 구간: {e['section_count']}개")
                     with c_btn:
                         if st.button("열기 ▶", key=f"op_{pid}", type="primary", use_container_width=True):
+                            if pid not in st.session_state['projects']:
+                                loaded = DataManager.load_project(pid)
+                                if loaded is None:
+                                    st.error("프로젝트 파일을 읽을 수 없습니다.")
+                                    st.stop()
+                                st.session_state['projects'][pid] = loaded
                             st.session_state['active_project_id'] = pid
                             reset_indices()
                             st.rerun()
                         if st.button("삭제", key=f"del_{pid}", use_container_width=True):
-                            del st.session_state['projects'][pid]
-                            DataManager.save_all_projects(st.session_state['projects'])
+                            st.session_state['projects'].pop(pid, None)
+                            DataManager.delete_project(pid)
                             st.rerun()
 
 # ---------------------------------------------------------
@@ -142,8 +305,16 @@ else:
         st.rerun()
         
     proj = st.session_state['projects'][pid]
-    system = TunnelSafetySystem()
+    prof.annotate(project=pid, sections=len(proj.sections), spans=sum(len(sec.spans) for sec in proj.sections))
+    prof.mark("sync")
+    sync_project(proj)
+    system = st.session_state['system']
+    cache = st.session_state['view_cache']
+    photo_store = PhotoStore(DataManager.PHOTO_DIR)
+    history = CampaignHistory(DataManager.HISTORY_DIR)
+    edits = edit_history(proj)
     
+    prof.mark("sidebar")
     with st.sidebar:
         if st.button("◀ 목록으로", use_container_width=True): 
             st.session_state['active_project_id'] = None
@@ -153,12 +324,27 @@ else:
         
         c1, c2 = st.columns(2)
         if c1.button("💾 저장", type="primary", use_container_width=True):
-            DataManager.save_all_projects(st.session_state['projects'])
+            save_project(proj)
             st.toast("저장 완료!")
-        if c2.button("↩ 복구", use_container_width=True):
-            st.session_state['projects'] = DataManager.load_all_projects()
-            reset_indices()
+        autosave = st.toggle("⏱ 자동 저장", value=True, key="autosave", help="스판을 수정할 때마다 변경 내용을 저널에 기록하고 주기적으로 저장소에 반영합니다.")
+        if c2.button("↩ 복구", use_container_width=True, help="프로젝트를 연 시점(또는 마지막 저장 시점)의 값으로 되돌립니다. 실행 취소로 다시 돌아올 수 있습니다."):
+            # 저장소를 다시 읽지 않고 기준 스냅샷과 다른 스판만 되돌림
+            apply_step(proj, edits.revert_all(), autosave)
+            st.rerun()
+        undo_label, redo_label = edits.labels()
+        c3, c4 = st.columns(2)
+        if c3.button("↶ 실행 취소", use_container_width=True, disabled=undo_label is None, help=undo_label):
+            apply_step(proj, edits.undo(), autosave)
             st.rerun()
+        if c4.button("↷ 다시 실행", use_container_width=True, disabled=redo_label is None, help=redo_label):
+            apply_step(proj, edits.redo(), autosave)
+            st.rerun()
+        if st.session_state.get('conflicts'):
+            with st.expander(f"⚠ 동시 편집 충돌 {len(st.session_state['conflicts'])}건", expanded=True):
+                for msg in st.session_state['conflicts'][-20:]: st.caption(msg)
+                if st.button("확인", key="ack_conflicts", use_container_width=True):
+                    st.session_state['conflicts'] = []
+                    st.rerun()
 
         st.markdown("---")
         with st.expander("➕ 구간 관리", expanded=not proj.sections):
@@ -175,16 +361,52 @@ else:
                         if tLen % uLen > 0: new_sec.spans.append(TunnelSpan(cnt+1, tLen % uLen))
                         proj.sections.append(new_sec)
                         proj.next_section_id += 1
-                        DataManager.save_all_projects(st.session_state['projects'])
+                        proj.touch("structure")
+                        edits.record(f"Sec {new_sec.id} 구간 추가", [])
+                        save_project(proj)
                         st.rerun()
             
             if proj.sections and st.button("마지막 구간 삭제", use_container_width=True):
-                proj.sections.pop()
+                removed = proj.sections.pop()
+                proj.touch("structure")
+                edits.record(f"Sec {removed.id} 구간 삭제", [])
                 reset_indices()
-                DataManager.save_all_projects(st.session_state['projects'])
+                save_project(proj)
                 st.rerun()
+        if proj.sections:
+            with st.expander("📥 측정값 일괄 가져오기"):
+                st.caption("CSV/엑셀의 '구간', 'Span' 열로 스판을 찾아 균열폭·누수 등 측정값을 반영합니다. 빈 칸은 기존 값을 유지합니다.")
+                up = st.file_uploader("측정 파일", type=["csv", "xlsx"], key=f"imp_{pid}")
+                if up is not None:
+                    try:
+                        plan = SpanImport.validate(proj, SpanImport.read(up, up.name))
+                    except ModuleNotFoundError:
+                        plan = None
+                        st.error("엑셀 파일을 읽으려면 openpyxl 라이브러리가 필요합니다. CSV로 저장해서 올려 주세요.")
+                    except Exception as e:
+                        plan = None
+                        st.error(f"파일을 읽을 수 없습니다: {e}")
+                    if plan is not None:
+                        st.caption(f"{len(plan.frame):,}행 · 반영 항목 {len(plan.fields)}개" + (f" · 무시한 열: {', '.join(plan.ignored)}" if plan.ignored else ""))
+                        if plan.errors:
+                            st.error(f"오류 {len(plan.errors):,}건 – 수정 후 다시 올려 주세요. (전체를 적용하지 않음)")
+                            for msg in plan.errors[:SpanImport.MAX_ERRORS]: st.caption(msg)
+                        elif st.button("가져오기 적용", type="primary", use_container_width=True, key=f"imp_apply_{pid}"):
+                            touched = SpanImport.apply(proj, plan)
+                            if touched:
+                                edits.record(f"측정값 가져오기 ({up.name})", [k for k, sec in enumerate(proj.sections) if any(sec is t for t in touched)])
+                                system.calculate_batch(touched) # 바뀐 구간만 한 번에 재판정 → 요약은 결과가 바뀐 스판만 다시 집계
+                                save_project(proj)
+                                st.session_state['chainage'].pop(pid, None)
+                                v_sec, v_span = viewing_span(proj)
+                                if v_span is not None: forget_span_widgets(v_sec, v_span)
+                            st.session_state.pop(f"imp_{pid}", None)
+                            st.toast(f"{len(plan.frame):,}행 가져오기 완료 ({len(touched)}개 구간 재판정)" if touched else "바뀐 값이 없습니다.")
+                            st.rerun()
+        draw_diagnostics()
 
     # [MAIN] 상단 내비게이션
+    prof.mark("navigation")
     col_nav1, col_nav2, col_save_big = st.columns([2, 2, 1])
     
     if not proj.sections: 
@@ -199,31 +421,46 @@ else:
         
         with col_nav2:
             curr_sec = proj.sections[s_idx]
-            if st.session_state['sel_span_idx'] >= len(curr_sec.spans): st.session_state['sel_span_idx'] = 0
-            span_opts = [f"No.{sp.span_no} ({sp.result_cache.get('grade', 'A')[0]})" for sp in curr_sec.spans]
-            sp_idx = st.selectbox("2️⃣ 스판 선택", range(len(span_opts)), format_func=lambda x: span_opts[x], key="nav_span")
-            st.session_state['sel_span_idx'] = sp_idx
+            # [안전장치] 구간이 바뀌어 스판 수가 줄면 범위 안으로
+            if st.session_state.get('nav_span', 1) > len(curr_sec.spans): st.session_state['nav_span'] = 1
+            sp_no = st.number_input(f"2️⃣ 스판 선택 (1 ~ {len(curr_sec.spans)})", 1, max(1, len(curr_sec.spans)), key="nav_span")
+            st.session_state['sel_span_idx'] = sp_no - 1
             
         with col_save_big:
             if st.button("💾 저장하기", type="primary", use_container_width=True, key="main_save"):
-                DataManager.save_all_projects(st.session_state['projects'])
+                save_project(proj)
                 st.toast("저장되었습니다!")
 
         curr_span = curr_sec.spans[st.session_state['sel_span_idx']]
         d = curr_span.data
 
+        nav = st.session_state['chainage'].get(pid)
+        if nav is None or not nav.matches(proj.sections):
+            nav = st.session_state['chainage'][pid] = ChainageIndex(proj.sections)
+        flat = nav.flat(s_idx, st.session_state['sel_span_idx'])
+        sta = nav.start(flat)
+        b_prev, b_next, b_bad_prev, b_bad_next, c_dist, b_dist = st.columns([1, 1, 1, 1, 2, 1], vertical_alignment="bottom")
+        b_prev.button("◀ 이전", on_click=lambda: go_to_span(nav, flat - 1 if flat > 0 else None), use_container_width=True)
+        b_next.button("다음 ▶", on_click=lambda: go_to_span(nav, flat + 1 if flat + 1 < nav.n else None), use_container_width=True)
+        b_bad_prev.button("⚠ 이전 D/E", on_click=lambda: go_to_span(nav, nav.prev_bad(flat)), use_container_width=True)
+        b_bad_next.button("⚠ 다음 D/E", on_click=lambda: go_to_span(nav, nav.next_bad(flat)), use_container_width=True)
+        c_dist.number_input(f"📍 거리로 이동 (0 ~ {nav.total():.1f} m)", 0.0, step=10.0, key=f"nav_dist_{pid}")
+        b_dist.button("이동", on_click=lambda: go_to_span(nav, nav.locate(st.session_state[f"nav_dist_{pid}"])), use_container_width=True)
+        st.caption(f"현재 위치: Sec {curr_sec.id} No.{curr_span.span_no} · STA {sta:.1f} ~ {sta + curr_span.length:.1f} m · 주의(D/E) 스판 {len(nav.bad)}개")
+
         # 히트맵
-        fig_map = draw_screen_heatmap(proj.sections)
+        prof.mark("heatmap")
+        fig_map = cache.get_or_build(proj, 'screen_map', lambda: draw_screen_heatmap(proj.sections))
         if fig_map: st.plotly_chart(fig_map, use_container_width=True)
 
         # [NEW] 스판 제원 일괄 관리 (Structure Manager)
+        prof.mark("structure")
         with st.expander("📏 스판 길이(m) 일괄 변경"):
             st.markdown('<div class="structure-box">', unsafe_allow_html=True)
             st.info("아래 표에서 각 스판의 길이를 직접 수정할 수 있습니다. (예: 20m -> 15.5m)")
             
             # 데이터프레임 생성
-            span_data = [{"Span No": s.span_no, "Length (m)": s.length} for s in curr_sec.spans]
-            df_struct = pd.DataFrame(span_data)
+            df_struct = cache.get_or_build(proj, ('struct', curr_sec.id), lambda: pd.DataFrame([{"Span No": s.span_no, "Length (m)": s.length} for s in curr_sec.spans]))
             
             # 데이터 에디터 (수정 가능)
             edited_df = st.data_editor(
@@ -238,34 +475,54 @@ else:
                 new_lengths = edited_df["Length (m)"].tolist()
                 total_len_calc = 0
                 for i, span in enumerate(curr_sec.spans):
+                    if span.length != new_lengths[i]: span.edited = True
                     span.length = new_lengths[i]
+                    nav.set_length(nav.flat(s_idx, i), span.length)
                     total_len_calc += span.length
                 
                 # 구간 전체 연장도 자동 업데이트
                 curr_sec.total_length = total_len_calc
-                DataManager.save_all_projects(st.session_state['projects'])
+                proj.touch("structure")
+                edits.record(f"Sec {curr_sec.id} 스판 길이 일괄 변경", [s_idx])
+                save_project(proj)
                 st.success(f"적용 완료! 구간 총 연장이 {total_len_calc:.2f}m로 업데이트되었습니다.")
                 st.rerun()
             st.markdown('</div>', unsafe_allow_html=True)
 
         # 탭 구성
-        tab1, tab2 = st.tabs(["🖊️ 현장 입력 (Input)", "📄 보고서 (Report)"])
+        tab1, tab2, tab3, tab4 = st.tabs(["🖊️ 현장 입력 (Input)", "📄 보고서 (Report)", "📈 점검 이력 (History)", "🎯 측정 불확실성 (What-if)"])
         
         # [TAB 1] 입력
         with tab1:
-            c_len, c_copy = st.columns([3, 1])
+            prof.mark("tab_input")
+            c_len, c_copy, c_revert = st.columns([2, 1, 1])
             with c_len:
                 unique_key = f"{curr_sec.id}_{curr_span.span_no}"
+                span_before = (curr_span.length, d.location, d.eval_key(), tuple(d.photos))
                 # 개별 길이 수정도 가능 (양쪽 동기화)
                 curr_span.length = st.number_input("📏 현재 스판 길이 (m)", value=curr_span.length, key=f"len_{unique_key}")
+                nav.set_length(flat, curr_span.length)
             with c_copy:
                 if curr_span.span_no > 1:
                     if st.button("📋 이전값 복사", use_container_width=True):
-                        import copy
                         prev = curr_sec.spans[st.session_state['sel_span_idx']-1]
-                        curr_span.data = copy.deepcopy(prev.data)
-                        st.success("복사됨 (저장필요)")
+                        curr_span.data = InspectionData.from_dict(prev.data.to_dict())
+                        curr_span.edited = True
+                        proj.touch()
+                        edits.record_span(s_idx, st.session_state['sel_span_idx'], f"Sec {curr_sec.id} No.{curr_span.span_no} 이전값 복사")
+                        forget_span_widgets(curr_sec, curr_span)
+                        if autosave: DataManager.record_span_change(proj, curr_sec, curr_span)
+                        st.success("복사됨 (실행 취소 가능)")
                         st.rerun()
+            with c_revert:
+                # 프로젝트를 연 시점(마지막 저장 시점) 값으로 – 디스크를 읽지 않음
+                r1, r2 = st.columns(2)
+                if r1.button("↺ 스판", use_container_width=True, help="이 스판을 저장 시점 값으로 되돌립니다.", key=f"rv_span_{unique_key}"):
+                    apply_step(proj, edits.revert_span(s_idx, st.session_state['sel_span_idx']), autosave)
+                    st.rerun()
+                if r2.button("↺ 구간", use_container_width=True, help="이 구간 전체를 저장 시점 값으로 되돌립니다.", key=f"rv_sec_{curr_sec.id}"):
+                    apply_step(proj, edits.revert_section(s_idx), autosave)
+                    st.rerun()
 
             col_left, col_right = st.columns(2, gap="medium")
             
@@ -300,37 +557,84 @@ else:
                 
                 st.markdown('<div class="input-card">', unsafe_allow_html=True)
                 st.markdown("##### 📷 사진 기록")
-                st.file_uploader("사진 업로드", key=f"p_{unique_key}")
+                uploads = st.file_uploader("사진 업로드", type=["jpg", "jpeg", "png", "webp"], accept_multiple_files=True, key=f"p_{unique_key}")
+                # 업로더는 rerun 마다 같은 파일을 돌려주므로 처음 본 파일만 저장소에 넣음
+                ingested = st.session_state.setdefault('ingested_uploads', set())
+                for up in uploads or []:
+                    if up.file_id in ingested: continue
+                    digest = photo_store.put(up.getvalue())
+                    ingested.add(up.file_id)
+                    if digest not in d.photos:
+                        d.photos.append(digest)
+                        d.photo_name = up.name
+                if d.photos:
+                    thumbs = [t for t in (photo_store.thumbnail(h) for h in d.photos) if t]
+                    if thumbs: st.image(thumbs, width=110)
+                    st.caption(f"사진 {len(d.photos)}장")
+                    c_full, c_del = st.columns(2)
+                    # 원본은 요청할 때만 읽음
+                    if c_full.toggle("🔍 원본 보기", key=f"pf_{unique_key}"):
+                        for h in d.photos:
+                            full = photo_store.load(h)
+                            if full: st.image(full, use_container_width=True)
+                    if c_del.button("🗑 마지막 사진 삭제", key=f"pd_{unique_key}", use_container_width=True):
+                        d.photos.pop()
                 st.markdown('</div>', unsafe_allow_html=True)
 
+            if (curr_span.length, d.location, d.eval_key(), tuple(d.photos)) != span_before:
+                curr_span.edited = True
+                proj.touch()
+                edits.record_span(s_idx, st.session_state['sel_span_idx'])
+                if autosave:
+                    DataManager.record_span_change(proj, curr_sec, curr_span)
+                    DataManager.compact_journal()
             res = system.calculate_span(curr_span, curr_sec.type)
+            nav.set_grade(flat, res['grade'])
             msg_color = "red" if res['grade'] in ['D (미흡)', 'E (불량)'] else "green" if res['grade'] == 'A (우수)' else "blue"
             st.markdown(f"""<div style="background-color:#fff; border-left: 10px solid {msg_color}; padding:20px; border-radius:8px; box-shadow:0 2px 10px rgba(0,0,0,0.1);"><h3 style="margin:0; color:black;">판정 결과: <span style="color:{msg_color};">{res['grade']}</span> (F={res['f_value']:.4f})</h3><small style="color:gray;">{ " / ".join(res['alerts']) if res['alerts'] else "특이사항 없음" }</small></div>""", unsafe_allow_html=True)
 
         # [TAB 2] 보고서
         with tab2:
-            summary = system.calculate_project_summary(proj.sections)
+            prof.mark("tab_report")
+            summary = cache.get_or_build(proj, 'summary', lambda: system.calculate_project_summary(proj.sections))
             if summary:
                 st.markdown("#### 📝 종합 의견 작성")
-                proj.opinion = st.text_area("점검자 소견", value=proj.opinion, height=150, key=f"op_{pid}")
-                
-                data_list = []
-                for s in summary['span_results']:
-                    data_list.append({
-                        "구간": s['sec_id'], "형식": s['type'], "Span": s['span_no'], "길이(m)": s['length'],
-                        "균열": s['data'].crack_width, "누수": s['data'].leakage_grade, "등급": s['result']['grade']
-                    })
-                df = pd.DataFrame(data_list)
+                new_opinion = st.text_area("점검자 소견", value=proj.opinion, height=150, key=f"op_{pid}")
+                if new_opinion != proj.opinion:
+                    proj.opinion = new_opinion
+                    proj.touch("opinion")
+                    edits.record("종합 의견 수정", [])
+                    if autosave: DataManager.record_project_change(proj)
                 
                 safe_name = re.sub(r'[\\/*?:"<>|]', "", proj.name)
                 
                 # 엑셀 예외처리
                 try:
-                    out = BytesIO()
-                    with pd.ExcelWriter(out, engine='xlsxwriter') as w: df.to_excel(w, index=False)
-                    st.download_button("📥 엑셀 다운로드", data=out.getvalue(), file_name=f"{safe_name}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
+                    # 작은 프로젝트는 바로 만들고, 큰 프로젝트는 버튼을 눌렀을 때만 생성 (revision 이 같으면 재사용)
+                    excel_bytes = cache.peek(proj, 'excel')
+                    if excel_bytes is None and (len(summary['span_results']) <= EXCEL_AUTO_SPANS or st.button("📊 엑셀 파일 생성 (전체 스판)", use_container_width=True)):
+                        with st.spinner("엑셀 파일 생성 중..."):
+                            excel_bytes = cache.get_or_build(proj, 'excel', lambda: build_excel_bytes(proj, summary))
+                    if excel_bytes is not None:
+                        st.download_button("📥 엑셀 다운로드", data=excel_bytes, file_name=f"{safe_name}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
                 except ModuleNotFoundError:
                     st.error("xlsxwriter 라이브러리가 필요합니다.")
+
+                # 오프라인 보고서 (내용 해시가 같으면 디스크에 있는 파일을 그대로 사용)
+                report_builder = ReportBuilder(photo_store=photo_store)
+                digest = cache.get_or_build(proj, 'report_hash', lambda: ReportBuilder.content_hash(proj))
+                r1, r2 = st.columns(2)
+                for col, fmt, mime in ((r1, "html", "text/html"), (r2, "pdf", "application/pdf")):
+                    path = report_builder.cached(proj, fmt, digest)
+                    if path is None and col.button(f"🧾 {fmt.upper()} 보고서 생성", use_container_width=True, key=f"rep_{fmt}_{pid}"):
+                        try:
+                            with st.spinner(f"{fmt.upper()} 보고서 생성 중..."):
+                                path = report_builder.build(proj, fmt, summary, digest)
+                        except ModuleNotFoundError:
+                            col.error("PDF 생성에는 weasyprint 라이브러리가 필요합니다. HTML 보고서를 브라우저에서 인쇄해 주세요.")
+                    if path is not None:
+                        with open(path, 'rb') as f:
+                            col.download_button(f"📥 {fmt.upper()} 보고서 다운로드", data=f.read(), file_name=f"{safe_name}_보고서.{fmt}", mime=mime, use_container_width=True, key=f"rep_dl_{fmt}_{pid}")
                 
                 st.divider()
                 st.markdown('<div class="report-container">', unsafe_allow_html=True)
@@ -352,15 +656,112 @@ else:
                 </div><br>
                 """, unsafe_allow_html=True)
                 st.markdown('<h4 style="color:black !important;">[터널 상태 분포도]</h4>', unsafe_allow_html=True)
-                fig_report = draw_report_heatmap(proj.sections)
+                fig_report = cache.get_or_build(proj, 'report_map', lambda: draw_report_heatmap(proj.sections))
                 if fig_report: st.plotly_chart(fig_report, use_container_width=True)
                 st.markdown('<br><h4 style="color:black !important;">[종합 의견 및 조치사항]</h4>', unsafe_allow_html=True)
                 op_text = proj.opinion if proj.opinion else "(작성된 의견이 없습니다)"
                 st.markdown(f"""<div class="opinion-box">{op_text}</div><br>""", unsafe_allow_html=True)
                 st.markdown('<h4 style="color:black !important;">[주요 구간 세부 평가 내역]</h4>', unsafe_allow_html=True)
+                table = cache.get_or_build(proj, 'result_table', lambda: SpanResultTable(summary['span_results']))
+                f1, f2, f3, f4 = st.columns([2, 2, 2, 1])
+                sort_label = f1.selectbox("정렬", list(SpanResultTable.SORTS), key=f"rt_sort_{pid}")
+                f_secs = f2.multiselect("구간", table.sections, key=f"rt_sec_{pid}")
+                f_types = f3.multiselect("형식", table.types, key=f"rt_type_{pid}")
+                page_size = f4.selectbox("행 수", PAGE_SIZES, index=1, key=f"rt_size_{pid}")
+                g1, g2, g3 = st.columns([4, 2, 1])
+                f_grades = g1.multiselect("안전등급", list("ABCDE"), key=f"rt_grade_{pid}")
+                f_alert = g2.checkbox("경보 있는 스판만", key=f"rt_alert_{pid}")
+                hits = table.query(SpanResultTable.SORTS[sort_label], f_secs, f_types, f_grades, f_alert)
+                n_pages = SpanResultTable.page_count(len(hits), page_size)
+                # [안전장치] 필터로 페이지 수가 줄면 현재 페이지를 범위 안으로
+                if st.session_state.get(f"rt_page_{pid}", 1) > n_pages: st.session_state[f"rt_page_{pid}"] = n_pages
+                page = g3.number_input("페이지", 1, n_pages, key=f"rt_page_{pid}")
+                st.caption(f"{len(hits):,} / {len(table):,}개 스판 · {page}/{n_pages} 페이지")
                 rows = ""
-                limit_rows = summary['span_results'][:20] 
-                for s in limit_rows:
-                    rows += f"<tr><td>{s['sec_id']}</td><td>{s['type']}</td><td>{s['span_no']}</td><td>{s['result']['grade']}</td><td>{s['result']['f_value']:.4f}</td></tr>"
-                st.markdown(f"""<table class="report-table"><thead><tr><th>구간</th><th>형식</th><th>Span No</th><th>안전등급</th><th>결함지수(F)</th></tr></thead><tbody>{rows}</tbody></table>""", unsafe_allow_html=True)
+                for s in table.page(hits, page, page_size):
+                    rows += f"<tr><td>{s['sec_id']}</td><td>{s['type']}</td><td>{s['span_no']}</td><td>{s['result']['grade']}</td><td>{s['result']['f_value']:.4f}</td><td>{' / '.join(s['result']['alerts'])}</td></tr>"
+                st.markdown(f"""<table class="report-table"><thead><tr><th>구간</th><th>형식</th><th>Span No</th><th>안전등급</th><th>결함지수(F)</th><th>경보</th></tr></thead><tbody>{rows}</tbody></table>""", unsafe_allow_html=True)
                 st.markdown('</div>', unsafe_allow_html=True)
+
+        # [TAB 3] 점검 회차 이력
+        with tab3:
+            prof.mark("tab_history")
+            campaigns = history.campaigns(pid)
+            with st.form("close_campaign"):
+                st.markdown(f"**현재 점검 ({proj.date_str}) 회차 마감**")
+                h1, h2 = st.columns(2)
+                c_label = h1.text_input("회차 이름", value=f"{len(campaigns) + 1}회차 ({proj.date_str})")
+                next_date = h2.date_input("다음 점검일자")
+                st.caption("현재 입력 내용을 이력에 남기고(직전 회차 대비 바뀐 스판만 저장), 다음 점검을 같은 데이터에서 이어서 시작합니다.")
+                if st.form_submit_button("📌 회차 마감", use_container_width=True):
+                    save_project(proj)
+                    rec = history.close_campaign(proj, c_label)
+                    proj.date_str = next_date.strftime("%Y-%m-%d")
+                    proj.opinion = ""
+                    proj.touch("opinion")
+                    st.session_state.pop(f"op_{pid}", None)
+                    save_project(proj)
+                    st.toast(f"{rec['label']} 마감 완료 (변경 스판 {len(rec['keys']):,}개 저장)")
+                    st.rerun()
+            if not campaigns:
+                st.info("마감된 점검 회차가 없습니다. 회차를 마감하면 이전 점검과 비교한 추세를 볼 수 있습니다.")
+            else:
+                st.dataframe(pd.DataFrame([{"회차": r['no'], "이름": r.get('label', ''), "점검일자": r['date_str'], "점검자": r['inspector'],
+                                            "구간 수": len(r['sections']), "변경 스판": len(r['keys'])} for r in campaigns]),
+                             hide_index=True, use_container_width=True)
+                # 현재 작업본이 바뀌거나 회차가 추가될 때만 다시 계산
+                tr = cache.get_or_build(proj, ('trend', len(campaigns)), lambda: history.trend(proj))
+                if tr is not None:
+                    st.plotly_chart(px.line(x=tr['labels'], y=tr['final_f'], markers=True, labels={'x': '회차', 'y': '종합 결함지수(F)'}), use_container_width=True)
+                    flagged = tr['flagged']
+                    st.markdown(f"#### ⚠ 악화 추세 스판 {len(flagged):,}개")
+                    st.caption(f"직전 회차보다 등급이 나빠졌거나, F 증가 추세가 연 {CampaignHistory.SLOPE_LIMIT}를 넘는 스판 (추세 기울기 순)")
+                    if len(flagged):
+                        f_mat, g_mat = tr['f'], tr['grade']
+                        grade_str = lambda g: "ABCDE"[g] if g >= 0 else "-"
+                        st.dataframe(pd.DataFrame([{
+                            "구간": tr['keys'][j][0], "Span No": tr['span_no'][j],
+                            "등급 변화": " → ".join(grade_str(g) for g in g_mat[:, j].tolist()),
+                            "F (처음)": f_mat[~np.isnan(f_mat[:, j]), j][0], "F (현재)": f_mat[-1, j],
+                            "F 증가/년": tr['slope'][j], "등급 악화": bool(tr['worsened'][j]),
+                        } for j in flagged[:200].tolist()]), hide_index=True, use_container_width=True)
+
+        # [TAB 4] 측정 허용오차에 따른 등급 확률 (몬테카를로)
+        with tab4:
+            prof.mark("tab_uncertainty")
+            with st.form(f"mc_form_{pid}"):
+                st.markdown("**측정 허용오차**")
+                m1, m2, m3 = st.columns(3)
+                tol = Tolerance(
+                    crack_width=m1.number_input("균열폭 ± (mm)", 0.0, 2.0, 0.1, 0.05),
+                    material_steps=m2.selectbox("재질열화 ± 등급", [0, 1, 2], index=1),
+                    leakage_steps=m3.selectbox("누수 ± 등급", [0, 1, 2]),
+                    breakage_steps=m1.selectbox("파손/손상 ± 등급", [0, 1, 2]),
+                    aux_score=m2.number_input("부대시설(f) ±", 0.0, 0.5, 0.0, 0.05),
+                )
+                samples = m3.selectbox("표본 수", [500, 1000, 2000, 5000], index=1)
+                if st.form_submit_button("🎲 시뮬레이션 실행", use_container_width=True):
+                    with st.spinner("허용오차 표본 판정 중..."):
+                        st.session_state[f"mc_{pid}"] = (proj.revision, UncertaintyEngine.simulate(proj.sections, tol, samples, workers=default_workers()))
+            mc = st.session_state.get(f"mc_{pid}")
+            if mc is None or mc[1] is None:
+                st.info("허용오차를 정하고 시뮬레이션을 실행하면 스판별 등급 확률과 재측정 우선순위를 보여 줍니다.")
+            else:
+                rev, res = mc
+                if rev != proj.revision: st.warning("시뮬레이션 이후 데이터가 바뀌었습니다. 다시 실행하세요.")
+                lo, hi = np.percentile(res['final_f'], [5, 95])
+                st.markdown(f"**종합 결함지수 F** 평균 {res['final_f'].mean():.4f} (90% 구간 {lo:.4f} ~ {hi:.4f}) · 표본 {res['samples']:,}개")
+                st.plotly_chart(px.bar(x=[g[0] for g in BatchEvaluator.GRADE_LABELS], y=res['final_grade_prob'], labels={'x': '종합 등급', 'y': '확률'},
+                                       color=list("ABCDE"), color_discrete_map=GRADE_COLORS), use_container_width=True)
+                flip = res['flip_prob']
+                top = [j for j in res['priority'][:200].tolist() if flip[j] > 0]
+                st.markdown(f"#### 🔁 등급이 바뀔 수 있는 스판 {int((flip > 0).sum()):,}개 (재측정 우선순위)")
+                if top:
+                    st.dataframe(pd.DataFrame([{
+                        "구간": int(res['sec_id'][j]), "Span No": int(res['span_no'][j]), "공칭 등급": "ABCDE"[res['nominal_grade'][j]],
+                        "결함지수(F)": round(float(res['nominal_f'][j]), 4), "등급 변경 확률": round(float(flip[j]), 3),
+                        **{f"P({g})": round(float(p), 3) for g, p in zip("ABCDE", res['grade_prob'][j])},
+                    } for j in top]), hide_index=True, use_container_width=True)
+
+# 정상 종료한 rerun 기록 (st.rerun/st.stop 으로 끊긴 실행은 다음 rerun 시작 시 '중단됨'으로 기록)
+st.session_state['profile_runs'].append(prof.end_run())
@@ -0,0 +1,17 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tunnel_master_logic import DataManager
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    # 저장소/저널/포트폴리오 색인/사진/회차 이력/보고서를 모두 임시 폴더로
+    for k, name in (("DB_DIR", "db"), ("DB_FILE", "legacy.json"), ("SQLITE_FILE", "db.sqlite3"),
+                    ("JOURNAL_FILE", "journal.jsonl"), ("PORTFOLIO_DIR", "portfolio"), ("PHOTO_DIR", "photos"),
+                    ("HISTORY_DIR", "history"), ("REPORT_DIR", "reports")):
+        monkeypatch.setattr(DataManager, k, str(tmp_path / name))
+    monkeypatch.setattr(DataManager, "BACKEND", "json")
+    return tmp_path
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from tunnel_master_logic import GradingCriteria, TunnelSafetySystem, TunnelSection, TunnelSpan, TunnelType
+
+GRADES = list("abcdeABCDE") + ["x", ""] # 대문자와 알 수 없는 등급 포함
+
+def boundary_values(bands) -> list:
+    # 구간 경계값 그 자체와 바로 앞뒤
+    return sorted({v + d for b in bands for v in [b] for d in (-1e-9, 0.0, 1e-9)} | {0.0})
+
+def random_sections(criteria: GradingCriteria, n: int = 300, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    cracks = boundary_values(sorted({x for lim in criteria.crack_limits.values() for x in lim})) + [5.0]
+    auxes = boundary_values(criteria.aux_bands) + [1.0]
+    sections = []
+    for k, t in enumerate(TunnelType):
+        spans = []
+        for i in range(n):
+            sp = TunnelSpan(i + 1, float(rng.choice([0.0, 5.0, 12.5, 20.0])))
+            d, m = sp.data, sp.data.material
+            d.crack_width, d.aux_score = float(rng.choice(cracks)), float(rng.choice(auxes))
+            d.leakage_grade, d.breakage_grade = rng.choice(GRADES, 2)
+            m.spalling_grade, m.efflorescence_grade, m.rebar_grade, m.carbonation_grade = rng.choice(GRADES, 4)
+            d.soil_leak = bool(rng.integers(2))
+            d.sur_drain, d.sur_ground, d.sur_portal, d.sur_util, d.sur_special = (int(x) for x in rng.integers(0, 5, 5))
+            spans.append(sp)
+        sections.append(TunnelSection(k + 1, t, 20.0 * n, 20.0, spans))
+    return sections
+
+CUSTOM = {"version": "test", "grade_scores": {"a": 0, "b": 2, "c": 5, "d": 9, "e": 14}, # 등간격이 아닌 점수
+          "crack_limits": {"default": [0.2, 0.4, 0.8, 1.5]}, "total_denom": {"개착식 (BOX)": 40},
+          "aux_bands": [0.2, 0.4, 0.6, 0.8], "f_bands": [0.1, 0.25, 0.5, 0.7]}
+
+@pytest.mark.parametrize("spec", [None, CUSTOM], ids=["default", "custom"])
+def test_batch_matches_scalar_path(spec):
+    criteria = GradingCriteria(spec) if spec else GradingCriteria.default()
+    system = TunnelSafetySystem(criteria)
+    sections = random_sections(criteria)
+    batch = system.calculate_batch(sections, write_cache=False)
+    scalar = [system.calculate_span(sp, sec.type) for sec in sections for sp in sec.spans]
+    assert len(batch['span_results']) == len(scalar)
+    for b, s in zip(batch['span_results'], scalar):
+        r = b['result']
+        assert (r['grade'], r['alerts']) == (s['grade'], s['alerts'])
+        assert r['f_value'] == pytest.approx(s['f_value'], rel=1e-12, abs=1e-15)
+        assert r['details'] == pytest.approx(s['details'])
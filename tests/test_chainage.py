@@ -0,0 +1,77 @@
+import bisect
+import itertools
+import random
+from tunnel_master_logic import ChainageIndex, TunnelSafetySystem, TunnelSection, TunnelSpan, TunnelType
+
+def sections(seed: int = 0) -> list:
+    # 길이가 제각각인 스판 + 빈 구간 포함
+    rnd = random.Random(seed)
+    out = []
+    for k, n in enumerate([5, 0, 17, 1, 0, 40]):
+        spans = [TunnelSpan(i + 1, rnd.choice([2.5, 10.0, 12.0, 20.0])) for i in range(n)]
+        for sp in spans: damage(sp, rnd.random() < 0.3)
+        out.append(TunnelSection(k + 1, TunnelType.NATM_RC, sum(sp.length for sp in spans), 20.0, spans))
+    return out
+
+def damage(sp: TunnelSpan, severe: bool):
+    sp.data.crack_width = 1.5 if severe else 0.2
+    sp.data.material.rebar_grade = sp.data.leakage_grade = "e" if severe else "a"
+
+def flat_spans(secs: list) -> list:
+    return [(sec, sp) for sec in secs for sp in sec.spans]
+
+def test_start_and_locate_match_prefix_sums():
+    secs = sections()
+    nav, spans = ChainageIndex(secs), flat_spans(secs)
+    starts = list(itertools.accumulate((sp.length for _, sp in spans), initial=0.0))
+    assert nav.n == len(spans)
+    assert [nav.start(i) for i in range(nav.n + 1)] == starts
+    for i in range(nav.n):
+        assert nav.locate(starts[i]) == i                       # 스판 시작점은 그 스판
+        assert nav.locate(starts[i + 1] - 0.01) == i
+    assert nav.locate(nav.total() + 100.0) == nav.n - 1        # 전체 연장 밖은 마지막 스판
+
+def test_set_length_updates_later_chainages():
+    secs = sections(1)
+    nav, spans = ChainageIndex(secs), flat_spans(secs)
+    rnd = random.Random(1)
+    for _ in range(50):
+        i = rnd.randrange(nav.n)
+        spans[i][1].length = rnd.choice([1.0, 5.0, 20.0, 33.3])
+        nav.set_length(i, spans[i][1].length)
+    assert nav.lengths == [sp.length for _, sp in spans]
+    starts = list(itertools.accumulate(nav.lengths, initial=0.0))
+    for i in range(nav.n):
+        assert abs(nav.start(i) - starts[i]) < 1e-9
+        assert nav.locate(starts[i] + 1e-6) == i
+
+def test_position_skips_empty_sections():
+    secs = sections()
+    nav = ChainageIndex(secs)
+    expected = [(k, j) for k, sec in enumerate(secs) for j in range(len(sec.spans))]
+    assert [nav.position(i) for i in range(nav.n)] == expected
+    assert [nav.flat(k, j) for k, j in expected] == list(range(nav.n))
+
+def test_jump_to_worst_follows_regrading():
+    secs = sections(2)
+    nav, spans, system = ChainageIndex(secs), flat_spans(secs), TunnelSafetySystem()
+    def bad():
+        return [i for i, (sec, sp) in enumerate(spans) if system.calculate_span(sp, sec.type)["grade"][0] in "DE"]
+    assert nav.bad == bad() and nav.bad
+    for i in (0, 3, 10, 30, 61):
+        sec, sp = spans[i]
+        damage(sp, i not in nav.bad)
+        nav.set_grade(i, system.calculate_span(sp, sec.type)["grade"])
+    assert nav.bad == bad()
+    for i in range(nav.n):
+        j = bisect.bisect_right(nav.bad, i)
+        assert nav.next_bad(i) == (nav.bad[j] if j < len(nav.bad) else None)
+        assert nav.prev_bad(i) == (nav.bad[bisect.bisect_left(nav.bad, i) - 1] if bisect.bisect_left(nav.bad, i) else None)
+
+def test_shape_change_invalidates_index():
+    secs = sections()
+    nav = ChainageIndex(secs)
+    assert nav.matches(secs)
+    secs[1].spans.append(TunnelSpan(1, 20.0))
+    assert not nav.matches(secs)
+    assert not ChainageIndex(secs).matches(sections())       # 다시 불러온 구간 객체
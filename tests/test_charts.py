@@ -0,0 +1,23 @@
+from tunnel_charts import downsample_runs
+
+def make_strip(grades: str, length: float = 20.0) -> dict:
+    n = len(grades)
+    return dict(start=[i * length for i in range(n)], length=[length] * n, grade=list(grades), f_value=[0.1 * "ABCDE".index(g) for g in grades],
+                sec_label=["Sec 1"] * n, span_no=list(range(1, n + 1)), total=n * length)
+
+def test_span_ending_on_bin_boundary_does_not_mark_next_bin():
+    assert [r[2] for r in downsample_runs(make_strip("EAA"), 3)] == ["E", "A"]
+    assert downsample_runs(make_strip("EAA"), 3)[0][:2] == [0.0, 20.0]
+
+def test_heatmap_keeps_one_hover_point_per_span_when_strip_is_downsampled():
+    from tunnel_master_logic import TunnelSafetySystem, TunnelSection, TunnelSpan, TunnelType
+    from tunnel_charts import build_heatmap, SCREEN_STYLE
+    sec = TunnelSection(1, TunnelType.NATM_RC, 400.0, 10.0, [TunnelSpan(i + 1, 10.0) for i in range(40)])
+    for sp in sec.spans[::2]: sp.data.crack_width = 2.0
+    system = TunnelSafetySystem()
+    for sp in sec.spans: system.calculate_span(sp, sec.type)
+    fig = build_heatmap([sec], SCREEN_STYLE, max_segments=10)
+    bars, hover = fig.data
+    assert len(bars.x) <= 10 and len(hover.x) == 40
+    assert list(hover.customdata[:, 1]) == list(range(1, 41)) and hover.x[0] == 5.0
+    assert list(hover.customdata[:2, 2]) == [sec.spans[0].result_cache['grade'][0], sec.spans[1].result_cache['grade'][0]]
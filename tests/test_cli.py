@@ -0,0 +1,19 @@
+import csv
+import pytest
+from tunnel_master_logic import DataManager, ProjectMetadata, TunnelSection, TunnelSpan, TunnelType
+import tunnel_cli
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_evaluation_includes_uncompacted_autosaves(store_dir, tmp_path, workers):
+    for pid in ("p1", "p2"):
+        p = ProjectMetadata(pid, f"터널 {pid}", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+        p.sections.append(TunnelSection(1, TunnelType.NATM_RC, 40.0, 20.0, [TunnelSpan(i + 1, 20.0) for i in range(2)]))
+        DataManager.save_project(p)
+        sec = p.sections[0]
+        sec.spans[0].data.crack_width = 2.5 # 자동 저장만 하고 아직 압축 전
+        DataManager.record_span_change(p, sec, sec.spans[0])
+    stats = tunnel_cli.run(["p1", "p2"], str(tmp_path / "out"), ["csv"], workers)
+    assert stats["projects"] == 2 and not stats["failed"]
+    with open(tmp_path / "out" / "spans.csv", encoding="utf-8-sig") as f:
+        rows = [r for r in csv.DictReader(f) if r["span_no"] == "1"]
+    assert [float(r["crack_width"]) for r in rows] == [2.5, 2.5]
@@ -0,0 +1,68 @@
+import json
+import os
+import numpy as np
+import pytest
+from tunnel_master_logic import DataManager, GradingCriteria, TunnelType
+
+SPEC = {"version": "2025", "grade_scores": {"a": 0, "b": 2, "c": 5, "d": 9, "e": 14},
+        "crack_limits": {"default": [0.2, 0.4, 0.8, 1.5], "NATM (무근)": [0.3, 0.6, 1.2, 2.4]}, "total_denom": {"개착식 (BOX)": 40}}
+
+@pytest.mark.parametrize("patch", [
+    {"f_bands": [0.15, 0.30, 0.30, 0.75]},                      # 증가하지 않음
+    {"aux_bands": [0.1, 0.2, 0.3]},                             # 개수 부족
+    {"crack_limits": {"default": [0.1, 0.3, 0.5, 1.0], "재래식 (조적)": [1.0, 0.5, 0.3, 0.1]}},
+    {"crack_limits": {"NATM (무근)": [0.1, 0.3, 1.0, 3.0]}},     # default 없음
+    {"grade_scores": {"a": 1, "b": 4, "c": 7, "d": 10}},        # e 점수 없음
+    {"grade_scores": {"a": "하", "b": 4, "c": 7, "d": 10, "e": 13}},
+    {"aux_weights": [1.0, 1.0, 1.02, 1.05]},
+    {"grade_labels": ["우수", "양호", "보통", "미흡", "불량"]},
+])
+def test_invalid_spec_raises_value_error(patch):
+    with pytest.raises(ValueError): GradingCriteria(patch)
+
+def test_key_follows_content_not_identity():
+    a, b = GradingCriteria(SPEC), GradingCriteria(json.loads(json.dumps(SPEC)))
+    assert a.key == b.key and a.key.startswith("2025-")
+    assert GradingCriteria({**SPEC, "f_bands": [0.15, 0.30, 0.55, 0.80]}).key != a.key
+    assert GradingCriteria.default().key != a.key
+    assert GradingCriteria(a.spec).key == a.key # 저장한 spec 을 다시 읽어도 같은 기준
+
+def test_compiled_tables_match_scalar_lookups():
+    c = GradingCriteria(SPEC)
+    assert c.crack_limits[TunnelType.NATM_PLAIN] == (0.3, 0.6, 1.2, 2.4) and c.crack_limits[TunnelType.NATM_RC] == (0.2, 0.4, 0.8, 1.5)
+    assert c.total_denom[TunnelType.OPEN_CUT] == 40.0 and c.total_denom[TunnelType.NATM_RC] == TunnelType.NATM_RC.total_denom
+    values = sorted({v + d for v in np.r_[c.crack_table.ravel(), c.aux_bands, c.f_bands] for d in (-1e-9, 0.0, 1e-9)}) + [0.0, 5.0]
+    for k, t in enumerate(TunnelType):
+        assert c.denom_table[k] == c.total_denom[t]
+        assert [c.crack_code(v, t) for v in values] == (np.array(values)[:, None] > c.crack_table[k]).sum(axis=1).tolist()
+    assert [c.aux_weight(v) for v in values] == c.aux_weight_table[np.searchsorted(c.aux_band_table, values, side='right')].tolist()
+    assert [c.grade_code(v) for v in values] == np.searchsorted(c.f_band_table, values, side='right').tolist()
+    assert c.score_table.tolist() == [0, 2, 5, 9, 14, 0] and c.score("D") == 9 and c.score("x") == 0
+
+def test_affine_only_for_evenly_spaced_scores():
+    assert GradingCriteria.default().affine == (1.0, 3.0)
+    assert GradingCriteria({"grade_scores": {"a": 2, "b": 4, "c": 6, "d": 8, "e": 10}}).affine == (2.0, 2.0)
+    assert GradingCriteria(SPEC).affine is None
+
+def test_zero_denominator_is_guarded():
+    assert GradingCriteria({"total_denom": {"NATM (철근)": 0}}).total_denom[TunnelType.NATM_RC] == 1.0
+
+def test_load_recompiles_only_when_file_changes(tmp_path):
+    path = str(tmp_path / "c.json")
+    with open(path, 'w', encoding='utf-8') as f: json.dump(SPEC, f, ensure_ascii=False)
+    a = GradingCriteria.load(path)
+    assert GradingCriteria.load(path) is a
+    with open(path, 'w', encoding='utf-8') as f: json.dump({**SPEC, "version": "2026"}, f, ensure_ascii=False)
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+    b = GradingCriteria.load(path)
+    assert b is not a and b.version == "2026"
+
+def test_available_lists_saved_criteria_and_skips_broken_files(store_dir, monkeypatch):
+    monkeypatch.setattr(DataManager, "CRITERIA_DIR", str(store_dir / "criteria"))
+    assert list(DataManager.criteria_sets()) == [GradingCriteria.default().key]
+    c = GradingCriteria(SPEC)
+    DataManager.save_criteria(c)
+    with open(os.path.join(DataManager.CRITERIA_DIR, "broken.json"), 'w', encoding='utf-8') as f: f.write('{"f_bands": [1, 0')
+    with open(os.path.join(DataManager.CRITERIA_DIR, "bad.json"), 'w', encoding='utf-8') as f: json.dump({"f_bands": [0.5]}, f)
+    sets = DataManager.criteria_sets()
+    assert sorted(sets) == sorted([GradingCriteria.default().key, c.key]) and sets[c.key].spec == c.spec
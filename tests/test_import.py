@@ -0,0 +1,45 @@
+import io
+import pytest
+from tunnel_master_logic import ProjectMetadata, TunnelSafetySystem, TunnelSection, TunnelSpan, TunnelType
+from tunnel_import import SpanImport
+
+def make_project() -> ProjectMetadata:
+    p = ProjectMetadata("p1", "판교1터널", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+    p.sections.append(TunnelSection(1, TunnelType.NATM_RC, 60.0, 20.0, [TunnelSpan(i + 1, 20.0) for i in range(3)]))
+    p.sections.append(TunnelSection(2, TunnelType.OPEN_CUT, 40.0, 20.0, [TunnelSpan(i + 1, 20.0) for i in range(2)]))
+    return p
+
+def plan_for(p: ProjectMetadata, csv: str):
+    return SpanImport.validate(p, SpanImport.read(io.BytesIO(csv.encode("utf-8")), "m.csv"))
+
+def test_import_then_batch_then_summary_matches_fresh_evaluation():
+    p, system = make_project(), TunnelSafetySystem()
+    before = system.calculate_project_summary(p.sections)
+    plan = plan_for(p, "구간,Span,균열폭(mm),누수,토사유출,철근노출\n1,1,1.5,e,O,e\n1,3,0.8,D,예,\n2,2,,c,,\n")
+    assert plan.ok, plan.errors
+    touched = SpanImport.apply(p, plan)
+    assert [sec.id for sec in touched] == [1, 2]
+    system.calculate_batch(touched) # 앱과 같은 순서: 가져오기 → 바뀐 구간 일괄 재판정 → 요약
+    after = system.calculate_project_summary(p.sections)
+    assert after['final_f'] > before['final_f'] and after['alerts']
+    expected = TunnelSafetySystem().calculate_batch(p.sections, write_cache=False)
+    assert after['final_f'] == pytest.approx(expected['final_f']) and after['alerts'] == expected['alerts']
+    assert [r['result']['grade'] for r in after['span_results']] == [r['result']['grade'] for r in expected['span_results']]
+
+def test_validation_reports_every_bad_row_and_applies_nothing():
+    p = make_project()
+    plan = plan_for(p, "구간,Span,균열폭(mm),누수,토사유출,배수,비고\n1,1,12,a,O,1,x\n1,9,0.1,b,X,0,\nx,1,0.1,b,X,0,\n2,1,0.1,f,maybe,1.5,\n1,2,,,,,\n1,2,,,,,\n")
+    assert not plan.ok and plan.ignored == ["비고"]
+    assert plan.errors == ["2행: 균열폭(mm) 값은 0.0~10.0 범위의 숫자여야 합니다.", "3행: 프로젝트에 없는 구간/스판입니다.",
+                           "4행: 구간/스판 번호가 올바르지 않습니다.", "5행: 누수 등급은 a~e 중 하나여야 합니다.",
+                           "5행: 토사유출 값은 O/X(예/아니오)로 입력하세요.", "5행: 배수 값은 0~4 범위의 정수여야 합니다.",
+                           "6행: 같은 구간/스판이 여러 번 나옵니다.", "7행: 같은 구간/스판이 여러 번 나옵니다."]
+    with pytest.raises(ValueError): SpanImport.apply(p, plan)
+
+def test_blank_cells_keep_existing_values():
+    p = make_project()
+    p.sections[0].spans[0].data.crack_width = 0.4
+    plan = plan_for(p, "구간,Span,균열폭(mm),누수\n1,1,,c\n")
+    SpanImport.apply(p, plan)
+    d = p.sections[0].spans[0].data
+    assert (d.crack_width, d.leakage_grade) == (0.4, "c") and p.sections[0].spans[0].edited
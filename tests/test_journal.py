@@ -0,0 +1,67 @@
+import os
+import pytest
+from tunnel_master_logic import ChangeJournal, DataManager, ProjectMetadata, TunnelSection, TunnelSpan, TunnelType
+
+@pytest.fixture(params=["json", "sqlite"])
+def project(store_dir, monkeypatch, request):
+    monkeypatch.setattr(DataManager, "BACKEND", request.param)
+    p = ProjectMetadata("p1", "판교1터널", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+    p.sections.append(TunnelSection(1, TunnelType.NATM_RC, 60.0, 20.0, [TunnelSpan(i + 1, 20.0) for i in range(3)]))
+    DataManager.save_project(p)
+    return p
+
+def edit(p: ProjectMetadata, j: int, crack: float):
+    sec = p.sections[0]
+    sec.spans[j].data.crack_width = crack
+    DataManager.record_span_change(p, sec, sec.spans[j])
+
+def restart():
+    # 프로세스 재시작: 메모리의 저널 상태(pending, compacted)를 버림
+    DataManager._journals.clear()
+
+def stored_cracks() -> list:
+    return [sp.data.crack_width for sp in DataManager.load_project("p1").sections[0].spans]
+
+def test_recover_replays_journal_left_by_crash(project):
+    edit(project, 0, 0.4)
+    p = DataManager.load_project("p1")
+    p.opinion = "재점검 필요"
+    DataManager.record_project_change(p)
+    assert stored_cracks() == [0.0, 0.0, 0.0] # 압축 전에는 저장본 그대로
+    restart()
+    assert DataManager.recover() == ["p1"]
+    assert stored_cracks() == [0.4, 0.0, 0.0]
+    assert DataManager.load_project("p1").opinion == "재점검 필요"
+    assert not os.path.exists(DataManager.JOURNAL_FILE)
+
+def test_recover_finishes_interrupted_compaction_then_newer_records(project):
+    path = DataManager.JOURNAL_FILE
+    edit(project, 0, 0.4)
+    os.replace(path, path + ".compacting") # 압축 도중 꺼짐: 파일만 옮겨지고 저장소에는 반영 전
+    edit(project, 1, 0.6)
+    restart()
+    assert DataManager.recover() == ["p1", "p1"]
+    assert stored_cracks() == [0.4, 0.6, 0.0]
+    assert not os.path.exists(path) and not os.path.exists(path + ".compacting")
+
+def test_truncated_last_line_is_ignored(project):
+    edit(project, 0, 0.4)
+    edit(project, 1, 0.6)
+    with open(DataManager.JOURNAL_FILE, 'rb+') as f: # 마지막 줄 기록 도중 전원 차단
+        f.truncate(os.path.getsize(DataManager.JOURNAL_FILE) - 10)
+    assert len(ChangeJournal.read(DataManager.JOURNAL_FILE)) == 1
+    restart()
+    DataManager.recover()
+    assert stored_cracks() == [0.4, 0.0, 0.0]
+
+def test_compaction_is_due_by_count_or_interval(tmp_path, monkeypatch):
+    j = ChangeJournal(str(tmp_path / "j.jsonl"))
+    assert not j.due()
+    monkeypatch.setattr(ChangeJournal, "MAX_ENTRIES", 3)
+    for _ in range(2): j.append({"kind": "project", "pid": "p1", "opinion": ""})
+    assert not j.due()
+    j.append({"kind": "project", "pid": "p1", "opinion": ""})
+    assert j.due()
+    j.pending = 1
+    j.last_compact -= ChangeJournal.COMPACT_INTERVAL
+    assert j.due()
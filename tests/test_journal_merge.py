@@ -0,0 +1,164 @@
+import pytest
+from tunnel_master_logic import DataManager, ProjectMetadata, TunnelSection, TunnelSpan, TunnelType
+
+@pytest.fixture(params=["json", "sqlite"])
+def project(store_dir, monkeypatch, request):
+    monkeypatch.setattr(DataManager, "BACKEND", request.param)
+    p = ProjectMetadata("p1", "판교1터널", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+    p.sections.append(TunnelSection(1, TunnelType.NATM_RC, 60.0, 20.0, [TunnelSpan(i + 1, 20.0) for i in range(3)]))
+    DataManager.save_project(p)
+    return p
+
+def edit(p: ProjectMetadata, j: int, crack: float):
+    # 입력 화면의 자동 저장과 같은 경로: 값 변경 → 스판 하나를 저널에 기록
+    sec = p.sections[0]
+    sec.spans[j].data.crack_width = crack
+    p.touch()
+    DataManager.record_span_change(p, sec, sec.spans[j])
+
+def stored_cracks() -> list:
+    return [sp.data.crack_width for sp in DataManager.load_project("p1").sections[0].spans]
+
+def test_journaled_edit_survives_other_tablet_explicit_save(project):
+    a, b = DataManager.load_project("p1"), DataManager.load_project("p1")
+    edit(a, 0, 0.9)
+    edit(b, 1, 0.5)
+    assert DataManager.save_project(b) == []
+    DataManager.compact_journal(force=True)
+    assert stored_cracks() == [0.9, 0.5, 0.0]
+    changed, conflicts = DataManager.sync(a)
+    assert conflicts == []
+    assert [sp.data.crack_width for sp in a.sections[0].spans] == [0.9, 0.5, 0.0]
+
+def test_same_span_edited_on_two_tablets_reports_conflict(project):
+    a, b = DataManager.load_project("p1"), DataManager.load_project("p1")
+    edit(a, 0, 0.9)
+    edit(b, 0, 0.4)
+    DataManager.compact_journal(force=True)
+    assert stored_cracks()[0] == 0.9
+    assert DataManager.sync(a)[1] == []
+    changed, conflicts = DataManager.sync(b)
+    assert changed and len(conflicts) == 1
+    assert b.sections[0].spans[0].data.crack_width == 0.9
+
+def test_journaled_opinion_survives_other_tablet_save(project):
+    a, b = DataManager.load_project("p1"), DataManager.load_project("p1")
+    a.opinion = "A 소견"
+    a.touch("opinion")
+    DataManager.record_project_change(a)
+    edit(b, 1, 0.5)
+    DataManager.save_project(b)
+    DataManager.compact_journal(force=True)
+    assert DataManager.load_project("p1").opinion == "A 소견"
+
+def test_later_explicit_opinion_save_wins_over_older_journal(project):
+    a, b = DataManager.load_project("p1"), DataManager.load_project("p1")
+    a.opinion = "A 소견"
+    a.touch("opinion")
+    DataManager.record_project_change(a)
+    b.opinion = "B 소견"
+    b.touch("opinion")
+    DataManager.save_project(b)
+    DataManager.compact_journal(force=True)
+    assert DataManager.load_project("p1").opinion == "B 소견"
+
+def test_sync_after_own_compaction_keeps_the_copy(project):
+    a = DataManager.load_project("p1")
+    sections = a.sections
+    edit(a, 0, 0.9)
+    a.opinion = "A 소견"
+    a.touch("opinion")
+    DataManager.record_project_change(a)
+    DataManager.compact_journal(force=True)
+    assert DataManager.sync(a) == (False, [])
+    assert a.sections is sections and a.version == DataManager.store().stored_version("p1")
+    # 버전이 맞춰졌으므로 이후 저장도 병합 없이 그대로
+    edit(a, 1, 0.3)
+    assert DataManager.save_project(a) == []
+    assert stored_cracks() == [0.9, 0.3, 0.0]
+    assert DataManager.load_project("p1").opinion == "A 소견"
+
+def test_sync_after_other_tablet_compaction_pulls(project):
+    a, b = DataManager.load_project("p1"), DataManager.load_project("p1")
+    edit(a, 0, 0.9)
+    edit(b, 1, 0.5)
+    DataManager.compact_journal(force=True)
+    changed, conflicts = DataManager.sync(a)
+    assert changed and conflicts == []
+    assert [sp.data.crack_width for sp in a.sections[0].spans] == [0.9, 0.5, 0.0]
+
+def test_sqlite_compaction_updates_only_journaled_rows(store_dir, monkeypatch):
+    import sqlite3
+    monkeypatch.setattr(DataManager, "BACKEND", "sqlite")
+    p = ProjectMetadata("p1", "판교1터널", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+    p.sections.append(TunnelSection(1, TunnelType.NATM_RC, 60.0, 20.0, [TunnelSpan(i + 1, 20.0) for i in range(3)]))
+    DataManager.save_project(p)
+    with sqlite3.connect(DataManager.SQLITE_FILE) as con: # 스판 행 삭제(전체 재기록)를 세는 트리거
+        con.executescript("CREATE TABLE deleted (n INTEGER); CREATE TRIGGER log_delete AFTER DELETE ON spans BEGIN INSERT INTO deleted VALUES (1); END;")
+    a = DataManager.load_project("p1")
+    edit(a, 1, 0.7)
+    DataManager.compact_journal(force=True)
+    assert sqlite3.connect(DataManager.SQLITE_FILE).execute("SELECT COUNT(*) FROM deleted").fetchone()[0] == 0
+    assert stored_cracks() == [0.0, 0.7, 0.0]
+    assert DataManager.sync(a) == (False, [])
+
+def test_delete_project(project):
+    DataManager.delete_project("p1")
+    assert DataManager.load_project("p1") is None and "p1" not in DataManager.load_index()
+
+def test_delete_project_collects_unreferenced_photos(project, monkeypatch):
+    from tunnel_photos import PhotoStore
+    monkeypatch.setattr(DataManager, "PHOTO_GC_MIN_AGE", 0)
+    photos = PhotoStore(DataManager.PHOTO_DIR)
+    kept, journaled, dropped = photos.put(b"kept"), photos.put(b"journaled"), photos.put(b"dropped")
+    p = DataManager.load_project("p1")
+    p.sections[0].spans[0].data.photos.append(kept)
+    DataManager.save_project(p)
+    p.sections[0].spans[1].data.photos.append(journaled) # 아직 압축되지 않은 자동 저장
+    DataManager.record_span_change(p, p.sections[0], p.sections[0].spans[1])
+    other = ProjectMetadata("p2", "판교2터널", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+    other.sections.append(TunnelSection(1, TunnelType.NATM_RC, 20.0, 20.0, [TunnelSpan(1, 20.0)]))
+    other.sections[0].spans[0].data.photos.append(dropped)
+    DataManager.save_project(other)
+    DataManager.delete_project("p2")
+    assert photos.exists(kept) and photos.exists(journaled) and not photos.exists(dropped)
+    assert photos.thumbnail(dropped) is None
+
+def test_reuploaded_photo_is_protected_by_min_age(store_dir):
+    import os
+    from tunnel_photos import PhotoStore
+    photos = PhotoStore(DataManager.PHOTO_DIR)
+    digest = photos.put(b"old")
+    os.utime(photos._path("objects", digest), (0, 0)) # 오래전에 올린 사진
+    photos.put(b"old") # 저장 전 세션에 다시 올림
+    assert photos.collect_garbage(set(), min_age=3600) == [] and photos.exists(digest)
+
+def test_delete_checks_only_its_photos_without_loading_projects(project, monkeypatch):
+    from tunnel_photos import PhotoStore
+    monkeypatch.setattr(DataManager, "PHOTO_GC_MIN_AGE", 0)
+    photos = PhotoStore(DataManager.PHOTO_DIR)
+    shared, own, stray = photos.put(b"shared"), photos.put(b"own"), photos.put(b"stray")
+    p = DataManager.load_project("p1")
+    p.sections[0].spans[0].data.photos.append(shared)
+    DataManager.save_project(p)
+    other = ProjectMetadata("p2", "판교2터널", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+    other.sections.append(TunnelSection(1, TunnelType.NATM_RC, 20.0, 20.0, [TunnelSpan(1, 20.0)]))
+    other.sections[0].spans[0].data.photos.extend([shared, own])
+    DataManager.save_project(other)
+    loads = []
+    store = DataManager.store()
+    monkeypatch.setattr(store, "load_project", lambda pid: loads.append(pid))
+    DataManager.delete_project("p2")
+    assert loads == []
+    assert photos.exists(shared) and not photos.exists(own) and photos.exists(stray) # 다른 사진은 CLI 전체 정리 대상
+
+def test_delete_project_removes_campaign_history(project):
+    from tunnel_history import CampaignHistory
+    history = CampaignHistory()
+    assert history.root == DataManager.HISTORY_DIR
+    history.close_campaign(DataManager.load_project("p1"), "1차")
+    assert len(history.campaigns("p1")) == 1
+    DataManager.delete_project("p1")
+    again = ProjectMetadata("p1", "새 터널", "홍길동", "특급", "(주)다음기술단", "2025-01-01") # 같은 id 재사용
+    DataManager.save_project(again)
+    assert history.campaigns("p1") == []
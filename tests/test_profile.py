@@ -0,0 +1,37 @@
+import threading
+import tunnel_profile as prof
+
+def in_thread(fn):
+    out = []
+    t = threading.Thread(target=lambda: out.append(fn()))
+    t.start(); t.join()
+    return out[0]
+
+def test_run_stopped_on_one_thread_is_closed_by_next_rerun_on_another(monkeypatch):
+    monkeypatch.setattr(prof, "LOG_FILE", "")
+    monkeypatch.setattr(prof, "_open", {})
+    def stopped_run(): # st.stop(): end_run 없이 스크립트 스레드가 끝남
+        prof.begin_run(session="s1")
+        prof.mark("init")
+        prof.count("x")
+    assert in_thread(stopped_run) is None
+    assert in_thread(lambda: prof.begin_run(session="s2")) is None # 다른 세션의 실행은 건드리지 않음
+    prev = in_thread(lambda: prof.begin_run(session="s1"))
+    assert prev["interrupted"] and prev["session"] == "s1" and prev["counters"] == {"x": 1} and "init" in prev["phases"]
+    assert set(prof._open) == {"s1", "s2"}
+
+def test_finished_run_is_not_reported_again(monkeypatch):
+    monkeypatch.setattr(prof, "LOG_FILE", "")
+    monkeypatch.setattr(prof, "_open", {})
+    prof.begin_run(session="s")
+    assert not prof.end_run()["interrupted"]
+    assert prof.begin_run(session="s") is None
+    prof.end_run()
+    assert prof._open == {}
+
+def test_open_runs_are_bounded(monkeypatch):
+    monkeypatch.setattr(prof, "LOG_FILE", "")
+    monkeypatch.setattr(prof, "_open", {})
+    monkeypatch.setattr(prof, "MAX_OPEN", 3)
+    for i in range(5): in_thread(lambda: prof.begin_run(session=f"s{i}"))
+    assert list(prof._open) == ["s2", "s3", "s4"]
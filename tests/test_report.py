@@ -0,0 +1,29 @@
+import pytest
+from tunnel_master_logic import DataManager, ProjectMetadata, TunnelSection, TunnelSpan, TunnelType
+from tunnel_report import build_reports
+
+def save(pid: str) -> ProjectMetadata:
+    p = ProjectMetadata(pid, f"터널 {pid}", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+    p.sections.append(TunnelSection(1, TunnelType.NATM_RC, 40.0, 20.0, [TunnelSpan(i + 1, 20.0) for i in range(2)]))
+    DataManager.save_project(p)
+    return p
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_reports_include_uncompacted_autosaves(store_dir, workers):
+    projects = [save("p1"), save("p2")]
+    for p in projects: # 자동 저장만 하고 아직 압축 전
+        sec = p.sections[0]
+        sec.spans[1].data.crack_width = 7.25
+        DataManager.record_span_change(p, sec, sec.spans[1])
+    results = build_reports(["p1", "p2"], workers=workers)
+    for pid, (path, err) in results.items():
+        assert err is None and path.startswith(DataManager.REPORT_DIR)
+        with open(path, encoding="utf-8") as f: assert "<td>7.25</td>" in f.read()
+
+def test_load_latest_does_not_write_the_store(store_dir):
+    p = save("p1")
+    sec = p.sections[0]
+    sec.spans[0].data.crack_width = 0.9
+    DataManager.record_span_change(p, sec, sec.spans[0])
+    assert DataManager.load_latest("p1").sections[0].spans[0].data.crack_width == 0.9
+    assert DataManager.load_project("p1").sections[0].spans[0].data.crack_width == 0.0
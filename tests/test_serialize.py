@@ -0,0 +1,41 @@
+import copy
+import json
+import random
+from tunnel_master_logic import ProjectMetadata, TunnelSection, TunnelSpan, TunnelType
+
+def make_project(seed: int = 0) -> ProjectMetadata:
+    rnd = random.Random(seed)
+    p = ProjectMetadata("p1", "판교1터널", "홍길동", "특급", "(주)다음기술단", "2024-01-01", opinion="균열 보수 필요", next_section_id=4)
+    for k, t in enumerate([TunnelType.NATM_RC, TunnelType.ASSM_BRICK, TunnelType.OPEN_CUT]):
+        spans = [TunnelSpan(i + 1, rnd.choice([12.5, 20.0]), version=rnd.randrange(10**6)) for i in range(k * 3)]
+        for sp in spans:
+            d = sp.data
+            d.location, d.crack_width, d.leakage_grade, d.soil_leak = rnd.choice(["전구간", "천정부(Arch)"]), rnd.random(), rnd.choice("abcde"), rnd.random() < 0.5
+            d.material.rebar_grade, d.sur_util, d.aux_score = rnd.choice("abcde"), rnd.randrange(5), rnd.random()
+            d.photos = [f"{rnd.getrandbits(64):016x}" for _ in range(rnd.randrange(3))]
+        p.sections.append(TunnelSection(k + 1, t, sum(sp.length for sp in spans), 20.0, spans))
+    return p
+
+def test_compact_and_row_formats_round_trip():
+    p = make_project()
+    for compact in (True, False):
+        raw = json.loads(json.dumps(p.to_dict(compact=compact))) # 실제 저장처럼 JSON 을 거침
+        assert ProjectMetadata.from_dict(raw) == p
+    assert "span_columns" in p.to_dict(compact=True)["sections"][1] and "spans" in p.to_dict()["sections"][1]
+
+def test_from_dict_does_not_mutate_input_or_share_lists():
+    raw = make_project(1).to_dict(compact=True)
+    before = copy.deepcopy(raw)
+    a, b = ProjectMetadata.from_dict(raw), ProjectMetadata.from_dict(raw)
+    assert raw == before
+    a.sections[2].spans[0].data.photos.append("added")
+    assert b.sections[2].spans[0].data.photos == before["sections"][2]["span_columns"]["photos"][0]
+
+def test_missing_columns_and_keys_use_defaults():
+    # 구버전 저장본: 나중에 추가된 열(사진 목록, 버전)과 키가 없음
+    sec = TunnelSection.from_dict({"id": 2, "type": "개착식 (BOX)", "span_columns": {"span_no": [1, 2], "length": [20.0, 20.0], "crack_width": [0.3, 0.0]}})
+    assert [sp.data.crack_width for sp in sec.spans] == [0.3, 0.0]
+    assert all(sp.version == 0 and sp.data.photos == [] and sp.data.leakage_grade == "a" and sp.data.aux_score == 0.1 for sp in sec.spans)
+    assert sec.spans[0].data.photos is not sec.spans[1].data.photos
+    old = ProjectMetadata.from_dict({"id": "p0", "name": "구버전", "sections": [{"spans": [{"span_no": 1, "length": 20.0, "data": {"unknown": 1}}]}]})
+    assert old.opinion == "" and old.sections[0].type == TunnelType.NATM_RC and old.sections[0].spans[0].data.crack_width == 0.0
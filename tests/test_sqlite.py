@@ -0,0 +1,53 @@
+import pytest
+from tunnel_master_logic import DataManager, ProjectMetadata, TunnelSafetySystem, TunnelSection, TunnelSpan, TunnelType
+
+CRACKS = [0.0, 0.2, 0.4, 0.8, 1.5, 3.5]
+
+def make(pid: str, t_type: TunnelType) -> ProjectMetadata:
+    p = ProjectMetadata(pid, f"터널 {pid}", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+    spans = [TunnelSpan(i + 1, 20.0) for i in range(len(CRACKS))]
+    for sp, w in zip(spans, CRACKS):
+        sp.data.crack_width = w
+        sp.data.material.rebar_grade = "e" if w > 1.0 else "a"
+    p.sections.append(TunnelSection(1, t_type, 20.0 * len(spans), 20.0, spans))
+    return p
+
+@pytest.fixture
+def imported(store_dir, monkeypatch):
+    # JSON 저장소에 저장해 둔 뒤 SQLite 로 전환 → 빈 DB 가 JSON 데이터를 자동으로 가져옴
+    for pid, t in (("p1", TunnelType.NATM_RC), ("p2", TunnelType.ASSM_PLAIN)): DataManager.save_project(make(pid, t))
+    json_index = DataManager.load_index()
+    monkeypatch.setattr(DataManager, "BACKEND", "sqlite")
+    return json_index
+
+def rows(backend: str, monkeypatch, **kw) -> list:
+    monkeypatch.setattr(DataManager, "BACKEND", backend)
+    return [(r["project_id"], r["sec_id"], r["span_no"], r["grade"], pytest.approx(r["f_value"])) for r in DataManager.query_spans(**kw)]
+
+def test_empty_sqlite_store_imports_json_projects(imported):
+    assert {pid: (e["name"], e["span_count"]) for pid, e in DataManager.load_index().items()} == \
+           {pid: (e["name"], e["span_count"]) for pid, e in imported.items()}
+    p = DataManager.load_project("p2")
+    assert p.sections[0].type == TunnelType.ASSM_PLAIN
+    assert [sp.data.crack_width for sp in p.sections[0].spans] == CRACKS
+
+@pytest.mark.parametrize("kw", [{}, {"grades": "DE"}, {"grades": ["A"]}, {"min_crack": 0.4}, {"min_crack": 1.0, "project_ids": ["p2"]},
+                                {"grades": "CDE", "project_ids": ["p1"]}, {"project_ids": []}])
+def test_indexed_query_matches_json_scan(imported, monkeypatch, kw):
+    expected = rows("json", monkeypatch, **kw)
+    assert rows("sqlite", monkeypatch, **kw) == expected
+    system = TunnelSafetySystem()
+    for pid, sec_id, span_no, grade, _ in expected:
+        sec = DataManager.load_project(pid).sections[0]
+        assert system.calculate_span(sec.spans[span_no - 1], sec.type)["grade"][0] == grade
+
+def test_compacted_edit_updates_indexed_grade(imported):
+    p = DataManager.load_project("p1")
+    sec = p.sections[0]
+    assert [r["span_no"] for r in DataManager.query_spans(min_crack=5.0)] == []
+    sec.spans[0].data.crack_width = 6.0
+    DataManager.record_span_change(p, sec, sec.spans[0])
+    DataManager.compact_journal(force=True)
+    hit = DataManager.query_spans(min_crack=5.0)
+    assert [(r["project_id"], r["span_no"]) for r in hit] == [("p1", 1)]
+    assert hit[0]["grade"] == TunnelSafetySystem().calculate_span(sec.spans[0], sec.type)["grade"][0]
@@ -0,0 +1,59 @@
+import json
+import os
+import threading
+import pytest
+from tunnel_master_logic import DataManager, JsonStore, ProjectMetadata, TunnelSection, TunnelSpan, TunnelType
+
+def test_concurrent_json_writes_from_threads_do_not_clobber_temp_files(tmp_path):
+    path, errors = str(tmp_path / "index.json"), []
+    def writer(i):
+        try:
+            for _ in range(50): JsonStore._write_json(path, {"writer": i, "pad": "x" * 20000})
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert errors == []
+    with open(path, encoding="utf-8") as f: assert json.load(f)["writer"] in range(8)
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_save_all_projects_deletes_missing_projects_under_their_locks(store_dir, monkeypatch, backend):
+    monkeypatch.setattr(DataManager, "BACKEND", backend)
+    projects = {}
+    for pid in ("p1", "p2", "p3"):
+        p = ProjectMetadata(pid, f"터널 {pid}", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+        p.sections.append(TunnelSection(1, TunnelType.NATM_RC, 20.0, 20.0, [TunnelSpan(1, 20.0)]))
+        DataManager.save_project(p)
+        projects[pid] = p
+    store, locked = DataManager.store(), []
+    lock = store.lock
+    monkeypatch.setattr(store, "lock", lambda name: locked.append(name) or lock(name))
+    del projects["p2"]
+    DataManager.save_all_projects(projects)
+    assert sorted(DataManager.load_index()) == ["p1", "p3"] and DataManager.load_project("p2") is None
+    assert "p2" in locked
+
+def make(pid: str, n_spans: int) -> ProjectMetadata:
+    p = ProjectMetadata(pid, f"터널 {pid}", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+    p.sections.append(TunnelSection(1, TunnelType.NATM_RC, 20.0 * n_spans, 20.0, [TunnelSpan(i + 1, 20.0) for i in range(n_spans)]))
+    p.sections.append(TunnelSection(2, TunnelType.OPEN_CUT, 20.0, 20.0, [TunnelSpan(1, 20.0)]))
+    return p
+
+def test_project_list_reads_only_the_index(store_dir, monkeypatch):
+    for pid, n in (("p1", 3), ("p2", 5)): DataManager.save_project(make(pid, n))
+    def fail(self, pid): raise AssertionError(f"{pid} 파일을 열었습니다")
+    monkeypatch.setattr(JsonStore, "load_raw", fail)
+    index = DataManager.load_index()
+    assert {pid: (e["name"], e["section_count"], e["span_count"]) for pid, e in index.items()} == \
+           {"p1": ("터널 p1", 2, 4), "p2": ("터널 p2", 2, 6)}
+    assert DataManager.store().stored_version("p2") == index["p2"]["version"]
+
+def test_legacy_database_is_split_and_broken_index_rebuilt(store_dir):
+    with open(DataManager.DB_FILE, 'w', encoding='utf-8') as f:
+        json.dump({pid: make(pid, 2).to_dict() for pid in ("p1", "p2")}, f, ensure_ascii=False)
+    assert sorted(DataManager.load_index()) == ["p1", "p2"]
+    assert not os.path.exists(DataManager.DB_FILE) and os.path.exists(DataManager.DB_FILE + ".bak")
+    assert len(DataManager.load_project("p2").sections[0].spans) == 2
+    with open(os.path.join(DataManager.DB_DIR, JsonStore.INDEX_FILE), 'w', encoding='utf-8') as f: f.write('{"p1": ')
+    assert {pid: e["span_count"] for pid, e in DataManager.load_index().items()} == {"p1": 3, "p2": 3}
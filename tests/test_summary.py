@@ -0,0 +1,51 @@
+import random
+import pytest
+from tunnel_master_logic import _SummaryState, TunnelSafetySystem, TunnelSection, TunnelSpan, TunnelType
+
+def make_sections() -> list:
+    return [TunnelSection(k, TunnelType.NATM_RC, 100.0, 20.0, [TunnelSpan(i + 1, 20.0) for i in range(5)]) for k in (1, 2)]
+
+def fresh(sections: list) -> dict:
+    # 새 시스템 + 결과 캐시 없는 상태로 처음부터 판정
+    for sec in sections:
+        for sp in sec.spans: sp.result_key = None
+    return TunnelSafetySystem().calculate_project_summary(sections)
+
+def same(a: dict, b: dict):
+    assert a['final_f'] == pytest.approx(b['final_f']) and a['final_grade'] == b['final_grade']
+    assert a['alerts'] == b['alerts'] and a['total_length'] == pytest.approx(b['total_length'])
+    assert [r['result']['grade'] for r in a['span_results']] == [r['result']['grade'] for r in b['span_results']]
+
+def worsen(span: TunnelSpan):
+    d = span.data
+    d.crack_width, d.leakage_grade, d.soil_leak, d.material.rebar_grade = 1.5, 'e', True, 'e'
+
+@pytest.mark.parametrize("reevaluate", ["span", "batch"])
+def test_summary_picks_up_spans_reevaluated_outside(reevaluate):
+    system, sections = TunnelSafetySystem(), make_sections()
+    system.calculate_project_summary(sections)
+    for sp in sections[0].spans: worsen(sp)
+    if reevaluate == "span":
+        for sp in sections[0].spans: system.calculate_span(sp, sections[0].type)
+    else:
+        system.calculate_batch([sections[0]])
+    summary = system.calculate_project_summary(sections)
+    assert summary['alerts']
+    same(summary, fresh(make_sections_like(sections)))
+
+def make_sections_like(sections: list) -> list:
+    out = make_sections()
+    for a, b in zip(out, sections):
+        for x, y in zip(a.spans, b.spans): x.data, x.length = y.data, y.length
+    return out
+
+def test_running_totals_do_not_drift():
+    system, sections = TunnelSafetySystem(), make_sections()
+    sp = sections[0].spans[0]
+    rng = random.Random(0)
+    for _ in range(_SummaryState.RESUM_EVERY * 16 - 1): # 마지막 호출이 합계를 다시 구하는 차례가 되도록
+        sp.length = rng.uniform(0.001, 1e5) # 크기가 크게 다른 값으로 반복 수정 → 증감만으로는 오차가 쌓임
+        system.calculate_project_summary(sections)
+    sp.length = 20.0
+    summary = system.calculate_project_summary(sections)
+    assert summary['total_length'] == 200.0
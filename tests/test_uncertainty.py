@@ -0,0 +1,60 @@
+from dataclasses import replace
+import numpy as np
+import pytest
+from tunnel_master_logic import BatchEvaluator, GradingCriteria, SpanColumns, TunnelSafetySystem, TunnelSection, TunnelSpan, TunnelType
+from tunnel_uncertainty import Tolerance, UncertaintyEngine
+
+def make_sections(n_per_type: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    sections = []
+    for k, t in enumerate(TunnelType):
+        spans = [TunnelSpan(i + 1, 10.0) for i in range(n_per_type)]
+        for sp in spans:
+            d = sp.data
+            d.crack_width = float(rng.choice([0.0, 0.1, 0.3, 0.5, 1.0, 2.0]))
+            d.leakage_grade, d.breakage_grade = rng.choice(list("abcde"), 2)
+            d.material.spalling_grade, d.material.rebar_grade = rng.choice(list("abcde"), 2)
+            d.aux_score = float(rng.choice([0.1, 0.3, 0.5, 0.9]))
+        sections.append(TunnelSection(k + 1, t, 10.0 * n_per_type, 10.0, spans))
+    return sections
+
+def test_result_does_not_depend_on_worker_count(monkeypatch):
+    monkeypatch.setattr(UncertaintyEngine, "CHUNK_CELLS", 20_000) # 작은 입력으로도 여러 묶음 + 프로세스 풀을 타도록
+    sections = make_sections(400)
+    one = UncertaintyEngine.simulate(sections, Tolerance(), samples=20, seed=7, workers=1)
+    many = UncertaintyEngine.simulate(sections, Tolerance(), samples=20, seed=7, workers=3)
+    assert np.array_equal(one["grade_prob"], many["grade_prob"])
+    assert np.array_equal(one["final_f"], many["final_f"])
+
+def test_zero_tolerance_reproduces_nominal_evaluation():
+    sections = make_sections(50)
+    res = UncertaintyEngine.simulate(sections, Tolerance(crack_width=0.0, material_steps=0), samples=20)
+    assert (res["flip_prob"] == 0).all()
+    summary = TunnelSafetySystem().calculate_batch(sections, write_cache=False)
+    assert res["final_f"] == pytest.approx(np.full(20, summary["final_f"]))
+    assert [r["result"]["f_value"] for r in summary["span_results"]] == pytest.approx(res["nominal_f"].tolist())
+
+def test_grade_probabilities_sum_to_one():
+    res = UncertaintyEngine.simulate(make_sections(30), Tolerance(crack_width=0.2, leakage_steps=1, aux_score=0.1), samples=100, seed=1)
+    assert np.allclose(res["grade_prob"].sum(axis=1), 1.0) and np.isclose(res["final_grade_prob"].sum(), 1.0)
+
+@pytest.mark.parametrize("scores", [None, {"a": 0, "b": 2, "c": 5, "d": 9, "e": 14}], ids=["affine", "general"])
+def test_grade_probabilities_match_brute_force_jitter(scores):
+    # 입력값을 직접 흔들어 BatchEvaluator 로 판정한 빈도와 비교 (알 수 없는 등급은 흔들지 않음)
+    criteria = GradingCriteria({"grade_scores": scores}) if scores else GradingCriteria.default()
+    sections = make_sections(6, seed=3)
+    sections[0].spans[0].data.material.carbonation_grade = ""
+    sections[1].spans[0].data.leakage_grade = "x"
+    tol, samples = Tolerance(crack_width=0.15, material_steps=1, leakage_steps=1, aux_score=0.1), 4000
+    res = UncertaintyEngine.simulate(sections, tol, samples=samples, seed=5, criteria=criteria)
+    cols, rng = SpanColumns.from_sections(sections), np.random.default_rng(11)
+    def grades(g, steps):
+        return np.where((g < 0) | (g > 4), g, np.clip(g + rng.integers(-steps, steps + 1, len(g)), 0, 4)).astype(np.int8)
+    counts = np.zeros((len(cols), 5))
+    for _ in range(samples):
+        jitter = replace(cols, crack_width=cols.crack_width + rng.uniform(-tol.crack_width, tol.crack_width, len(cols)),
+                         aux_score=cols.aux_score + rng.uniform(-tol.aux_score, tol.aux_score, len(cols)),
+                         leakage=grades(cols.leakage, 1), spalling=grades(cols.spalling, 1), efflorescence=grades(cols.efflorescence, 1),
+                         rebar=grades(cols.rebar, 1), carbonation=grades(cols.carbonation, 1))
+        counts[np.arange(len(cols)), BatchEvaluator.evaluate(jitter, criteria)["grade_code"]] += 1
+    assert np.abs(res["grade_prob"] - counts / samples).max() < 0.05
@@ -0,0 +1,27 @@
+from tunnel_master_logic import ProjectMetadata, TunnelSection, TunnelSpan, TunnelType
+from tunnel_undo import EditHistory
+
+def make_history() -> EditHistory:
+    p = ProjectMetadata("p1", "판교1터널", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+    p.sections.append(TunnelSection(1, TunnelType.NATM_RC, 60.0, 20.0, [TunnelSpan(i + 1, 20.0) for i in range(3)]))
+    return EditHistory(p)
+
+def set_crack(h: EditHistory, j: int, crack: float):
+    h.project.sections[0].spans[j].data.crack_width = crack
+    h.record_span(0, j)
+
+def test_revert_span_edited_back_to_base_value_is_noop():
+    h = make_history()
+    set_crack(h, 0, 0.9)
+    set_crack(h, 0, 0.0)
+    steps = len(h.undo_stack)
+    assert h.revert_span(0, 0) is None
+    assert h.revert_section(0) is None
+    assert len(h.undo_stack) == steps
+
+def test_revert_span_restores_base_value():
+    h = make_history()
+    set_crack(h, 1, 0.9)
+    step = h.revert_span(0, 1)
+    assert step is not None and len(step.spans) == 1
+    assert h.project.sections[0].spans[1].data.crack_width == 0.0
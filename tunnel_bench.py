@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+from typing import Dict, List
+from tunnel_master_logic import (TunnelType, MaterialDefects, InspectionData, TunnelSpan, TunnelSection,
+                                 ProjectMetadata, TunnelSafetySystem, DataManager)
+
+# 현장 점검 결과와 비슷한 등급 분포 (대부분 a~b, 드물게 d~e)
+GRADE_WEIGHTS = {'a': 0.55, 'b': 0.25, 'c': 0.12, 'd': 0.06, 'e': 0.02}
+SECTIONS_PER_PROJECT = (1, 6)
+
+def _grade(rng: random.Random) -> str:
+    return rng.choices(list(GRADE_WEIGHTS), weights=list(GRADE_WEIGHTS.values()))[0]
+
+def generate_span(rng: random.Random, span_no: int, unit_length: float) -> TunnelSpan:
+    d = InspectionData(
+        location=rng.choice(["전구간", "천정부(Arch)", "우측벽(Right)", "좌측벽(Left)", "바닥(Invert)"]),
+        crack_width=round(min(rng.lognormvariate(-2.0, 1.0), 5.0), 2),
+        leakage_grade=_grade(rng), breakage_grade=_grade(rng), soil_leak=rng.random() < 0.05,
+        material=MaterialDefects(_grade(rng), _grade(rng), _grade(rng), _grade(rng)),
+        sur_drain=rng.choices(range(5), weights=(60, 20, 10, 7, 3))[0],
+        sur_ground=rng.choices(range(5), weights=(60, 20, 10, 7, 3))[0],
+        aux_score=round(rng.random() * 0.8, 2)
+    )
+    return TunnelSpan(span_no, unit_length, d)
+
+def generate_portfolio(n_projects: int, total_spans: int, seed: int = 42) -> Dict[str, ProjectMetadata]:
+    # 같은 seed 이면 항상 같은 포트폴리오 → 실행 간 비교 가능
+    rng = random.Random(seed)
+    types = list(TunnelType)
+    projects, per_project = {}, max(1, total_spans // n_projects)
+    for i in range(n_projects):
+        pid = f"bench{i:04d}"
+        p = ProjectMetadata(pid, f"벤치터널{i + 1}", "홍길동", "특급", "(주)다음기술단", "2024-01-01")
+        n_secs = rng.randint(*SECTIONS_PER_PROJECT)
+        for k in range(n_secs):
+            t_type = types[(i + k) % len(types)]
+            n = per_project // n_secs + (1 if k < per_project % n_secs else 0)
+            unit = rng.choice([10.0, 12.0, 15.0, 20.0])
+            sec = TunnelSection(k + 1, t_type, unit * n, unit, [generate_span(rng, j + 1, unit) for j in range(n)])
+            p.sections.append(sec)
+        p.next_section_id = n_secs + 1
+        projects[pid] = p
+    return projects
+
+def timeit(fn, repeat: int, setup=None) -> dict:
+    # setup 은 매 실행 전에 호출되며 측정 시간에 포함되지 않음
+    runs = []
+    for _ in range(repeat):
+        if setup: setup()
+        t = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t)
+    return {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+
+def run_benchmarks(n_projects: int, total_spans: int, repeat: int, seed: int) -> dict:
+    projects = generate_portfolio(n_projects, total_spans, seed)
+    all_sections = [sec for p in projects.values() for sec in p.sections]
+    biggest = max(projects.values(), key=lambda p: sum(len(s.spans) for s in p.sections))
+    results = {}
+
+    workdir = tempfile.mkdtemp(prefix="smped_bench_")
+    # 저장 경로(포트폴리오 색인/저널 포함)를 모두 임시 폴더로 → 벤치마크가 실제 데이터 폴더에 파일을 남기지 않음
+    paths = ("DB_DIR", "DB_FILE", "SQLITE_FILE", "JOURNAL_FILE", "PORTFOLIO_DIR", "PHOTO_DIR", "HISTORY_DIR", "REPORT_DIR")
+    old = tuple(getattr(DataManager, k) for k in paths)
+    for k, name in zip(paths, ("db", "legacy.json", "db.sqlite3", "journal.jsonl", "portfolio", "photos", "history", "reports")):
+        setattr(DataManager, k, os.path.join(workdir, name))
+    try:
+        results["save_all_projects"] = timeit(lambda: DataManager.save_all_projects(projects), repeat)
+        results["load_all_projects"] = timeit(DataManager.load_all_projects, repeat)
+        results["save_project(largest)"] = timeit(lambda: DataManager.save_project(biggest), repeat)
+    finally:
+        for k, v in zip(paths, old): setattr(DataManager, k, v)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    def clear_cache():
+        for sec in all_sections:
+            for span in sec.spans: span.result_key = None
+
+    results["calculate_project_summary(cold)"] = timeit(lambda: TunnelSafetySystem().calculate_project_summary(all_sections), repeat, clear_cache)
+    warm = TunnelSafetySystem()
+    warm.calculate_project_summary(all_sections)
+    results["calculate_project_summary(warm)"] = timeit(lambda: warm.calculate_project_summary(all_sections), repeat)
+    results["calculate_batch"] = timeit(lambda: TunnelSafetySystem().calculate_batch(all_sections), repeat, clear_cache)
+
+    try:
+        from tunnel_charts import draw_screen_heatmap, draw_report_heatmap
+        results["draw_screen_heatmap"] = timeit(lambda: draw_screen_heatmap(biggest.sections), repeat)
+        results["draw_report_heatmap"] = timeit(lambda: draw_report_heatmap(biggest.sections), repeat)
+    except ModuleNotFoundError as e:
+        print(f"[skip] heatmap: {e}", file=sys.stderr)
+    try:
+        from tunnel_export import build_excel_bytes
+        summary = TunnelSafetySystem().calculate_project_summary(biggest.sections)
+        results["excel_export"] = timeit(lambda: build_excel_bytes(biggest, summary), repeat)
+    except ModuleNotFoundError as e:
+        print(f"[skip] excel: {e}", file=sys.stderr)
+
+    return {
+        "meta": {
+            "projects": n_projects, "spans": sum(len(s.spans) for s in all_sections), "largest_project_spans": sum(len(s.spans) for s in biggest.sections),
+            "repeat": repeat, "seed": seed, "python": platform.python_version(), "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    # 중앙값 기준 비교. threshold(예: 0.1 = 10%) 이상 느려진 항목을 회귀로 보고
+    regressions = []
+    print(f"{'benchmark':36s} {'baseline':>10s} {'current':>10s} {'ratio':>7s}")
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:36s} {'-':>10s} {cur['median']:10.4f} {'new':>7s}")
+            continue
+        ratio = cur["median"] / base["median"] if base["median"] > 0 else float('inf')
+        flag = " REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:36s} {base['median']:10.4f} {cur['median']:10.4f} {ratio:7.2f}{flag}")
+        if flag: regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="SM-PED Tunnel 성능 벤치마크")
+    ap.add_argument("--projects", type=int, default=10, help="프로젝트 수 (1~500)")
+    ap.add_argument("--spans", type=int, default=20000, help="전체 스판 수 (100~200000)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default="bench_results.json", help="결과 JSON 경로")
+    ap.add_argument("--compare", help="비교할 기준(baseline) 결과 JSON")
+    ap.add_argument("--threshold", type=float, default=0.10, help="회귀 판정 기준 (비율)")
+    args = ap.parse_args(argv)
+
+    current = run_benchmarks(args.projects, args.spans, args.repeat, args.seed)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("spans") != current["meta"]["spans"]:
+            print("[warn] 기준 결과와 스판 수가 다릅니다.", file=sys.stderr)
+        return 1 if compare(current, baseline, args.threshold) else 0
+    for name, r in current["results"].items():
+        print(f"{name:36s} median {r['median']:.4f}s  min {r['min']:.4f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import math
+import numpy as np
+import plotly.graph_objects as go
+from typing import List
+from tunnel_master_logic import TunnelSection
+from tunnel_profile import profiled, count
+
+GRADE_COLORS = {'A': '#2ecc71', 'B': '#3498db', 'C': '#f1c40f', 'D': '#e67e22', 'E': '#e74c3c'}
+GRADE_RANK = {g: i for i, g in enumerate("ABCDE")}
+MAX_SEGMENTS = 1500 # 화면 가로 해상도 수준. 이보다 많은 막대는 눈으로 구분되지 않음
+
+SCREEN_STYLE = dict(
+    line_color='white', detail_hover=True,
+    layout=dict(height=120, margin=dict(l=10, r=10, t=30, b=10), xaxis=dict(title="터널 거리 (m)", showgrid=True), yaxis=dict(showticklabels=False), title=dict(text="[터널 전체 구간별 안전등급 현황도]", font=dict(size=14, color="#002b5c")), plot_bgcolor='rgba(0,0,0,0)')
+)
+REPORT_STYLE = dict(
+    line_color='black', detail_hover=False,
+    layout=dict(height=120, margin=dict(l=10, r=10, t=25, b=10), xaxis=dict(showticklabels=True, title="Distance (m)", color="black", gridcolor="#eee"), yaxis=dict(showticklabels=False, color="black"), title=dict(text="터널 상태 분포도", font=dict(size=14, color="black")), plot_bgcolor='white', paper_bgcolor='white', font=dict(color="black"))
+)
+
+def collect_strip(sections: List[TunnelSection]) -> dict:
+    # 스판별 누적 거리/등급을 열 단위 리스트로 수집
+    start, length, grade, f_value, sec_label, span_no = [], [], [], [], [], []
+    dist = 0.0
+    for sec in sections:
+        label = f"Sec {sec.id} ({sec.type.label})"
+        for span in sec.spans:
+            res = span.result_cache
+            start.append(dist); length.append(span.length)
+            grade.append(res.get('grade', 'A')[0]); f_value.append(res.get('f_value', 0.0))
+            sec_label.append(label); span_no.append(span.span_no)
+            dist += span.length
+    return dict(start=start, length=length, grade=grade, f_value=f_value, sec_label=sec_label, span_no=span_no, total=dist)
+
+def merge_runs(start: list, length: list, grade: list) -> list:
+    # 같은 등급이 연속되는 스판을 하나의 [시작, 끝, 등급, 스판 수] 구간으로 병합
+    runs = []
+    for s, l, g in zip(start, length, grade):
+        if runs and runs[-1][2] == g:
+            runs[-1][1] = s + l
+            runs[-1][3] += 1
+        else:
+            runs.append([s, s + l, g, 1])
+    return runs
+
+def downsample_runs(strip: dict, max_segments: int) -> list:
+    # 거리축을 max_segments 칸으로 나누어 칸마다 가장 나쁜 등급을 표시 (D/E 구간이 묻히지 않도록)
+    total = strip['total']
+    if total <= 0: return merge_runs(strip['start'], strip['length'], strip['grade'])
+    width = total / max_segments
+    bins = [None] * max_segments
+    counts = [0] * max_segments
+    for s, l, g in zip(strip['start'], strip['length'], strip['grade']):
+        first = min(int(s / width), max_segments - 1)
+        # 끝이 칸 경계와 정확히 같으면 다음 칸은 건드리지 않음 (부동소수 오차만큼 넘친 경우도 같은 칸으로)
+        last = max(first, min(math.ceil((s + l) / width - 1e-9) - 1, max_segments - 1)) if l > 0 else first
+        for b in range(first, last + 1):
+            if bins[b] is None or GRADE_RANK.get(g, 0) > GRADE_RANK.get(bins[b], 0): bins[b] = g
+        counts[first] += 1
+    runs = []
+    for b, g in enumerate(bins):
+        if g is None: g = runs[-1][2] if runs else 'A'
+        if runs and runs[-1][2] == g:
+            runs[-1][1] = (b + 1) * width
+            runs[-1][3] += counts[b]
+        else:
+            runs.append([b * width, (b + 1) * width, g, counts[b]])
+    return runs
+
+def hover_points(strip: dict) -> tuple:
+    # 스판마다 상세 hover 마커 하나 (x, customdata). 상태 띠는 칸으로 줄여도 확대하면 스판 단위로 hover 가능
+    # (plotly 검증 비용을 줄이기 위해 리스트 대신 numpy 배열. Scattergl 은 10^5 개 점도 WebGL 로 그림)
+    n = len(strip['start'])
+    customdata = np.empty((n, 4), dtype=object)
+    customdata[:, 0], customdata[:, 1], customdata[:, 2], customdata[:, 3] = strip['sec_label'], strip['span_no'], strip['grade'], strip['f_value']
+    return np.asarray(strip['start'], dtype=float) + np.asarray(strip['length'], dtype=float) / 2, customdata
+
+@profiled("build_heatmap")
+def build_heatmap(sections: List[TunnelSection], style: dict, max_segments: int = MAX_SEGMENTS):
+    strip = collect_strip(sections)
+    if not strip['start']: return None
+    runs = merge_runs(strip['start'], strip['length'], strip['grade'])
+    if len(runs) > max_segments: runs = downsample_runs(strip, max_segments)
+    count("heatmap.segments", len(runs))
+
+    fig = go.Figure()
+    # 상태 띠는 색상 배열을 가진 단일 Bar 트레이스로 구성
+    fig.add_trace(go.Bar(
+        x=[r[1] - r[0] for r in runs], y=["Status"] * len(runs), base=[r[0] for r in runs], orientation='h',
+        marker=dict(color=[GRADE_COLORS.get(r[2], '#ccc') for r in runs], line=dict(color=style['line_color'], width=1)),
+        customdata=[[r[2], r[3]] for r in runs],
+        hovertemplate="%{base:.1f} ~ %{x:.1f}m 구간<br>등급: %{customdata[0]} (스판 %{customdata[1]}개)<extra></extra>",
+        hoverinfo='skip' if style['detail_hover'] else None, showlegend=False
+    ))
+    if style['detail_hover']:
+        # 스판별 상세 정보는 투명 WebGL 마커로 제공 → 확대하면 스판 단위로 hover 가능
+        x, customdata = hover_points(strip)
+        fig.add_trace(go.Scattergl(
+            x=x, y=np.full(len(x), "Status", dtype=object),
+            mode='markers', marker=dict(size=18, opacity=0),
+            customdata=customdata,
+            hovertemplate="<b>%{customdata[0]}</b><br>Span No.%{customdata[1]}<br>등급: %{customdata[2]}<br>F: %{customdata[3]:.4f}<extra></extra>",
+            showlegend=False
+        ))
+    fig.update_layout(barmode='overlay', **style['layout'])
+    return fig
+
+def draw_report_heatmap(sections: List[TunnelSection]):
+    return build_heatmap(sections, REPORT_STYLE)
+
+def draw_screen_heatmap(sections: List[TunnelSection]):
+    return build_heatmap(sections, SCREEN_STYLE)
+
+@profiled("build_heatmap_svg")
+def build_heatmap_svg(sections: List[TunnelSection], width: int = 1000, height: int = 36, max_segments: int = MAX_SEGMENTS) -> str:
+    # 오프라인 보고서용 정적 상태 띠 (SVG 문자열). plotly/브라우저 스크립트 없이 PDF 변환기에서도 그대로 표시됨
+    strip = collect_strip(sections)
+    if not strip['start'] or strip['total'] <= 0: return ""
+    runs = merge_runs(strip['start'], strip['length'], strip['grade'])
+    if len(runs) > max_segments: runs = downsample_runs(strip, max_segments)
+    scale = width / strip['total']
+    bars = "".join(f'<rect x="{r[0] * scale:.2f}" y="0" width="{max((r[1] - r[0]) * scale, 0.5):.2f}" height="{height}" fill="{GRADE_COLORS.get(r[2], "#ccc")}"/>'
+                   for r in runs)
+    # 거리 눈금 5칸 + 구간 경계선
+    ticks = "".join(f'<line x1="{x:.2f}" y1="{height}" x2="{x:.2f}" y2="{height + 4}" stroke="black"/>'
+                    f'<text x="{x:.2f}" y="{height + 16}" font-size="10" text-anchor="{a}">{strip["total"] * k / 4:,.0f} m</text>'
+                    for k, x, a in ((k, width * k / 4, ("start", "middle", "middle", "middle", "end")[k]) for k in range(5)))
+    bounds, dist = "", 0.0
+    for sec in sections[:-1]:
+        dist += sum(sp.length for sp in sec.spans)
+        bounds += f'<line x1="{dist * scale:.2f}" y1="0" x2="{dist * scale:.2f}" y2="{height}" stroke="black" stroke-dasharray="3,2"/>'
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height + 20}" viewBox="0 0 {width} {height + 20}">'
+            f'{bars}<rect x="0" y="0" width="{width}" height="{height}" fill="none" stroke="black"/>{bounds}{ticks}</svg>')
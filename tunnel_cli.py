@@ -0,0 +1,170 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+from tunnel_master_logic import (TunnelType, DataManager, SpanColumns, BatchEvaluator, GradingCriteria)
+
+SUMMARY_FIELDS = ["project_id", "name", "inspector", "date_str", "sections", "spans", "total_length",
+                  "final_f", "final_grade", "grade_A", "grade_B", "grade_C", "grade_D", "grade_E", "alerts"]
+SPAN_FIELDS = ["project_id", "sec_id", "type", "span_no", "length",
+               "crack_width", "leakage_grade", "breakage_grade", "soil_leak",
+               "spalling_grade", "efflorescence_grade", "rebar_grade", "carbonation_grade",
+               "sur_drain", "sur_ground", "sur_portal", "sur_util", "sur_special", "aux_score",
+               "lining", "surround", "w", "f_value", "grade", "alerts"]
+ALERT_FIELDS = ["project_id", "sec_id", "span_no", "alert"]
+
+def evaluate_project(pid: str, criteria_path: str = None) -> Optional[dict]:
+    # 작업 프로세스에서 프로젝트 하나를 읽어 배열 연산으로 평가 (프로젝트당 한 번만 로드)
+    # 아직 압축되지 않은 자동 저장까지 반영 → 화면과 같은 결과. 기준 파일은 프로세스마다 한 번만 컴파일 (GradingCriteria.load 캐시)
+    p = DataManager.load_latest(pid)
+    if p is None: return None
+    criteria = GradingCriteria.load(criteria_path) if criteria_path else GradingCriteria.default()
+    meta, keys = SpanColumns.collect(p.sections)
+    types = list(TunnelType)
+    spans, alerts = [], []
+    hist = [0] * 5
+    final_f = 0.0
+    if meta:
+        r = BatchEvaluator.evaluate(SpanColumns.from_rows(meta, keys), criteria)
+        cols = [r[k].tolist() for k in ("lining", "surround", "w", "f_value", "grade_code", "alert_crack", "alert_rebar", "alert_soil")]
+        for (sec_id, span_no, tc, length), k, (lining, surround, w, f, gc, a1, a2, a3) in zip(meta, keys, zip(*cols)):
+            msgs = [m for m, on in zip(BatchEvaluator.ALERT_MSGS, (a1, a2, a3)) if on]
+            grade = criteria.grade_labels[gc]
+            hist[gc] += 1
+            spans.append([pid, sec_id, types[tc].label, span_no, length, k[0], k[1], k[2], k[3], k[4], k[5], k[6], k[7],
+                          k[8], k[9], k[10], k[11], k[12], k[13], lining, surround, w, f, grade, " / ".join(msgs)])
+            alerts.extend([pid, sec_id, span_no, m] for m in msgs)
+        total_len = sum(m[3] for m in meta)
+        final_f = sum(f * m[3] for f, m in zip(cols[3], meta)) / total_len if total_len > 0 else 0
+    else:
+        total_len = 0.0
+    summary = [pid, p.name, p.inspector, p.date_str, len(p.sections), len(meta), total_len,
+               final_f, criteria.grade_label(final_f), *hist, len(alerts)]
+    return {"summary": summary, "spans": spans, "alerts": alerts}
+
+class _CsvSink:
+    def __init__(self, out_dir: str):
+        self.files = {k: open(os.path.join(out_dir, f"{k}.csv"), 'w', newline='', encoding='utf-8-sig') for k in ("summary", "spans", "alerts")}
+        self.writers = {k: csv.writer(f) for k, f in self.files.items()}
+        for k, fields in (("summary", SUMMARY_FIELDS), ("spans", SPAN_FIELDS), ("alerts", ALERT_FIELDS)): self.writers[k].writerow(fields)
+
+    def write(self, kind: str, rows: list): self.writers[kind].writerows(rows)
+
+    def close(self):
+        for f in self.files.values(): f.close()
+
+class _JsonSink:
+    # 결과를 모아 두지 않고 배열 원소를 바로 파일에 씀
+    def __init__(self, out_dir: str):
+        self.fields = {"summary": SUMMARY_FIELDS, "spans": SPAN_FIELDS, "alerts": ALERT_FIELDS}
+        self.files = {k: open(os.path.join(out_dir, f"{k}.json"), 'w', encoding='utf-8') for k in self.fields}
+        self.first = dict.fromkeys(self.fields, True)
+        for f in self.files.values(): f.write("[")
+
+    def write(self, kind: str, rows: list):
+        f, fields = self.files[kind], self.fields[kind]
+        for row in rows:
+            f.write(("\n" if self.first[kind] else ",\n") + json.dumps(dict(zip(fields, row)), ensure_ascii=False))
+            self.first[kind] = False
+
+    def close(self):
+        for f in self.files.values():
+            f.write("\n]")
+            f.close()
+
+class _ExcelSink:
+    # constant_memory 모드: 행을 쓰는 즉시 디스크로 내보냄
+    def __init__(self, out_dir: str):
+        import xlsxwriter
+        self.wb = xlsxwriter.Workbook(os.path.join(out_dir, "results.xlsx"), {'constant_memory': True})
+        self.sheets, self.rows = {}, {}
+        for k, title, fields in (("summary", "요약", SUMMARY_FIELDS), ("spans", "스판", SPAN_FIELDS), ("alerts", "경보", ALERT_FIELDS)):
+            self.sheets[k] = self.wb.add_worksheet(title)
+            self.sheets[k].write_row(0, 0, fields)
+            self.rows[k] = 1
+
+    def write(self, kind: str, rows: list):
+        ws = self.sheets[kind]
+        for row in rows:
+            ws.write_row(self.rows[kind], 0, row)
+            self.rows[kind] += 1
+
+    def close(self): self.wb.close()
+
+SINKS = {"csv": _CsvSink, "json": _JsonSink, "xlsx": _ExcelSink}
+
+def select_projects(index: dict, ids: List[str] = None, name: str = None) -> List[str]:
+    pids = [pid for pid in index if not ids or pid in ids]
+    if name: pids = [pid for pid in pids if name in index[pid].get('name', '')]
+    return pids
+
+def run(pids: List[str], out_dir: str, formats: List[str], workers: int, criteria_path: str = None) -> dict:
+    os.makedirs(out_dir, exist_ok=True)
+    sinks = [SINKS[f](out_dir) for f in formats]
+    config = DataManager.config() # 작업 프로세스에서도 부모와 같은 저장소/저널을 보도록 설정 복사
+    done, n_spans, failed = 0, 0, []
+    t0 = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=DataManager.configure, initargs=(config,)) as pool:
+            futures = {pool.submit(evaluate_project, pid, criteria_path): pid for pid in pids}
+            for fut in as_completed(futures):
+                res = fut.result()
+                if res is None:
+                    failed.append(futures[fut])
+                    continue
+                for sink in sinks:
+                    sink.write("summary", [res["summary"]])
+                    sink.write("spans", res["spans"])
+                    sink.write("alerts", res["alerts"])
+                done += 1
+                n_spans += len(res["spans"])
+    finally:
+        for sink in sinks: sink.close()
+    elapsed = time.perf_counter() - t0
+    return {"projects": done, "spans": n_spans, "failed": failed, "seconds": elapsed}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="SM-PED Tunnel 일괄 평가 (Streamlit 없이 전체/일부 프로젝트 재평가)")
+    ap.add_argument("--project", action="append", dest="projects", help="평가할 프로젝트 id (여러 번 지정 가능, 생략 시 전체)")
+    ap.add_argument("--name", help="시설물명에 이 문자열이 포함된 프로젝트만")
+    ap.add_argument("--backend", choices=["json", "sqlite"], default=DataManager.BACKEND)
+    ap.add_argument("--db-dir", default=DataManager.DB_DIR, help="JSON 저장소 경로")
+    ap.add_argument("--sqlite", default=DataManager.SQLITE_FILE, help="SQLite 파일 경로")
+    ap.add_argument("--journal", default=DataManager.JOURNAL_FILE, help="자동 저장 저널 경로 (압축 전 변경도 반영)")
+    ap.add_argument("--out", default="smped_results", help="결과 폴더")
+    ap.add_argument("--format", action="append", choices=list(SINKS), dest="formats", help="출력 형식 (기본 csv)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="작업 프로세스 수")
+    ap.add_argument("--criteria", help="판정 기준 파일 (JSON, 생략 시 기본 기준)")
+    ap.add_argument("--photo-dir", default=DataManager.PHOTO_DIR, help="사진 저장소 경로")
+    ap.add_argument("--gc-photos", action="store_true", help="평가 대신 어느 스판도 참조하지 않는 사진 정리")
+    args = ap.parse_args(argv)
+
+    DataManager.BACKEND, DataManager.DB_DIR, DataManager.SQLITE_FILE, DataManager.JOURNAL_FILE = args.backend, args.db_dir, args.sqlite, args.journal
+    DataManager.PHOTO_DIR = args.photo_dir
+    if args.gc_photos:
+        print(f"참조되지 않는 사진 {len(DataManager.collect_photos())}장 정리 → {args.photo_dir}")
+        return 0
+    index = DataManager.load_index()
+    # 큰 프로젝트부터 제출해 마지막에 한 프로세스만 오래 도는 일을 줄임
+    pids = sorted(select_projects(index, args.projects, args.name), key=lambda pid: -index[pid].get('span_count', 0))
+    if not pids:
+        print("평가할 프로젝트가 없습니다.", file=sys.stderr)
+        return 1
+    if args.criteria:
+        try:
+            print(f"판정 기준: {GradingCriteria.load(args.criteria).key}")
+        except (OSError, ValueError) as e:
+            print(f"기준 파일 오류: {e}", file=sys.stderr)
+            return 1
+    stats = run(pids, args.out, args.formats or ["csv"], max(1, args.workers or 1), args.criteria)
+    print(f"{stats['projects']}개 프로젝트 / {stats['spans']}개 스판 평가 완료: {stats['seconds']:.2f}s "
+          f"({stats['spans'] / stats['seconds'] if stats['seconds'] > 0 else 0:.0f} spans/s) → {args.out}")
+    if stats['failed']: print(f"읽기 실패: {', '.join(stats['failed'])}", file=sys.stderr)
+    return 0 if not stats['failed'] else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
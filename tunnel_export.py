@@ -0,0 +1,100 @@
+import re
+from io import BytesIO
+from tunnel_master_logic import ProjectMetadata
+from tunnel_profile import profiled
+
+# (머리글, 열 너비, 값 추출 함수) – 스판 결과(span_results 원소) 한 건을 한 행으로
+SPAN_COLUMNS = [
+    ("구간", 6, lambda s: s['sec_id']),
+    ("형식", 14, lambda s: s['type']),
+    ("Span", 6, lambda s: s['span_no']),
+    ("길이(m)", 8, lambda s: s['length']),
+    ("손상위치", 12, lambda s: s['data'].location),
+    ("균열폭(mm)", 9, lambda s: s['data'].crack_width),
+    ("누수", 5, lambda s: s['data'].leakage_grade),
+    ("파손/손상", 8, lambda s: s['data'].breakage_grade),
+    ("토사유출", 8, lambda s: "O" if s['data'].soil_leak else ""),
+    ("박리/박락", 8, lambda s: s['data'].material.spalling_grade),
+    ("백태", 5, lambda s: s['data'].material.efflorescence_grade),
+    ("철근노출", 8, lambda s: s['data'].material.rebar_grade),
+    ("탄산화", 6, lambda s: s['data'].material.carbonation_grade),
+    ("재질열화(최대)", 10, lambda s: s['data'].material.get_worst_grade()),
+    ("배수", 5, lambda s: s['data'].sur_drain),
+    ("지반", 5, lambda s: s['data'].sur_ground),
+    ("갱문", 5, lambda s: s['data'].sur_portal),
+    ("설비", 5, lambda s: s['data'].sur_util),
+    ("특수", 5, lambda s: s['data'].sur_special),
+    ("부대시설(f)", 9, lambda s: s['data'].aux_score),
+    ("라이닝 합계", 9, lambda s: s['result']['details']['lining']),
+    ("주변상태 합계", 10, lambda s: s['result']['details']['surround']),
+    ("가중치(w)", 8, lambda s: s['result']['details']['w']),
+    ("결함지수(F)", 10, lambda s: s['result']['f_value']),
+    ("안전등급", 9, lambda s: s['result']['grade']),
+    ("경보", 40, lambda s: " / ".join(s['result']['alerts'])),
+    ("사진", 6, lambda s: len(s['data'].photos)),
+]
+F_COL = [c[0] for c in SPAN_COLUMNS].index("결함지수(F)")
+
+def _sheet_name(name: str, used: set) -> str:
+    # 엑셀 시트 이름 규칙: 31자 이하, []:*?/\ 불가, 중복 불가
+    base = re.sub(r'[\[\]:*?/\\]', '', name)[:31] or "Sheet"
+    out, i = base, 2
+    while out.lower() in used:
+        out = f"{base[:28]}~{i}"
+        i += 1
+    used.add(out.lower())
+    return out
+
+@profiled("excel_export")
+def write_project_excel(project: ProjectMetadata, summary: dict, out):
+    # constant_memory 모드로 행을 바로 써 내려감 (중간 DataFrame 없음). 전체 시트 + 구간별 시트를 한 번에 순회하며 작성
+    import xlsxwriter
+    wb = xlsxwriter.Workbook(out, {'constant_memory': True})
+    head = wb.add_format({'bold': True, 'bg_color': '#f8f9fa', 'border': 1})
+    f_fmt = wb.add_format({'num_format': '0.0000'})
+    used = set()
+
+    ws = wb.add_worksheet(_sheet_name("요약", used))
+    info = [("시설물명", project.name), ("점검일자", project.date_str), ("점검자", project.inspector),
+            ("소속", f"{project.company} ({project.position})"), ("총 연장(m)", summary['total_length']),
+            ("구간 수", len(project.sections)), ("스판 수", len(summary['span_results'])),
+            ("종합 결함지수(F)", summary['final_f']), ("종합 안전등급", summary['final_grade']),
+            ("경보 수", len(summary['alerts'])), ("점검자 소견", project.opinion)]
+    ws.set_column(0, 0, 16)
+    ws.set_column(1, 1, 60)
+    for r, (k, v) in enumerate(info):
+        ws.write(r, 0, k, head)
+        ws.write(r, 1, v)
+
+    def new_span_sheet(title):
+        sheet = wb.add_worksheet(_sheet_name(title, used))
+        for c, (h, width, _) in enumerate(SPAN_COLUMNS):
+            sheet.set_column(c, c, width, f_fmt if c == F_COL else None) # F 표시 형식은 열 서식으로 (셀마다 다시 쓰지 않음)
+            sheet.write(0, c, h, head)
+        sheet.freeze_panes(1, 0)
+        return sheet
+
+    all_ws = new_span_sheet("전체")
+    sec_ws = {}
+    for sec in project.sections:
+        sec_ws[sec.id] = [new_span_sheet(f"Sec {sec.id} {sec.type.label}"), 1]
+    getters = [g for _, _, g in SPAN_COLUMNS]
+    for r, s in enumerate(summary['span_results'], start=1):
+        row = [g(s) for g in getters]
+        all_ws.write_row(r, 0, row)
+        target = sec_ws.get(s['sec_id'])
+        if target:
+            target[0].write_row(target[1], 0, row)
+            target[1] += 1
+
+    if summary['alerts']:
+        aws = wb.add_worksheet(_sheet_name("경보", used))
+        aws.set_column(0, 0, 60)
+        aws.write(0, 0, "경보 내역", head)
+        for r, msg in enumerate(summary['alerts'], start=1): aws.write(r, 0, msg)
+    wb.close()
+
+def build_excel_bytes(project: ProjectMetadata, summary: dict) -> bytes:
+    out = BytesIO()
+    write_project_excel(project, summary, out)
+    return out.getvalue()
@@ -0,0 +1,175 @@
+import os
+import json
+from datetime import date
+from typing import List, Optional
+import numpy as np
+from tunnel_master_logic import TunnelType, TunnelSection, ProjectMetadata, SpanColumns, BatchEvaluator, WriteLock, DataManager
+from tunnel_profile import profiled
+
+class CampaignHistory:
+    # 터널(프로젝트)별 점검 회차 이력. 회차를 마감할 때 직전 회차 대비 바뀐 스판만 한 줄(JSONL)로 덧붙임
+    # → 변경 없는 스판은 저장 비용이 없고, 회차 n 의 상태는 1~n 회차 변경분을 차례로 덮어써서 복원
+    COLUMNS = [name for name, _ in TunnelSection.SPAN_COLUMNS if name != "version"] # version 은 동시 편집용 토큰이라 제외
+    EVAL = slice(3, 17) # COLUMNS 중 eval_key 에 해당하는 열 (crack_width ~ aux_score)
+    SLOPE_LIMIT = 0.05 # 연간 F 증가량이 이보다 크면 '악화 중'으로 표시
+
+    def __init__(self, root: str = None):
+        self.root = root or DataManager.HISTORY_DIR # 저장 위치는 다른 저장소와 함께 DataManager 설정을 따름
+
+    def _path(self, pid: str) -> str:
+        return os.path.join(self.root, f"{pid}.jsonl")
+
+    def lock(self, pid: str) -> WriteLock:
+        return WriteLock.get(os.path.join(self.root, "locks", f"{pid}.lock"))
+
+    def delete(self, pid: str):
+        with self.lock(pid):
+            try:
+                os.remove(self._path(pid))
+            except FileNotFoundError:
+                pass
+
+    def campaigns(self, pid: str) -> List[dict]:
+        records = []
+        try:
+            with open(self._path(pid), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue # [안전장치] 기록 도중 꺼져서 잘린 마지막 줄은 무시
+        except FileNotFoundError:
+            pass
+        return records
+
+    @staticmethod
+    def _rows(project: ProjectMetadata) -> dict:
+        # (구간 id, 구간 내 순번) → COLUMNS 순서의 값 튜플 (사진 목록은 비교를 위해 튜플로)
+        rows = {}
+        for sec in project.sections:
+            cols = sec.span_columns()
+            cols['photos'] = [tuple(p) for p in cols['photos']]
+            for i, row in enumerate(zip(*(cols[name] for name in CampaignHistory.COLUMNS))):
+                rows[(sec.id, i)] = row
+        return rows
+
+    @staticmethod
+    def replay(records: List[dict]) -> tuple:
+        # 변경분을 차례로 적용해 마지막 회차의 (구간 헤더, 스판 행) 복원
+        sections, rows = [], {}
+        for rec in records:
+            sections = rec['sections']
+            cols = rec['columns']
+            if 'photos' in cols: cols = dict(cols, photos=[tuple(p) for p in cols['photos']])
+            for k, row in zip(rec['keys'], zip(*(cols[name] for name in CampaignHistory.COLUMNS))):
+                rows[tuple(k)] = row
+            # 삭제된 구간/스판 정리
+            counts = {s['id']: s['span_count'] for s in sections}
+            rows = {k: v for k, v in rows.items() if k[1] < counts.get(k[0], 0)}
+        return sections, rows
+
+    @profiled("CampaignHistory.close")
+    def close_campaign(self, project: ProjectMetadata, label: str = "") -> dict:
+        # 현재 점검 내용을 한 회차로 마감. 직전 회차와 다른 스판(형식이 바뀐 구간은 전체)만 기록
+        with self.lock(project.id):
+            records = self.campaigns(project.id)
+            prev_sections, prev = self.replay(records)
+            prev_types = {s['id']: s['type'] for s in prev_sections}
+            cur = self._rows(project)
+            types = {sec.id: sec.type.label for sec in project.sections}
+            changed = [k for k, row in cur.items() if prev.get(k) != row or prev_types.get(k[0]) != types[k[0]]]
+            rec = {
+                "no": len(records) + 1, "label": label or project.date_str, "date_str": project.date_str,
+                "inspector": project.inspector, "opinion": project.opinion,
+                "sections": [{"id": sec.id, "type": sec.type.label, "total_length": sec.total_length,
+                              "unit_length": sec.unit_length, "span_count": len(sec.spans)} for sec in project.sections],
+                "keys": [list(k) for k in changed],
+                "columns": {name: [cur[k][j] for k in changed] for j, name in enumerate(self.COLUMNS)},
+            }
+            os.makedirs(self.root, exist_ok=True)
+            with open(self._path(project.id), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(rec, ensure_ascii=False, separators=(',', ':')) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        return rec
+
+    @staticmethod
+    def _years(records: List[dict], extra: List[str]) -> np.ndarray:
+        # 회차 날짜를 연 단위 실수로. 날짜를 읽을 수 없으면 회차 순번 사용
+        try:
+            days = [date.fromisoformat(d).toordinal() for d in [r['date_str'] for r in records] + extra]
+            return (np.array(days, dtype=np.float64) - days[0]) / 365.25
+        except (ValueError, IndexError):
+            return np.arange(len(records) + len(extra), dtype=np.float64)
+
+    @profiled("CampaignHistory.trend")
+    def trend(self, project: ProjectMetadata, include_current: bool = True, slope_limit: float = SLOPE_LIMIT) -> Optional[dict]:
+        # 회차 × 스판 F/등급 행렬과 스판별 추세. 회차마다 바뀐 행만 모아 한 번에 배열 판정하고 앞 회차 값으로 채움
+        records = self.campaigns(project.id)
+        keys = [(sec.id, i) for sec in project.sections for i in range(len(sec.spans))]
+        if not keys or not records and not include_current: return None
+        col = {k: j for j, k in enumerate(keys)}
+        n, c_all = len(keys), len(records) + include_current
+        type_idx = {t: i for i, t in enumerate(TunnelType)}
+
+        meta, evals, pos_c, pos_j = [], [], [], []
+        exists = np.zeros((c_all, n), dtype=bool)
+        sec_of = np.array([k[0] for k in keys], dtype=np.int64)
+        seq_of = np.array([k[1] for k in keys], dtype=np.int64)
+        for c, rec in enumerate(records):
+            tc = {s['id']: type_idx[TunnelType.from_label(s['type'])] for s in rec['sections']}
+            counts = {s['id']: s['span_count'] for s in rec['sections']}
+            exists[c] = seq_of < np.array([counts.get(s, 0) for s in sec_of.tolist()], dtype=np.int64)
+            cols = rec['columns']
+            for k, row in zip(rec['keys'], zip(*(cols[name] for name in self.COLUMNS))):
+                j = col.get((k[0], k[1]))
+                if j is None: continue
+                meta.append((k[0], row[0], tc[k[0]], row[1]))
+                evals.append(row[self.EVAL])
+                pos_c.append(c)
+                pos_j.append(j)
+
+        f = np.full((c_all, n), np.nan)
+        length = np.full((c_all, n), np.nan)
+        grade = np.full((c_all, n), -1, dtype=np.int8)
+        if meta:
+            r = BatchEvaluator.evaluate(SpanColumns.from_rows(meta, evals))
+            f[pos_c, pos_j] = r['f_value']
+            grade[pos_c, pos_j] = r['grade_code']
+            length[pos_c, pos_j] = [m[3] for m in meta]
+        if include_current:
+            cols = SpanColumns.from_sections(project.sections)
+            r = BatchEvaluator.evaluate(cols)
+            f[-1], grade[-1], length[-1], exists[-1] = r['f_value'], r['grade_code'], cols.length, True
+
+        # 앞 회차 값으로 채우기 (변경분에 없는 스판 = 직전 값 유지), 해당 회차에 없던 스판은 비움
+        filled = np.where(~np.isnan(f), np.arange(c_all)[:, None], 0)
+        np.maximum.accumulate(filled, axis=0, out=filled)
+        cols_idx = np.arange(n)
+        f, grade, length = f[filled, cols_idx], grade[filled, cols_idx], length[filled, cols_idx]
+        f[~exists], length[~exists] = np.nan, np.nan
+        grade[~exists] = -1
+
+        t = self._years(records, [project.date_str] if include_current else [])
+        mask = ~np.isnan(f)
+        cnt = mask.sum(axis=0)
+        t2 = np.where(mask, t[:, None], 0.0)
+        t_mean = t2.sum(axis=0) / np.maximum(cnt, 1)
+        f_mean = np.nansum(f, axis=0) / np.maximum(cnt, 1)
+        dt = np.where(mask, t[:, None] - t_mean, 0.0)
+        var = (dt ** 2).sum(axis=0)
+        slope = np.where(var > 0, (dt * np.where(mask, f - f_mean, 0.0)).sum(axis=0) / np.where(var > 0, var, 1), 0.0)
+        worsened = (grade[-1] > grade[-2]) & (grade[-2] >= 0) if c_all > 1 else np.zeros(n, dtype=bool)
+        flagged = np.flatnonzero(worsened | (slope > slope_limit))
+        flagged = flagged[np.argsort(-slope[flagged], kind='stable')]
+
+        weighted = np.nansum(f * length, axis=1)
+        total = np.nansum(length, axis=1)
+        labels = [r.get('label') or r['date_str'] for r in records] + (["현재"] if include_current else [])
+        return {
+            "labels": labels, "years": t, "keys": keys,
+            "span_no": [sp.span_no for sec in project.sections for sp in sec.spans],
+            "f": f, "grade": grade, "final_f": np.divide(weighted, total, out=np.zeros(c_all), where=total > 0),
+            "slope": slope, "worsened": worsened, "flagged": flagged,
+            "changed": [len(r['keys']) for r in records],
+        }
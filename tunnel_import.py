@@ -0,0 +1,154 @@
+from dataclasses import dataclass, field
+from typing import List
+import numpy as np
+import pandas as pd
+from tunnel_master_logic import ProjectMetadata, TunnelSection, MaterialDefects
+from tunnel_profile import profiled
+
+LOCATIONS = ["전구간", "천정부(Arch)", "우측벽(Right)", "좌측벽(Left)", "바닥(Invert)"]
+GRADES = list("abcde")
+TRUE_WORDS = {"o", "y", "yes", "true", "1", "예", "있음", "유"}
+FALSE_WORDS = {"x", "n", "no", "false", "0", "아니오", "없음", "무"}
+
+@dataclass
+class ImportPlan:
+    # 검증을 마친 가져오기 내용. frame: (구간 위치, 스판 위치) + 필드 열 (빈 칸 = 기존 값 유지)
+    frame: pd.DataFrame
+    fields: List[str]
+    errors: List[str] = field(default_factory=list)
+    ignored: List[str] = field(default_factory=list) # 매핑되지 않은 머리글
+
+    @property
+    def ok(self) -> bool: return not self.errors and len(self.frame) > 0
+
+class SpanImport:
+    # 스캔 장비/외주 측정 결과(CSV·엑셀)를 구간 번호 + 스판 번호로 기존 스판에 일괄 반영
+    # 머리글은 엑셀 내보내기(tunnel_export)와 같은 한글 이름 또는 필드 이름을 받음 → 내보낸 파일을 고쳐서 다시 가져올 수 있음
+    KEYS = {"sec": ("구간", "sec_id", "section"), "span": ("Span", "스판", "span_no", "span")}
+    # 필드 → (머리글 별칭, 종류, 허용 범위)
+    FIELDS = {
+        "location": (("손상위치", "location"), "choice", LOCATIONS),
+        "crack_width": (("균열폭(mm)", "균열폭", "crack_width"), "float", (0.0, 10.0)),
+        "leakage_grade": (("누수", "leakage", "leakage_grade"), "grade", None),
+        "breakage_grade": (("파손/손상", "파손", "breakage", "breakage_grade"), "grade", None),
+        "soil_leak": (("토사유출", "soil_leak"), "bool", None),
+        "spalling_grade": (("박리/박락", "박리", "spalling", "spalling_grade"), "grade", None),
+        "efflorescence_grade": (("백태", "efflorescence", "efflorescence_grade"), "grade", None),
+        "rebar_grade": (("철근노출", "rebar", "rebar_grade"), "grade", None),
+        "carbonation_grade": (("탄산화", "carbonation", "carbonation_grade"), "grade", None),
+        "sur_drain": (("배수", "sur_drain"), "int", (0, 4)),
+        "sur_ground": (("지반", "sur_ground"), "int", (0, 4)),
+        "sur_portal": (("갱문", "sur_portal"), "int", (0, 4)),
+        "sur_util": (("설비", "sur_util"), "int", (0, 4)),
+        "sur_special": (("특수", "sur_special"), "int", (0, 4)),
+        "aux_score": (("부대시설(f)", "부대시설", "aux_score"), "float", (0.0, 1.0)),
+    }
+    MATERIAL_FIELDS = set(MaterialDefects.__slots__)
+    MAX_ERRORS = 200 # 화면에 보여 줄 오류 행 수 상한
+
+    @staticmethod
+    def read(data, filename: str) -> pd.DataFrame:
+        # 모든 열을 문자열로 읽고 형 변환은 validate 에서 열 단위로 처리
+        if filename.lower().endswith((".xlsx", ".xls")): return pd.read_excel(data, dtype=str)
+        return pd.read_csv(data, dtype=str, encoding="utf-8-sig")
+
+    @staticmethod
+    def _match(df: pd.DataFrame, aliases: tuple):
+        norm = {str(c).strip().lower(): c for c in df.columns}
+        for a in aliases:
+            if a.lower() in norm: return norm[a.lower()]
+        return None
+
+    @staticmethod
+    @profiled("SpanImport.validate")
+    def validate(project: ProjectMetadata, raw: pd.DataFrame) -> ImportPlan:
+        # 열 단위 배열 검증 (행마다 파이썬 분기 없음). 오류가 한 건이라도 있으면 적용하지 않음
+        errors = []
+        sec_col, span_col = (SpanImport._match(raw, SpanImport.KEYS[k]) for k in ("sec", "span"))
+        if sec_col is None or span_col is None:
+            return ImportPlan(pd.DataFrame(), [], ["'구간'과 'Span' 열이 필요합니다."])
+        row_no = pd.Series(np.arange(len(raw)) + 2, index=raw.index) # 엑셀 기준 행 번호 (1행 = 머리글)
+        def report(bad: pd.Series, msg: str):
+            for r in row_no[bad].tolist(): errors.append(f"{r}행: {msg}")
+
+        out = pd.DataFrame(index=raw.index)
+        sec_id = pd.to_numeric(raw[sec_col], errors='coerce')
+        span_no = pd.to_numeric(raw[span_col], errors='coerce')
+        bad_key = sec_id.isna() | span_no.isna() | (sec_id % 1 != 0) | (span_no % 1 != 0)
+        report(bad_key, "구간/스판 번호가 올바르지 않습니다.")
+
+        # 프로젝트의 (구간 id, 스판 번호) → (구간 위치, 스판 위치) 표와 병합
+        keys = pd.DataFrame([(sec.id, sp.span_no, k, j) for k, sec in enumerate(project.sections) for j, sp in enumerate(sec.spans)],
+                            columns=["sec_id", "span_no", "sec_pos", "span_pos"])
+        keys = keys.drop_duplicates(["sec_id", "span_no"])
+        probe = pd.DataFrame({"sec_id": sec_id.fillna(-1).astype(np.int64), "span_no": span_no.fillna(-1).astype(np.int64)}, index=raw.index)
+        hit = probe.reset_index().merge(keys, on=["sec_id", "span_no"], how="left").set_index("index")
+        missing = hit["sec_pos"].isna() & ~bad_key
+        report(missing, "프로젝트에 없는 구간/스판입니다.")
+        dup = probe.duplicated(keep=False) & ~bad_key & ~missing
+        report(dup, "같은 구간/스판이 여러 번 나옵니다.")
+        out["sec_pos"], out["span_pos"] = hit["sec_pos"], hit["span_pos"]
+
+        fields, used = [], {sec_col, span_col}
+        for name, (aliases, kind, allowed) in SpanImport.FIELDS.items():
+            col = SpanImport._match(raw, aliases)
+            if col is None: continue
+            used.add(col)
+            fields.append(name)
+            text = raw[col].astype("string").str.strip()
+            blank = text.isna() | (text == "")
+            label = aliases[0]
+            if kind == "grade":
+                val = text.str.lower()
+                bad = ~blank & ~val.isin(GRADES)
+                report(bad, f"{label} 등급은 a~e 중 하나여야 합니다.")
+                out[name] = val.where(~blank)
+            elif kind == "choice":
+                bad = ~blank & ~text.isin(allowed)
+                report(bad, f"{label} 값은 {', '.join(allowed)} 중 하나여야 합니다.")
+                out[name] = text.where(~blank)
+            elif kind == "bool":
+                val = text.str.lower()
+                yes, no = val.isin(TRUE_WORDS), val.isin(FALSE_WORDS)
+                report(~blank & ~yes & ~no, f"{label} 값은 O/X(예/아니오)로 입력하세요.")
+                out[name] = yes.astype(object).where(~blank)
+            else:
+                num = pd.to_numeric(text, errors='coerce')
+                lo, hi = allowed
+                bad = ~blank & (num.isna() | (num < lo) | (num > hi) | ((num % 1 != 0) if kind == "int" else False))
+                report(bad, f"{label} 값은 {lo}~{hi} 범위의 {'정수' if kind == 'int' else '숫자'}여야 합니다.")
+                out[name] = num.where(~blank)
+        if not fields: errors.append("반영할 측정값 열이 없습니다.")
+        ignored = [str(c) for c in raw.columns if c not in used]
+        # 오류 메시지를 행 번호 순으로
+        errors.sort(key=lambda m: int(m.split("행", 1)[0]) if m[0].isdigit() else 0)
+        return ImportPlan(out, fields, errors, ignored)
+
+    @staticmethod
+    @profiled("SpanImport.apply")
+    def apply(project: ProjectMetadata, plan: ImportPlan) -> List[TunnelSection]:
+        # 검증된 값을 메모리의 프로젝트에 한 번에 반영 (저장·재판정은 호출 측에서 한 번씩). 값이 실제로 바뀐 스판만 수정 표시
+        # 반환: 스판이 바뀐 구간 목록 (일괄 재판정 대상)
+        if not plan.ok: raise ValueError("검증 오류가 있는 가져오기는 적용할 수 없습니다.")
+        frame = plan.frame
+        cols = [frame[name].tolist() for name in plan.fields]
+        targets = [(name, name in SpanImport.MATERIAL_FIELDS, SpanImport.FIELDS[name][1]) for name in plan.fields]
+        touched = {}
+        for k, j, *values in zip(frame["sec_pos"].astype(int).tolist(), frame["span_pos"].astype(int).tolist(), *cols):
+            sec = project.sections[k]
+            span = sec.spans[j]
+            changed = False
+            for (name, material, kind), v in zip(targets, values):
+                if v is None or v is pd.NA or (isinstance(v, float) and np.isnan(v)): continue
+                if kind == "int": v = int(v)
+                elif kind == "float": v = float(v)
+                elif kind == "bool": v = bool(v)
+                obj = span.data.material if material else span.data
+                if getattr(obj, name) != v:
+                    setattr(obj, name, v)
+                    changed = True
+            if changed:
+                span.edited = True
+                touched[sec.id] = sec
+        if touched: project.touch()
+        return list(touched.values())
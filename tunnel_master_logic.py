@@ -1,11 +1,29 @@
 import sys
+import os
 import json
-from dataclasses import dataclass, field, asdict
-from typing import List, Dict
+import math
+import itertools
+import bisect
+import hashlib
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable, List, Dict, Optional
 from enum import Enum
+import numpy as np
+from tunnel_profile import profiled, count
+
+try:
+    import fcntl
+except ModuleNotFoundError: # Windows: 프로세스 간 잠금 없이 같은 서버 내 세션끼리만 잠금
+    fcntl = None
 
 sys.stdout.reconfigure(encoding='utf-8')
 
+_REVISION_SEQ = itertools.count(1) # 프로세스 전역 증가값 → 다시 불러온 프로젝트와도 revision 이 겹치지 않음
+
 class TunnelType(Enum):
     ASSM_BRICK = ("재래식 (조적)", 26, 33)
     ASSM_PLAIN = ("재래식 (무근)", 27, 34)
@@ -25,7 +43,7 @@ class TunnelType(Enum):
             if t.label == label: return t
         return TunnelType.NATM_RC
 
-@dataclass
+@dataclass(slots=True)
 class MaterialDefects:
     spalling_grade: str = 'a'
     efflorescence_grade: str = 'a'
@@ -33,9 +51,19 @@ class MaterialDefects:
     carbonation_grade: str = 'a'
     
     def get_worst_grade(self) -> str:
-        return max([self.spalling_grade, self.efflorescence_grade, self.rebar_grade, self.carbonation_grade])
+        # 대소문자 섞인 구버전/가져온 데이터도 같은 순서로 비교 (BatchEvaluator 코드와 일치)
+        return max([self.spalling_grade.lower(), self.efflorescence_grade.lower(), self.rebar_grade.lower(), self.carbonation_grade.lower()])
 
-@dataclass
+    def to_dict(self) -> dict:
+        return {"spalling_grade": self.spalling_grade, "efflorescence_grade": self.efflorescence_grade,
+                "rebar_grade": self.rebar_grade, "carbonation_grade": self.carbonation_grade}
+
+    @staticmethod
+    def from_dict(d: dict) -> 'MaterialDefects':
+        g = d.get
+        return MaterialDefects(g('spalling_grade', 'a'), g('efflorescence_grade', 'a'), g('rebar_grade', 'a'), g('carbonation_grade', 'a'))
+
+@dataclass(slots=True)
 class InspectionData:
     location: str = "전구간"
     crack_width: float = 0.0
@@ -50,33 +78,57 @@ class InspectionData:
     sur_special: int = 0
     aux_score: float = 0.1
     photo_name: str = ""
+    photos: List[str] = field(default_factory=list) # PhotoStore 해시 목록 (사진 본문은 DB에 넣지 않음)
+
+    def to_dict(self) -> dict:
+        return {
+            "location": self.location, "crack_width": self.crack_width, "leakage_grade": self.leakage_grade,
+            "breakage_grade": self.breakage_grade, "soil_leak": self.soil_leak, "material": self.material.to_dict(),
+            "sur_drain": self.sur_drain, "sur_ground": self.sur_ground, "sur_portal": self.sur_portal,
+            "sur_util": self.sur_util, "sur_special": self.sur_special, "aux_score": self.aux_score,
+            "photo_name": self.photo_name, "photos": list(self.photos)
+        }
 
     @staticmethod
     def from_dict(d):
-        # [안전장치] 키가 없어도 기본값 {} 처리
-        mat_data = d.pop('material', {})
-        # [안전장치] 과거 데이터에 없는 필드가 있어도 에러 안 나게 처리
-        valid_keys = InspectionData.__annotations__.keys()
-        filtered_d = {k: v for k, v in d.items() if k in valid_keys}
-        
-        obj = InspectionData(**filtered_d)
-        obj.material = MaterialDefects(**mat_data)
-        return obj
+        # 입력 dict 는 수정하지 않음
+        # [안전장치] 없는 키는 기본값, 과거/미래 데이터의 모르는 키는 무시
+        g = d.get
+        return InspectionData(
+            g('location', "전구간"), g('crack_width', 0.0), g('leakage_grade', 'a'), g('breakage_grade', 'a'), g('soil_leak', False),
+            MaterialDefects.from_dict(g('material') or {}),
+            g('sur_drain', 0), g('sur_ground', 0), g('sur_portal', 0), g('sur_util', 0), g('sur_special', 0),
+            g('aux_score', 0.1), g('photo_name', ""), list(g('photos') or ())
+        )
 
-@dataclass
+    def eval_key(self) -> tuple:
+        # 판정 결과에 영향을 주는 값만 모은 키 (위치/사진 등은 제외)
+        m = self.material
+        return (self.crack_width, self.leakage_grade, self.breakage_grade, self.soil_leak,
+                m.spalling_grade, m.efflorescence_grade, m.rebar_grade, m.carbonation_grade,
+                self.sur_drain, self.sur_ground, self.sur_portal, self.sur_util, self.sur_special, self.aux_score)
+
+@dataclass(slots=True)
 class TunnelSpan:
     span_no: int
     length: float
     data: InspectionData = field(default_factory=InspectionData)
-    result_cache: dict = field(default_factory=dict)
+    result_cache: dict = field(default_factory=dict) # 파생값 (저장하지 않음)
+    result_key: tuple = field(default=None, repr=False, compare=False) # result_cache 계산 당시의 (형식, 입력값, 판정 기준) 키
+    version: int = 0 # 이 스판을 마지막으로 저장한 쓰기의 토큰 (낙관적 동시성 검사용)
+    edited: bool = field(default=False, repr=False, compare=False) # 아직 저장/저널에 반영되지 않은 수정 (메모리 전용)
+
+    def to_dict(self):
+        return {"span_no": self.span_no, "length": self.length, "data": self.data.to_dict(), "version": self.version}
+
+    def is_dirty(self, t_type: 'TunnelType', criteria_key: str = None) -> bool:
+        if criteria_key is None: criteria_key = GradingCriteria.default().key
+        return not self.result_cache or self.result_key != (t_type, self.data.eval_key(), criteria_key)
 
-    def to_dict(self): return asdict(self)
     @staticmethod
     def from_dict(d):
-        data_dict = d.pop('data', {})
-        obj = TunnelSpan(**d)
-        obj.data = InspectionData.from_dict(data_dict)
-        return obj
+        # 구버전 파일의 result_cache 는 무시 (열 때 다시 계산)
+        return TunnelSpan(d['span_no'], d['length'], InspectionData.from_dict(d.get('data') or {}), version=d.get('version', 0))
 
 @dataclass
 class TunnelSection:
@@ -86,25 +138,54 @@ class TunnelSection:
     unit_length: float
     spans: List[TunnelSpan] = field(default_factory=list)
 
-    def to_dict(self):
-        d = asdict(self)
-        d['type'] = self.type.label
-        d['spans'] = [s.to_dict() for s in self.spans]
+    # compact 저장 형식의 열 이름과 기본값 (스판마다 키를 반복하지 않고 열 단위 리스트로 저장)
+    SPAN_COLUMNS = (
+        ("span_no", None), ("length", None), ("location", "전구간"), ("crack_width", 0.0), ("leakage_grade", 'a'),
+        ("breakage_grade", 'a'), ("soil_leak", False), ("spalling_grade", 'a'), ("efflorescence_grade", 'a'),
+        ("rebar_grade", 'a'), ("carbonation_grade", 'a'), ("sur_drain", 0), ("sur_ground", 0), ("sur_portal", 0),
+        ("sur_util", 0), ("sur_special", 0), ("aux_score", 0.1), ("photo_name", ""), ("photos", ()), ("version", 0)
+    )
+
+    def span_columns(self) -> dict:
+        rows = [(sp.span_no, sp.length, d.location, d.crack_width, d.leakage_grade, d.breakage_grade, d.soil_leak,
+                 m.spalling_grade, m.efflorescence_grade, m.rebar_grade, m.carbonation_grade,
+                 d.sur_drain, d.sur_ground, d.sur_portal, d.sur_util, d.sur_special, d.aux_score, d.photo_name, d.photos, sp.version)
+                for sp in self.spans for d in (sp.data,) for m in (d.material,)]
+        cols = list(zip(*rows)) or [()] * len(self.SPAN_COLUMNS)
+        return {name: list(col) for (name, _), col in zip(self.SPAN_COLUMNS, cols)}
+
+    def to_dict(self, compact: bool = False):
+        d = {"id": self.id, "type": self.type.label, "total_length": self.total_length, "unit_length": self.unit_length}
+        if compact: d['span_columns'] = self.span_columns()
+        else: d['spans'] = [s.to_dict() for s in self.spans]
         return d
 
+    @staticmethod
+    def spans_from_columns(c: dict) -> List[TunnelSpan]:
+        n = len(c.get('span_no', ()))
+        cols = [c.get(name) or [default] * n for name, default in TunnelSection.SPAN_COLUMNS]
+        return [
+            TunnelSpan(no, length, InspectionData(loc, cw, lg, bg, soil, MaterialDefects(sp, ef, rb, cb),
+                                                  sd, sg, spo, su, ss, aux, pn, list(ph)), version=ver)
+            for no, length, loc, cw, lg, bg, soil, sp, ef, rb, cb, sd, sg, spo, su, ss, aux, pn, ph, ver in zip(*cols)
+        ]
+
     @staticmethod
     def from_dict(d):
-        t_label = d.pop('type', "NATM (철근)")
-        spans_data = d.pop('spans', [])
+        # 입력 dict 는 수정하지 않음. 행 형식('spans')과 compact 열 형식('span_columns') 모두 읽음
         # [안전장치] unit_length가 없을 경우 기본값 20.0
-        obj = TunnelSection(
+        if 'span_columns' in d:
+            spans = TunnelSection.spans_from_columns(d['span_columns'])
+        else:
+            span_from_dict = TunnelSpan.from_dict
+            spans = [span_from_dict(s) for s in d.get('spans', ())]
+        return TunnelSection(
             id=d.get('id', 1), 
             total_length=d.get('total_length', 100.0), 
             unit_length=d.get('unit_length', 20.0), 
-            type=TunnelType.from_label(t_label)
+            type=TunnelType.from_label(d.get('type', "NATM (철근)")),
+            spans=spans
         )
-        obj.spans = [TunnelSpan.from_dict(s) for s in spans_data]
-        return obj
 
 @dataclass
 class ProjectMetadata:
@@ -117,135 +198,1101 @@ class ProjectMetadata:
     opinion: str = ""
     sections: List[TunnelSection] = field(default_factory=list)
     next_section_id: int = 1
+    journal_seq: int = 0 # 소견(opinion)을 마지막으로 바꾼 쓰기 번호 (저널 번호 또는 저장 토큰). 소견 저널 기록은 이보다 새로울 때만 적용
+    version: int = 0 # 마지막 저장 토큰. 저장소 값과 다르면 다른 태블릿이 그 사이에 저장한 것
+    structure_version: int = 0 # 구간 구성(추가/삭제/길이 일괄 변경)을 마지막으로 바꾼 저장 토큰
+    revision: int = field(default_factory=lambda: next(_REVISION_SEQ), repr=False, compare=False) # 메모리 전용 (저장 안 함)
+    edited_fields: set = field(default_factory=set, repr=False, compare=False) # 저장 전 수정한 프로젝트 단위 항목 ("opinion", "structure")
+    session: str = field(default_factory=lambda: uuid.uuid4().hex, repr=False, compare=False) # 불러온 사본마다 고유 (저널 충돌 통지용)
 
-    def to_dict(self):
+    def touch(self, *edited: str):
+        # 프로젝트/구간/스판 데이터를 바꾼 뒤 호출 → revision 기반 캐시 무효화. edited: 저장 시 병합할 프로젝트 단위 항목
+        self.revision = next(_REVISION_SEQ)
+        self.edited_fields.update(edited)
+
+    def to_dict(self, compact: bool = False):
+        # compact=True: 저장소용 열 형식 / False: 구버전과 같은 행 형식 (내보내기용)
         return {
             "id": self.id, "name": self.name, "inspector": self.inspector,
             "position": self.position, "company": self.company, "date_str": self.date_str,
-            "opinion": self.opinion, "next_section_id": self.next_section_id,
-            "sections": [s.to_dict() for s in self.sections]
+            "opinion": self.opinion, "next_section_id": self.next_section_id, "journal_seq": self.journal_seq,
+            "version": self.version, "structure_version": self.structure_version,
+            "sections": [s.to_dict(compact) for s in self.sections]
         }
 
     @staticmethod
     def from_dict(d):
-        secs = [TunnelSection.from_dict(s) for s in d.pop('sections', [])]
+        secs = [TunnelSection.from_dict(s) for s in d.get('sections', ())]
         # [안전장치] opinion 필드가 없는 구버전 데이터 호환
         obj = ProjectMetadata(
             id=d.get('id', ''), name=d.get('name', ''), inspector=d.get('inspector', ''),
             position=d.get('position', ''), company=d.get('company', ''), date_str=d.get('date_str', ''),
-            opinion=d.get('opinion', ''), next_section_id=d.get('next_section_id', 1)
+            opinion=d.get('opinion', ''), next_section_id=d.get('next_section_id', 1), journal_seq=d.get('journal_seq', 0),
+            version=d.get('version', 0), structure_version=d.get('structure_version', 0)
         )
         obj.sections = secs
         return obj
 
+class RevisionCache:
+    # (프로젝트 id, revision, 종류) 키의 LRU 캐시. 요약/그림/표처럼 데이터에서 파생된 값을 보관
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get_or_build(self, project: ProjectMetadata, kind, builder):
+        key = (project.id, project.revision, kind)
+        if key in self._data:
+            count("cache.hit")
+            self._data.move_to_end(key)
+            return self._data[key]
+        count("cache.miss")
+        value = builder()
+        # 같은 프로젝트/종류의 이전 revision 항목은 다시 쓰일 일이 없으므로 바로 제거
+        for k in [k for k in self._data if k[0] == key[0] and k[2] == kind]: del self._data[k]
+        self._data[key] = value
+        while len(self._data) > self.maxsize: self._data.popitem(last=False)
+        return value
+
+    def peek(self, project: ProjectMetadata, kind):
+        # 만들지 않고 현재 revision 의 값만 조회 (없으면 None)
+        return self._data.get((project.id, project.revision, kind))
+
+    def clear(self): self._data.clear()
+
+class WriteLock:
+    # 저장소 쓰기 잠금. 같은 서버의 세션(스레드)끼리는 RLock, 다른 프로세스(CLI 등)와는 lock 파일 flock 으로 직렬화
+    # 같은 스레드에서 중첩 진입 가능 (저널 압축 → save_project)
+    _registry = {}
+    _guard = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._fh = None
+
+    @classmethod
+    def get(cls, path: str) -> 'WriteLock':
+        path = os.path.abspath(path)
+        with cls._guard:
+            if path not in cls._registry: cls._registry[path] = cls(path)
+            return cls._registry[path]
+
+    def __enter__(self):
+        self._rlock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._fh = open(self.path, 'a')
+                if fcntl is not None: fcntl.flock(self._fh, fcntl.LOCK_EX)
+            except BaseException:
+                if self._fh is not None: self._fh.close()
+                self._fh = None
+                self._rlock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None: fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+        self._rlock.release()
+
+class ProjectMerge:
+    # 여러 태블릿이 같은 프로젝트를 편집할 때의 스판 단위 병합 (낙관적 버전 검사)
+    # - 스판: 내가 수정한 스판만 유지하고 나머지는 저장소 최신본으로 교체. 같은 스판을 양쪽이 고쳤으면 먼저 저장한 쪽 우선
+    # - 구간 구성: 기준 구성(structure_version)이 같을 때만 내 변경 반영, 다르면 최신 구성을 따름
+    # - 소견(opinion): 내가 고쳤으면 내 값 (마지막 저장 우선)
+    @staticmethod
+    def pull(mine: ProjectMetadata, stored: ProjectMetadata) -> List[str]:
+        conflicts = []
+        lost = lambda sec_id, sp: conflicts.append(f"[Sec {sec_id}-No.{sp.span_no}] 다른 태블릿에서 먼저 저장한 내용으로 대체되었습니다.")
+        if "structure" in mine.edited_fields and stored.structure_version != mine.structure_version:
+            conflicts.append("구간 구성 변경이 다른 태블릿의 구성 변경과 겹쳐 반영되지 않았습니다. 최신 구성을 확인 후 다시 적용하세요.")
+            mine.edited_fields.discard("structure")
+        stored_spans = {(sec.id, i): sp for sec in stored.sections for i, sp in enumerate(sec.spans)}
+        if "structure" in mine.edited_fields:
+            # 내 구간 구성을 유지하고 스판 내용만 최신본 반영
+            for sec in mine.sections:
+                for i, sp in enumerate(sec.spans):
+                    s = stored_spans.get((sec.id, i))
+                    if s is None or s.version == sp.version: continue
+                    if sp.edited: lost(sec.id, sp)
+                    sec.spans[i] = s
+        else:
+            # 최신 구성을 따르고, 내가 수정한 스판 중 기준 버전이 그대로인 것만 옮겨 심음
+            stored_secs = {sec.id: sec for sec in stored.sections}
+            for sec in mine.sections:
+                for i, sp in enumerate(sec.spans):
+                    if not sp.edited: continue
+                    s = stored_spans.get((sec.id, i))
+                    if s is None or s.version != sp.version: lost(sec.id, sp)
+                    else: stored_secs[sec.id].spans[i] = sp
+            mine.sections, mine.next_section_id, mine.structure_version = stored.sections, stored.next_section_id, stored.structure_version
+        if "opinion" not in mine.edited_fields: mine.opinion, mine.journal_seq = stored.opinion, stored.journal_seq
+        mine.version = stored.version
+        mine.touch()
+        return conflicts
+
+    @staticmethod
+    def rebase(store, project: ProjectMetadata) -> Optional[List[str]]:
+        # 잠금 안에서 호출. 저장소 버전이 내 기준 버전과 같으면 None (병합 불필요), 다르면 최신본을 읽어 병합
+        current = store.stored_version(project.id)
+        if current is None or current == project.version: return None
+        stored = store.load_project(project.id)
+        return ProjectMerge.pull(project, stored) if stored is not None else None
+
+    @staticmethod
+    def stamp(project: ProjectMetadata) -> int:
+        # 쓰기 직전: 수정한 스판/구성에 새 토큰 부여
+        token = time.time_ns()
+        for sec in project.sections:
+            for sp in sec.spans:
+                if sp.edited:
+                    sp.version = token
+                    sp.edited = False
+        if "structure" in project.edited_fields: project.structure_version = token
+        if "opinion" in project.edited_fields: project.journal_seq = token
+        project.edited_fields.clear()
+        project.version = token
+        return token
+
+class JsonStore:
+    # 프로젝트별 JSON 분할 저장소 (기본 엔진)
+    INDEX_FILE = "index.json"
+
+    def __init__(self, root: str, legacy_file: str = None):
+        self.root = root
+        self.legacy_file = legacy_file
+
+    def _project_path(self, pid: str) -> str:
+        return os.path.join(self.root, "projects", f"{pid}.json")
+
+    def _index_path(self) -> str:
+        return os.path.join(self.root, self.INDEX_FILE)
+
+    def lock(self, name: str) -> WriteLock:
+        # name: 프로젝트 id 또는 "index"
+        return WriteLock.get(os.path.join(self.root, "locks", f"{name}.lock"))
+
+    @staticmethod
+    def _write_json(path: str, obj):
+        # 임시 파일에 끝까지 쓴 뒤 rename → 쓰는 도중 꺼져도 기존 파일은 온전히 남음
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp" # Streamlit 세션은 같은 프로세스의 스레드 → 스레드마다 다른 임시 파일
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def index_entry(p: dict) -> dict:
+        # 목록 화면에 필요한 헤더 정보만 인덱스에 보관
+        return {
+            "name": p.get('name', ''), "inspector": p.get('inspector', ''), "date_str": p.get('date_str', ''),
+            "version": p.get('version', 0), "section_count": len(p.get('sections', [])),
+            "span_count": sum(len(sec['span_columns'].get('span_no', ())) if 'span_columns' in sec else len(sec.get('spans', ()))
+                              for sec in p.get('sections', []))
+        }
+
+    def load_index(self) -> Dict[str, dict]:
+        self.migrate_legacy_db()
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            return self.rebuild_index() # [안전장치] 인덱스가 깨졌으면 프로젝트 파일에서 다시 생성
+
+    def stored_version(self, pid: str) -> Optional[int]:
+        # 인덱스만 읽어 저장된 버전 확인 (프로젝트 파일은 열지 않음)
+        e = self.load_index().get(pid)
+        return e.get('version', 0) if e is not None else None
+
+    def rebuild_index(self) -> Dict[str, dict]:
+        index = {}
+        proj_dir = os.path.join(self.root, "projects")
+        for fn in sorted(os.listdir(proj_dir)) if os.path.isdir(proj_dir) else []:
+            if not fn.endswith(".json"): continue
+            raw = self.load_raw(fn[:-5])
+            if raw is not None: index[fn[:-5]] = self.index_entry(raw)
+        with self.lock("index"): self._save_index(index)
+        return index
+
+    def _save_index(self, index: Dict[str, dict]):
+        self._write_json(self._index_path(), index)
+
+    def migrate_legacy_db(self):
+        # 분할 저장소가 없고 구버전 단일 DB만 있으면 프로젝트별 파일로 분리 (원본은 .bak 으로 보존)
+        if not self.legacy_file or os.path.exists(self._index_path()) or not os.path.exists(self.legacy_file): return
+        try:
+            with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                raw_data = json.load(f)
+        except Exception:
+            return
+        with self.lock("index"):
+            if os.path.exists(self._index_path()): return # 다른 세션이 먼저 옮김
+            for pid, p in raw_data.items():
+                self._write_json(self._project_path(pid), p)
+            self._save_index({pid: self.index_entry(p) for pid, p in raw_data.items()})
+            os.replace(self.legacy_file, self.legacy_file + ".bak")
+
+    def load_raw(self, pid: str) -> Optional[dict]:
+        try:
+            with open(self._project_path(pid), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def load_project(self, pid: str) -> Optional[ProjectMetadata]:
+        # 스판 트리 전체는 프로젝트를 열 때만 역직렬화
+        raw = self.load_raw(pid)
+        try:
+            return ProjectMetadata.from_dict(raw) if raw is not None else None
+        except Exception:
+            return None # [안전장치] 깨진 프로젝트 파일 하나 때문에 전체가 사라지지 않도록 None 반환
+
+    def save_project(self, project: ProjectMetadata) -> List[str]:
+        # 변경된 프로젝트 파일 하나와 작은 인덱스만 다시 씀. 병합 중 덮어쓰지 못한 변경(충돌) 목록 반환
+        # 버전은 인덱스에서 비교하므로 인덱스 갱신까지 프로젝트 잠금 안에서 끝냄
+        with self.lock(project.id):
+            conflicts = ProjectMerge.rebase(self, project) or []
+            ProjectMerge.stamp(project)
+            raw = project.to_dict(compact=True)
+            self._write_json(self._project_path(project.id), raw)
+            with self.lock("index"):
+                index = self.load_index()
+                index[project.id] = self.index_entry(raw)
+                self._save_index(index)
+        return conflicts
+
+    def save_spans(self, project: ProjectMetadata, spans: List[tuple]) -> List[str]:
+        # 저널 압축용 (spans = [(구간, 순번, 스판)]). JSON 저장소는 행 단위 쓰기가 없으므로 프로젝트 파일을 다시 씀
+        return self.save_project(project)
+
+    def delete_project(self, pid: str):
+        with self.lock(pid), self.lock("index"):
+            index = self.load_index()
+            index.pop(pid, None)
+            self._save_index(index)
+            try:
+                os.remove(self._project_path(pid))
+            except FileNotFoundError:
+                pass
+
+    def save_all_projects(self, projects: Dict[str, ProjectMetadata]):
+        # 목록에 없는 프로젝트는 삭제. 프로젝트마다 delete_project 로 잠그고 지움 (다른 세션의 저장과 겹치지 않도록)
+        for p in projects.values(): self.save_project(p)
+        for pid in set(self.load_index()) - set(projects): self.delete_project(pid)
+
+    def query_spans(self, grades=None, min_crack: float = None, project_ids=None):
+        # 프로젝트를 하나씩 열어 조건에 맞는 스판만 반환 (메모리에는 한 프로젝트만 유지)
+        system = TunnelSafetySystem()
+        index = self.load_index()
+        for pid in (project_ids if project_ids is not None else list(index)):
+            p = self.load_project(pid)
+            if p is None: continue
+            for sec in p.sections:
+                for span in sec.spans:
+                    if min_crack is not None and not span.data.crack_width > min_crack: continue
+                    res = span.result_cache if not span.is_dirty(sec.type, system.criteria.key) else system.calculate_span(span, sec.type)
+                    if grades is not None and res['grade'][0] not in grades: continue
+                    yield span_row(p, sec, span, res)
+
+def span_row(project: ProjectMetadata, sec: 'TunnelSection', span: 'TunnelSpan', res: dict) -> dict:
+    # 저장소 질의 결과의 공통 행 형식
+    return {
+        "project_id": project.id, "project_name": project.name, "sec_id": sec.id, "type": sec.type.label,
+        "span_no": span.span_no, "length": span.length, "crack_width": span.data.crack_width,
+        "grade": res['grade'][0], "f_value": res['f_value']
+    }
+
+class ChangeJournal:
+    # 스판 단위 변경 기록을 한 줄씩 덧붙이는 저널 (JSON lines). 주기적으로 본 저장소에 압축(compaction) 반영
+    MAX_ENTRIES = 200        # 이만큼 쌓이면 바로 압축
+    COMPACT_INTERVAL = 30.0  # 마지막 압축 후 이 시간(초)이 지나면 압축
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pending = 0
+        self.last_compact = time.monotonic()
+        self.rejected = {} # 세션별 반영되지 못한(충돌) 스판 기록 → DataManager.sync 에서 알림
+        self.compacted = {} # pid → (압축 전 저장 버전, 압축 후 저장 버전, 기록한 세션들, 소견 쓰기 번호) – fast_forward 용
+        self._lock = threading.Lock()
+
+    def append(self, record: dict) -> int:
+        # seq 는 ns 단위 시각 → 저널을 비워도 저장 토큰(스판 version, journal_seq)과 순서가 유지됨
+        record["seq"] = time.time_ns()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending += 1
+        return record["seq"]
+
+    def due(self) -> bool:
+        return self.pending > 0 and (self.pending >= self.MAX_ENTRIES or time.monotonic() - self.last_compact >= self.COMPACT_INTERVAL)
+
+    @staticmethod
+    def read(path: str) -> List[dict]:
+        records = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue # [안전장치] 기록 도중 꺼져서 잘린 마지막 줄은 무시
+        except FileNotFoundError:
+            pass
+        return records
+
+    @staticmethod
+    def apply(project: ProjectMetadata, records: List[dict], rejected: List[dict] = None, applied: List[tuple] = None) -> bool:
+        # 기록마다 저장본과 비교해 판단 (여러 태블릿의 기록이 섞이므로 프로젝트 단위 기준 번호 하나로는 거를 수 없음)
+        # - 스판: 저장본 스판 버전이 이 기록 번호면 이미 반영됨(기록한 태블릿이 그 뒤 직접 저장), 편집 기준 버전(base)과 같으면 적용,
+        #   그 외에는 다른 태블릿이 먼저 고친 스판 → rejected
+        # - 소견: 저장본의 소견 쓰기 번호(journal_seq)보다 새로운 기록만 적용 (마지막 쓰기 우선)
+        # applied: 적용한 스판을 (구간, 순번, 스판) 으로 모음 → 저장소가 바뀐 행만 다시 씀
+        changed = False
+        for rec in sorted(records, key=lambda r: r["seq"]):
+            if rec.get("kind") == "span":
+                sec = next((s for s in project.sections if s.id == rec["sec_id"]), None)
+                span = sec.spans[rec["seq_no"]] if sec is not None and rec["seq_no"] < len(sec.spans) else None
+                if span is not None and span.version == rec["seq"]: continue
+                if span is None or span.version != rec.get("base", span.version):
+                    if rejected is not None: rejected.append(rec)
+                    continue
+                span.length = rec["length"]
+                span.data = InspectionData.from_dict(dict(rec["data"]))
+                span.version = rec["seq"]
+                if applied is not None: applied.append((sec, rec["seq_no"], span))
+            elif rec.get("kind") == "project":
+                if rec["seq"] <= project.journal_seq: continue
+                project.opinion = rec.get("opinion", project.opinion)
+                project.journal_seq = rec["seq"]
+            changed = True
+        if changed: project.touch()
+        return changed
+
+    def fast_forward(self, store, project: ProjectMetadata) -> bool:
+        # 잠금 안에서 호출. 저장본이 내 기준 버전에 '이 세션의 저널 기록만' 반영한 결과면 메모리 사본이 이미 같은 내용
+        # → 다시 불러오지 않고 버전만 맞춤 (자기 자동 저장의 압축 때문에 사본/편집 이력을 버리지 않도록)
+        c = self.compacted.get(project.id)
+        if c is None or c[0] != project.version or c[2] != {project.session}: return False
+        if store.stored_version(project.id) != c[1]: return False
+        project.version = c[1]
+        if "opinion" not in project.edited_fields: project.journal_seq = c[3]
+        return True
+
+    def compact(self, store) -> List[str]:
+        # 저널 파일을 먼저 옮겨 두고(새 기록은 새 파일로) 프로젝트별로 잠금 → 불러와 적용 → 원자적 저장
+        with self._lock:
+            work = self.path + ".compacting"
+            if not os.path.exists(work):
+                if not os.path.exists(self.path): return []
+                os.replace(self.path, work)
+            by_pid = {}
+            for rec in self.read(work): by_pid.setdefault(rec["pid"], []).append(rec)
+            for pid, records in by_pid.items():
+                rejected, applied = [], []
+                with store.lock(pid):
+                    p = store.load_project(pid)
+                    before = p.version if p is not None else None
+                    if p is not None and self.apply(p, records, rejected, applied):
+                        store.save_spans(p, applied)
+                        self.compacted[pid] = (before, p.version, {rec.get("by") for rec in records}, p.journal_seq)
+                    if rejected: self.compacted.pop(pid, None) # 반영 못 한 기록이 있으면 사본과 저장본이 다름
+                for rec in rejected:
+                    self.rejected.setdefault(rec.get("by"), []).append(
+                        f"[Sec {rec['sec_id']}-No.{rec['seq_no'] + 1}] 다른 태블릿에서 먼저 수정한 스판이라 자동 저장 내용이 반영되지 않았습니다.")
+            os.remove(work)
+            self.pending = 0
+            self.last_compact = time.monotonic()
+            return list(by_pid)
+
 class DataManager:
-    DB_FILE = "smped_tunnel_db.json"
+    DB_FILE = "smped_tunnel_db.json"  # 구버전 단일 파일 DB (자동 마이그레이션 / 가져오기·내보내기 형식)
+    DB_DIR = "smped_tunnel_db"         # 프로젝트별 분할 저장소
+    SQLITE_FILE = "smped_tunnel.sqlite3"
+    BACKEND = os.environ.get("SMPED_DB_BACKEND", "json") # "json" | "sqlite"
+    JOURNAL_FILE = "smped_tunnel_journal.jsonl"
+    PORTFOLIO_DIR = "smped_tunnel_portfolio" # 전체 터널 요약/경보 색인 (tunnel_portfolio.PortfolioIndex)
+    CRITERIA_DIR = "smped_criteria"          # 판정 기준 파일(*.json) 폴더 (GradingCriteria)
+    PHOTO_DIR = "smped_photos"               # 사진 저장소 (tunnel_photos.PhotoStore)
+    HISTORY_DIR = "smped_tunnel_history"     # 점검 회차 이력 (tunnel_history.CampaignHistory)
+    REPORT_DIR = "smped_tunnel_reports"      # 생성된 결과보고서 캐시 (tunnel_report.ReportBuilder)
+    CONFIG = ("BACKEND", "DB_DIR", "DB_FILE", "SQLITE_FILE", "JOURNAL_FILE", "PORTFOLIO_DIR", "CRITERIA_DIR", "PHOTO_DIR", "HISTORY_DIR", "REPORT_DIR")
+    PHOTO_GC_MIN_AGE = 24 * 3600             # 이보다 최근에 올린 사진은 정리하지 않음 (아직 저장/저널 전인 업로드 보호)
+    _stores = {}
+    _journals = {}
+    _portfolios = {}
+
+    @staticmethod
+    def store():
+        key = (DataManager.BACKEND, DataManager.DB_DIR, DataManager.SQLITE_FILE, DataManager.DB_FILE)
+        if key not in DataManager._stores:
+            if DataManager.BACKEND == "sqlite":
+                from tunnel_sqlite import SQLiteStore
+                DataManager._stores[key] = SQLiteStore(DataManager.SQLITE_FILE, import_from=JsonStore(DataManager.DB_DIR, legacy_file=DataManager.DB_FILE))
+            else:
+                DataManager._stores[key] = JsonStore(DataManager.DB_DIR, legacy_file=DataManager.DB_FILE)
+        return DataManager._stores[key]
+
+    @staticmethod
+    def config() -> dict:
+        # 작업 프로세스에 넘길 저장 위치 설정 (프로세스 풀 initializer 에서 configure 로 복원)
+        return {k: getattr(DataManager, k) for k in DataManager.CONFIG}
+
+    @staticmethod
+    def configure(config: dict):
+        for k, v in config.items(): setattr(DataManager, k, v)
+
+    @staticmethod
+    def journal() -> ChangeJournal:
+        if DataManager.JOURNAL_FILE not in DataManager._journals:
+            DataManager._journals[DataManager.JOURNAL_FILE] = ChangeJournal(DataManager.JOURNAL_FILE)
+        return DataManager._journals[DataManager.JOURNAL_FILE]
+
+    @staticmethod
+    def portfolio(criteria: 'GradingCriteria' = None):
+        # 기준마다 별도 색인 (기본 기준이 아니면 PORTFOLIO_DIR/criteria/<key> 아래에 캐시)
+        key = (DataManager.PORTFOLIO_DIR, criteria.key if criteria is not None else None)
+        if key not in DataManager._portfolios:
+            from tunnel_portfolio import PortfolioIndex
+            DataManager._portfolios[key] = PortfolioIndex(DataManager.PORTFOLIO_DIR, criteria)
+        return DataManager._portfolios[key]
+
+    @staticmethod
+    def load_portfolio(criteria: 'GradingCriteria' = None) -> Dict[str, dict]:
+        # 포트폴리오 요약 (저장소 버전과 다른 항목만 다시 판정) → 다른 기준으로 재판정해도 두 번째부터는 바뀐 프로젝트만
+        return DataManager.portfolio(criteria).refresh(DataManager.store())
+
+    @staticmethod
+    def criteria_sets() -> Dict[str, 'GradingCriteria']:
+        return GradingCriteria.available(DataManager.CRITERIA_DIR)
+
+    @staticmethod
+    def save_criteria(criteria: 'GradingCriteria') -> str:
+        path = os.path.join(DataManager.CRITERIA_DIR, f"{criteria.key}.json")
+        JsonStore._write_json(path, criteria.spec)
+        return path
+
+    @staticmethod
+    def record_span_change(project: ProjectMetadata, section: 'TunnelSection', span: 'TunnelSpan'):
+        # 자동 저장: 변경된 스판 하나만 저널에 덧붙임 (프로젝트 크기와 무관한 고정 비용)
+        # base = 편집 기준 버전. 압축 시 저장본 버전과 비교해 충돌 여부 판단, 저널 번호가 이 스판의 새 버전이 됨
+        seq_no = next(i for i, s in enumerate(section.spans) if s is span)
+        seq = DataManager.journal().append({
+            "kind": "span", "pid": project.id, "by": project.session, "sec_id": section.id, "seq_no": seq_no,
+            "base": span.version, "length": span.length, "data": span.data.to_dict()
+        })
+        span.version = seq
+        span.edited = False
+
+    @staticmethod
+    def record_project_change(project: ProjectMetadata):
+        project.journal_seq = DataManager.journal().append({"kind": "project", "pid": project.id, "by": project.session, "opinion": project.opinion})
+        project.edited_fields.discard("opinion")
+
+    @staticmethod
+    @profiled("DataManager.sync")
+    def sync(project: ProjectMetadata) -> tuple:
+        # 다른 태블릿(또는 저널 압축)이 저장한 변경을 내 사본으로 가져옴. 저장소 버전만 비교하므로 매 rerun 호출 가능
+        # 반환: (사본이 바뀌었는지, 반영되지 못한 내 변경 목록)
+        store = DataManager.store()
+        rejected = DataManager.journal().rejected.pop(project.session, [])
+        with store.lock(project.id):
+            conflicts = None if DataManager.journal().fast_forward(store, project) else ProjectMerge.rebase(store, project)
+        return conflicts is not None, rejected + (conflicts or [])
+
+    @staticmethod
+    @profiled("DataManager.compact_journal")
+    def compact_journal(force: bool = False) -> List[str]:
+        j = DataManager.journal()
+        if not force and not j.due(): return []
+        return j.compact(DataManager.store())
+
+    @staticmethod
+    def recover() -> List[str]:
+        # 시작 시 호출: 비정상 종료로 남은 저널(압축 중이던 파일 포함)을 재생해 저장소에 반영
+        j = DataManager.journal()
+        if not os.path.exists(j.path) and not os.path.exists(j.path + ".compacting"): return []
+        recovered = j.compact(DataManager.store())
+        if os.path.exists(j.path): recovered += j.compact(DataManager.store())
+        return recovered
+
+    @staticmethod
+    @profiled("DataManager.load_index")
+    def load_index() -> Dict[str, dict]: return DataManager.store().load_index()
+
+    @staticmethod
+    @profiled("DataManager.load_project")
+    def load_project(pid: str) -> Optional[ProjectMetadata]: return DataManager.store().load_project(pid)
+
+    @staticmethod
+    def load_latest(pid: str) -> Optional[ProjectMetadata]:
+        # 저장본 + 아직 압축되지 않은 저널 기록(자동 저장)을 메모리에서만 적용 → 화면과 같은 내용
+        # 일괄 보고서/CLI 처럼 다른 프로세스에서 읽기만 할 때 사용 (저널 압축은 앱 프로세스에 맡기고 저장소는 쓰지 않음)
+        p = DataManager.load_project(pid)
+        if p is None: return None
+        path = DataManager.journal().path
+        records = [rec for rec in ChangeJournal.read(path + ".compacting") + ChangeJournal.read(path) if rec.get("pid") == pid]
+        if records: ChangeJournal.apply(p, records)
+        return p
+
     @staticmethod
     def load_all_projects() -> Dict[str, ProjectMetadata]:
+        projects = {}
+        for pid in DataManager.load_index():
+            p = DataManager.load_project(pid)
+            if p is not None: projects[pid] = p
+        return projects
+
+    @staticmethod
+    @profiled("DataManager.save_project")
+    def save_project(project: ProjectMetadata) -> List[str]:
+        # 반환: 다른 태블릿의 저장과 겹쳐 반영되지 못한 변경 목록 (없으면 빈 리스트)
+        conflicts = DataManager.store().save_project(project)
         try:
-            with open(DataManager.DB_FILE, 'r', encoding='utf-8') as f:
-                raw_data = json.load(f)
-                return {k: ProjectMetadata.from_dict(v) for k, v in raw_data.items()}
-        except Exception: 
-            return {} # 파일 없거나 깨지면 빈 딕셔너리 반환
+            DataManager.portfolio().update(project)
+        except Exception:
+            pass # [안전장치] 색인 갱신 실패가 저장을 막지 않도록 (다음 load_portfolio 에서 버전 비교로 보정)
+        return conflicts
+
+    @staticmethod
+    def delete_project(pid: str):
+        from tunnel_history import CampaignHistory
+        photos = DataManager.load_portfolio().get(pid, {}).get("photos", ()) # 삭제 후 정리할 후보 = 이 프로젝트의 사진만
+        store = DataManager.store()
+        with store.lock(pid):
+            # 회차 이력도 같은 잠금 안에서 삭제 → 같은 id 로 새로 만든 프로젝트가 이전 이력을 물려받지 않음
+            store.delete_project(pid)
+            CampaignHistory(DataManager.HISTORY_DIR).delete(pid)
+        DataManager.portfolio().remove(pid)
+        try:
+            if photos: DataManager.collect_photos(candidates=photos)
+        except Exception:
+            pass # [안전장치] 사진 정리 실패가 삭제를 막지 않도록 (남은 사진은 CLI --gc-photos 로 정리)
+
+    @staticmethod
+    def referenced_photos() -> set:
+        # 저장된 모든 스판(포트폴리오 색인의 프로젝트별 사진 목록 → 프로젝트를 열지 않음)과 아직 압축되지 않은 저널 기록이 참조하는 사진 해시
+        refs = set()
+        for e in DataManager.load_portfolio().values(): refs.update(e.get("photos", ()))
+        path = DataManager.journal().path
+        for rec in ChangeJournal.read(path) + ChangeJournal.read(path + ".compacting"):
+            refs.update((rec.get("data") or {}).get("photos") or ())
+        return refs
+
+    @staticmethod
+    @profiled("DataManager.collect_photos")
+    def collect_photos(min_age: float = None, candidates: Iterable[str] = None) -> List[str]:
+        # 어느 프로젝트에서도 참조하지 않는 사진 삭제 (candidates 를 주면 그 사진만 검사). 반환: 삭제한 해시 목록
+        from tunnel_photos import PhotoStore
+        min_age = DataManager.PHOTO_GC_MIN_AGE if min_age is None else min_age
+        return PhotoStore(DataManager.PHOTO_DIR).collect_garbage(DataManager.referenced_photos(), min_age, candidates)
+
+    @staticmethod
+    @profiled("DataManager.save_all_projects")
+    def save_all_projects(projects: Dict[str, ProjectMetadata]): DataManager.store().save_all_projects(projects)
+
+    @staticmethod
+    def query_spans(grades=None, min_crack: float = None, project_ids=None) -> List[dict]:
+        # 예: query_spans(grades="DE") → 전체 터널의 D/E 스판, query_spans(min_crack=1.0) → 균열폭 1.0mm 초과
+        return list(DataManager.store().query_spans(grades=grades, min_crack=min_crack, project_ids=project_ids))
+
+    @staticmethod
+    def import_json(path: str) -> int:
+        # 구버전 단일 파일 형식({pid: project}) 을 현재 저장소로 가져오기
+        with open(path, 'r', encoding='utf-8') as f:
+            raw_data = json.load(f)
+        for pid, p in raw_data.items():
+            DataManager.save_project(ProjectMetadata.from_dict(p))
+        return len(raw_data)
+
+    @staticmethod
+    def export_json(path: str) -> int:
+        # 현재 저장소 전체를 단일 파일 형식으로 내보내기 (프로젝트 하나씩 직렬화)
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("{")
+            for pid in DataManager.load_index():
+                p = DataManager.load_project(pid)
+                if p is None: continue
+                if count: f.write(",")
+                f.write(json.dumps(pid, ensure_ascii=False) + ":" + json.dumps(p.to_dict(), ensure_ascii=False))
+                count += 1
+            f.write("}")
+        return count
+
+GRADE_CHARS = "abcde"
+GRADE_CODE_MAP = {g: i for i, g in enumerate(GRADE_CHARS)} # 그 외 문자는 5 (점수 0.0)
+
+def grade_code(g) -> int:
+    # 알 수 없는 등급은 문자열 순서를 따름: 'e' 뒤 문자는 5, 'a' 앞 문자(빈 값 등)는 -1. 둘 다 점수 0 (score_table[-1])
+    # → 재질열화 최대값이 calculate_span 의 문자열 max 와 같아짐 (빈 값은 다른 항목에 짐)
+    g = str(g).lower()
+    return GRADE_CODE_MAP.get(g, 5 if g > 'e' else -1)
+
+class GradingCriteria:
+    # 판정 기준표 (등급 점수, 형식별 균열폭 상한, 분모, 부대시설 가중치 구간, F 등급 구간)
+    # 기준 파일(JSON)을 한 번 읽어 조회표로 컴파일 → calculate_span(bisect)과 BatchEvaluator(searchsorted)가 같은 표를 씀
+    # key = 버전 + 내용 해시. 판정 캐시(result_key)와 포트폴리오 재판정 결과를 기준별로 구분하는 데 사용
+    DEFAULT = {
+        "name": "시설물 안전점검·진단 세부지침 (기본)", "version": "default",
+        "grade_scores": {"a": 1.0, "b": 4.0, "c": 7.0, "d": 10.0, "e": 13.0},
+        # 형식별 균열폭 상한 (a~d 등급, 초과 시 e). 없는 형식은 "default"
+        "crack_limits": {"default": [0.1, 0.3, 0.5, 1.0], "재래식 (조적)": [0.1, 0.3, 1.0, 3.0],
+                         "재래식 (무근)": [0.1, 0.3, 1.0, 3.0], "NATM (무근)": [0.1, 0.3, 1.0, 3.0]},
+        "total_denom": {}, # 형식 라벨 → 분모 (없으면 TunnelType 값)
+        "aux_bands": [0.15, 0.30, 0.55, 0.75], "aux_weights": [1.0, 1.0, 1.02, 1.05, 1.10],
+        "f_bands": [0.15, 0.30, 0.55, 0.75],
+        "grade_labels": ["A (우수)", "B (양호)", "C (보통)", "D (미흡)", "E (불량)"],
+    }
+    _default = None
+    _loaded = {} # 경로 → (수정 시각, 기준)
+
+    def __init__(self, spec: dict):
+        # [안전장치] 잘못된 기준 파일은 여기서 ValueError (판정 도중 깨지지 않도록)
+        d = {**self.DEFAULT, **spec}
+        self.name, self.version = str(d['name']), str(d['version'])
+        try:
+            self.scores = {g: float(d['grade_scores'][g]) for g in GRADE_CHARS}
+            limits = {k: tuple(float(x) for x in v) for k, v in d['crack_limits'].items()}
+            self.crack_limits = {t: limits.get(t.label, limits['default']) for t in TunnelType}
+            self.total_denom = {t: float(d['total_denom'].get(t.label, t.total_denom)) for t in TunnelType}
+            self.aux_bands = [float(x) for x in d['aux_bands']]
+            self.aux_weights = [float(x) for x in d['aux_weights']]
+            self.f_bands = [float(x) for x in d['f_bands']]
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"기준 항목이 올바르지 않습니다: {e}") from None
+        self.grade_labels = [str(x) for x in d['grade_labels']]
+        for name, bands, n in [("aux_bands", self.aux_bands, 4), ("f_bands", self.f_bands, 4)] + \
+                              [(f"crack_limits[{t.label}]", v, 4) for t, v in self.crack_limits.items()]:
+            if len(bands) != n or any(a >= b for a, b in zip(bands, bands[1:])):
+                raise ValueError(f"{name}: 증가하는 값 {n}개가 필요합니다.")
+        if len(self.aux_weights) != 5: raise ValueError("aux_weights: 값 5개가 필요합니다.")
+        if len(self.grade_labels) != 5 or any(lb[:1].lower() != g for lb, g in zip(self.grade_labels, GRADE_CHARS)):
+            raise ValueError("grade_labels: A~E 로 시작하는 이름 5개가 필요합니다.")
+        # [안전장치] 분모가 0일 경우 대비
+        self.total_denom = {t: v if v > 0 else 1.0 for t, v in self.total_denom.items()}
+        self.spec = {"name": self.name, "version": self.version, "grade_scores": self.scores,
+                     "crack_limits": {k: list(v) for k, v in limits.items()}, "total_denom": dict(d['total_denom']),
+                     "aux_bands": self.aux_bands, "aux_weights": self.aux_weights, "f_bands": self.f_bands, "grade_labels": self.grade_labels}
+        raw = json.dumps(self.spec, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        self.key = f"{self.version}-{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:8]}"
+        # 배열 판정용 표 (형식 코드 = TunnelType 순서, 알 수 없는 등급 코드 5/-1 → 마지막 칸 점수 0)
+        types = list(TunnelType)
+        self.score_table = np.array([self.scores[g] for g in GRADE_CHARS] + [0.0])
+        self.crack_table = np.array([self.crack_limits[t] for t in types])
+        self.denom_table = np.array([self.total_denom[t] for t in types])
+        self.aux_band_table, self.aux_weight_table = np.array(self.aux_bands), np.array(self.aux_weights)
+        self.f_band_table = np.array(self.f_bands)
+        steps = np.diff(self.score_table[:5])
+        # 점수가 등간격이면 (첫 점수, 간격) → 라이닝 점수 = 4 × 첫 점수 + 간격 × (코드 합)
+        self.affine = (float(self.score_table[0]), float(steps[0])) if np.allclose(steps, steps[0]) else None
+
+    def crack_code(self, width_mm: float, t_type: TunnelType) -> int:
+        return bisect.bisect_left(self.crack_limits[t_type], width_mm) # width <= limit 이면 해당 등급
+
+    def aux_weight(self, aux_score: float) -> float:
+        return self.aux_weights[bisect.bisect_right(self.aux_bands, aux_score)]
+
+    def grade_code(self, f_value: float) -> int:
+        return bisect.bisect_right(self.f_bands, f_value)
+
+    def grade_label(self, f_value: float) -> str:
+        return self.grade_labels[bisect.bisect_right(self.f_bands, f_value)]
+
+    def score(self, grade_char: str) -> float:
+        return self.scores.get(grade_char.lower(), 0.0)
 
     @staticmethod
-    def save_all_projects(projects: Dict[str, ProjectMetadata]):
-        raw_data = {k: v.to_dict() for k, v in projects.items()}
-        with open(DataManager.DB_FILE, 'w', encoding='utf-8') as f:
-            json.dump(raw_data, f, ensure_ascii=False, indent=4)
+    def default() -> 'GradingCriteria':
+        if GradingCriteria._default is None: GradingCriteria._default = GradingCriteria({})
+        return GradingCriteria._default
+
+    @staticmethod
+    def load(path: str) -> 'GradingCriteria':
+        # 파일이 바뀌지 않았으면 컴파일된 기준을 재사용
+        mtime = os.stat(path).st_mtime_ns
+        hit = GradingCriteria._loaded.get(path)
+        if hit is not None and hit[0] == mtime: return hit[1]
+        with open(path, 'r', encoding='utf-8') as f:
+            c = GradingCriteria(json.load(f))
+        GradingCriteria._loaded[path] = (mtime, c)
+        return c
+
+    @staticmethod
+    def available(folder: str) -> Dict[str, 'GradingCriteria']:
+        # 기본 기준 + 폴더의 *.json 기준 (key → 기준). 읽을 수 없는 파일은 건너뜀
+        out = {GradingCriteria.default().key: GradingCriteria.default()}
+        try:
+            names = sorted(n for n in os.listdir(folder) if n.endswith(".json"))
+        except FileNotFoundError:
+            names = []
+        for n in names:
+            try:
+                c = GradingCriteria.load(os.path.join(folder, n))
+            except (OSError, ValueError):
+                continue
+            out.setdefault(c.key, c)
+        return out
 
 class DefectEvaluator:
-    GRADE_SCORE_MAP = {'a': 1.0, 'b': 4.0, 'c': 7.0, 'd': 10.0, 'e': 13.0}
+    # 기본 기준표의 항목별 조회 (기준을 넘기면 해당 기준으로)
+    GRADE_SCORE_MAP = GradingCriteria.default().scores
+    PLAIN_TYPES = (TunnelType.ASSM_PLAIN, TunnelType.ASSM_BRICK, TunnelType.NATM_PLAIN)
+    CRACK_LIMITS_PLAIN = GradingCriteria.default().crack_limits[TunnelType.ASSM_PLAIN]
+    CRACK_LIMITS_RC = GradingCriteria.default().crack_limits[TunnelType.NATM_RC]
+
+    @staticmethod
+    def crack_limits(t_type: TunnelType, criteria: GradingCriteria = None) -> tuple:
+        return (criteria or GradingCriteria.default()).crack_limits[t_type]
+
     @staticmethod
-    def evaluate_crack(width_mm: float, t_type: TunnelType) -> dict:
+    def evaluate_crack(width_mm: float, t_type: TunnelType, criteria: GradingCriteria = None) -> dict:
         # 터널 형식별 균열 기준 적용
-        if t_type in [TunnelType.ASSM_PLAIN, TunnelType.ASSM_BRICK, TunnelType.NATM_PLAIN]:
-            if width_mm <= 0.1: return {"grade": "a", "score": 1.0}
-            elif width_mm <= 0.3: return {"grade": "b", "score": 4.0}
-            elif width_mm <= 1.0: return {"grade": "c", "score": 7.0}
-            elif width_mm <= 3.0: return {"grade": "d", "score": 10.0}
-            else: return {"grade": "e", "score": 13.0}
-        else:
-            if width_mm <= 0.1: return {"grade": "a", "score": 1.0}
-            elif width_mm <= 0.3: return {"grade": "b", "score": 4.0}
-            elif width_mm <= 0.5: return {"grade": "c", "score": 7.0}
-            elif width_mm <= 1.0: return {"grade": "d", "score": 10.0}
-            else: return {"grade": "e", "score": 13.0}
-    
+        c = criteria or GradingCriteria.default()
+        g = GRADE_CHARS[c.crack_code(width_mm, t_type)]
+        return {"grade": g, "score": c.scores[g]}
+
+    @staticmethod
+    def get_score(grade_char: str, criteria: GradingCriteria = None) -> float:
+        return (criteria or GradingCriteria.default()).score(grade_char)
+
+@dataclass
+class SpanColumns:
+    # 스판 단위 입력값을 열(column) 배열로 모은 형태. 등급 문자는 0(a)~4(e) 코드로 저장 (알 수 없는 등급은 grade_code 참고)
+    sec_id: np.ndarray
+    span_no: np.ndarray
+    type_code: np.ndarray
+    length: np.ndarray
+    crack_width: np.ndarray
+    leakage: np.ndarray
+    breakage: np.ndarray
+    spalling: np.ndarray
+    efflorescence: np.ndarray
+    rebar: np.ndarray
+    carbonation: np.ndarray
+    soil_leak: np.ndarray
+    surround: np.ndarray
+    aux_score: np.ndarray
+
+    def __len__(self): return len(self.length)
+
+    @staticmethod
+    def collect(sections: List['TunnelSection']):
+        # (구간 id, 스판 번호, 형식 코드, 길이) 행과 eval_key 행을 한 번에 수집
+        type_idx = {t: i for i, t in enumerate(TunnelType)}
+        meta, keys = [], []
+        for sec in sections:
+            tc = type_idx[sec.type]
+            for span in sec.spans:
+                meta.append((sec.id, span.span_no, tc, span.length))
+                keys.append(span.data.eval_key())
+        return meta, keys
+
+    @staticmethod
+    def from_rows(meta: list, keys: list) -> 'SpanColumns':
+        def codes(col): return np.array([grade_code(g) for g in col], dtype=np.int8)
+        def ints(col): return np.array(col, dtype=np.int64)
+        m = list(zip(*meta)) or [()] * 4
+        k = list(zip(*keys)) or [()] * 14
+        return SpanColumns(
+            sec_id=ints(m[0]), span_no=ints(m[1]),
+            type_code=np.array(m[2], dtype=np.int8), length=np.array(m[3], dtype=np.float64),
+            crack_width=np.array(k[0], dtype=np.float64), leakage=codes(k[1]), breakage=codes(k[2]),
+            soil_leak=np.array(k[3], dtype=bool),
+            spalling=codes(k[4]), efflorescence=codes(k[5]), rebar=codes(k[6]), carbonation=codes(k[7]),
+            surround=ints(k[8]) + ints(k[9]) + ints(k[10]) + ints(k[11]) + ints(k[12]),
+            aux_score=np.array(k[13], dtype=np.float64)
+        )
+
+    @staticmethod
+    def from_sections(sections: List['TunnelSection']) -> 'SpanColumns':
+        return SpanColumns.from_rows(*SpanColumns.collect(sections))
+
+class BatchEvaluator:
+    # calculate_span 과 동일한 판정을 NumPy 배열 연산으로 일괄 수행. 표는 GradingCriteria 가 컴파일한 것 (아래는 기본 기준)
+    SCORE_TABLE = GradingCriteria.default().score_table
+    CRACK_LIMITS = GradingCriteria.default().crack_table   # (형식, 4)
+    TOTAL_DENOM = GradingCriteria.default().denom_table
+    AUX_BANDS = GradingCriteria.default().aux_band_table
+    AUX_WEIGHTS = GradingCriteria.default().aux_weight_table
+    F_BANDS = GradingCriteria.default().f_band_table
+    GRADE_LABELS = GradingCriteria.default().grade_labels
+    ALERT_MSGS = ("진행성 균열(d등급 이상)", "철근노출 심각(e등급)", "토립자 유출 동반 누수")
+
     @staticmethod
-    def get_score(grade_char: str) -> float:
-        return DefectEvaluator.GRADE_SCORE_MAP.get(grade_char.lower(), 0.0)
+    def evaluate(cols: SpanColumns, criteria: GradingCriteria = None) -> Dict[str, np.ndarray]:
+        c = criteria or GradingCriteria.default()
+        # 균열: 상한값보다 큰 기준 개수 = 등급 코드 (width <= limit 이면 해당 등급)
+        crack_code = (cols.crack_width[:, None] > c.crack_table[cols.type_code]).sum(axis=1)
+        material_code = np.maximum(np.maximum(cols.spalling, cols.efflorescence), np.maximum(cols.rebar, cols.carbonation))
+        score = c.score_table
+        lining = score[crack_code] + score[material_code] + score[cols.leakage] + score[cols.breakage]
+        f_basic = (lining + cols.surround) / c.denom_table[cols.type_code]
+        w = c.aux_weight_table[np.searchsorted(c.aux_band_table, cols.aux_score, side='right')]
+        f_value = f_basic * w
+        return {
+            "crack_code": crack_code, "material_code": material_code,
+            "lining": lining, "surround": cols.surround, "w": w, "f_value": f_value,
+            "grade_code": np.searchsorted(c.f_band_table, f_value, side='right'),
+            "alert_crack": crack_code >= 3,
+            "alert_rebar": cols.rebar >= 4,
+            "alert_soil": cols.soil_leak & (cols.leakage >= 3),
+        }
+
+class ChainageIndex:
+    # 프로젝트 전체 스판의 누적 거리(chainage) 색인. 스판을 구간 순서대로 펼친 번호(flat)로 다루며,
+    # 길이는 Fenwick 트리로 보관해 길이 변경/시작 거리/거리→스판 조회가 모두 O(log n)
+    BAD_GRADES = 3 # 등급 코드 3(D) 이상을 '주의 스판'으로 취급
+
+    @profiled("ChainageIndex.build")
+    def __init__(self, sections: List['TunnelSection']):
+        self.shape = self.shape_of(sections)
+        self.sec_start, n = [], 0
+        for sec in sections:
+            self.sec_start.append(n)
+            n += len(sec.spans)
+        self.n = n
+        cols = SpanColumns.from_sections(sections)
+        self.lengths = cols.length.tolist()
+        tree = [0.0] + self.lengths
+        for i in range(1, n + 1):
+            j = i + (i & -i)
+            if j <= n: tree[j] += tree[i]
+        self.tree = tree
+        codes = BatchEvaluator.evaluate(cols)['grade_code'] if n else np.zeros(0, dtype=np.int8)
+        self.grades = codes.tolist()
+        self.bad = np.flatnonzero(codes >= self.BAD_GRADES).tolist() # 정렬된 flat 번호
+
+    @staticmethod
+    def shape_of(sections: List['TunnelSection']) -> tuple:
+        # 구간 추가/삭제, 스판 수 변경, 프로젝트 재로드(객체 교체)를 감지하는 키
+        return tuple((id(sec), len(sec.spans)) for sec in sections)
+
+    def matches(self, sections: List['TunnelSection']) -> bool:
+        return self.shape == self.shape_of(sections)
+
+    def flat(self, sec_idx: int, span_idx: int) -> int:
+        return self.sec_start[sec_idx] + span_idx
+
+    def position(self, i: int) -> tuple:
+        # flat 번호 → (구간 순번, 구간 내 스판 순번). 빈 구간은 건너뜀
+        k = bisect.bisect_right(self.sec_start, i) - 1
+        return k, i - self.sec_start[k]
+
+    def start(self, i: int) -> float:
+        # i 번째 스판의 시작 거리 (앞선 스판 길이의 합)
+        total = 0.0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def total(self) -> float: return self.start(self.n)
+
+    def set_length(self, i: int, length: float):
+        delta = length - self.lengths[i]
+        if not delta: return
+        self.lengths[i] = length
+        j = i + 1
+        while j <= self.n:
+            self.tree[j] += delta
+            j += j & -j
+
+    def locate(self, dist: float) -> Optional[int]:
+        # 거리 dist(m)가 속한 스판의 flat 번호 (트리 하강 탐색). 전체 연장을 넘으면 마지막 스판
+        if self.n == 0: return None
+        pos, rest, step = 0, dist, 1 << (self.n.bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] <= rest:
+                pos = nxt
+                rest -= self.tree[nxt]
+            step >>= 1
+        return min(pos, self.n - 1)
+
+    def set_grade(self, i: int, grade: str):
+        # 스판 재판정 결과 반영 (grade 는 'D (미흡)' 같은 표시 문자열)
+        code = GRADE_CHARS.find(grade[0].lower())
+        was_bad, is_bad = self.grades[i] >= self.BAD_GRADES, code >= self.BAD_GRADES
+        self.grades[i] = code
+        if was_bad == is_bad: return
+        j = bisect.bisect_left(self.bad, i)
+        if is_bad: self.bad.insert(j, i)
+        else: del self.bad[j]
+
+    def next_bad(self, i: int) -> Optional[int]:
+        j = bisect.bisect_right(self.bad, i)
+        return self.bad[j] if j < len(self.bad) else None
+
+    def prev_bad(self, i: int) -> Optional[int]:
+        j = bisect.bisect_left(self.bad, i)
+        return self.bad[j - 1] if j > 0 else None
+
+class _SummaryState:
+    # 프로젝트(구간 리스트)별 증분 집계 상태: 스판별 기여분을 보관하고 변경분만 합계에 반영
+    RESUM_EVERY = 64
+    def __init__(self, sections: List['TunnelSection']):
+        self.sections = sections # id 재사용 방지를 위해 참조 유지
+        self.entries = {}        # id(span) -> [span, span_result, f*length, length, alert_msgs]
+        self.total_weighted_f = 0.0
+        self.total_len = 0.0
+        self.calls = 0           # 증감 누적 오차를 없애기 위해 RESUM_EVERY 회마다 합계를 다시 구함
 
 class TunnelSafetySystem:
+    MAX_SUMMARY_STATES = 8
+
+    def __init__(self, criteria: GradingCriteria = None):
+        self.criteria = criteria or GradingCriteria.default()
+        self._summary_states: Dict[int, _SummaryState] = {}
+
+    @profiled("calculate_span")
     def calculate_span(self, span: TunnelSpan, t_type: TunnelType):
         d = span.data
+        c = self.criteria
         scores = {}
         alerts = []
 
-        crack_eval = DefectEvaluator.evaluate_crack(d.crack_width, t_type)
-        scores['crack'] = crack_eval['score']
-        if crack_eval['grade'] >= 'd': alerts.append("진행성 균열(d등급 이상)")
+        crack_code = c.crack_code(d.crack_width, t_type)
+        scores['crack'] = c.scores[GRADE_CHARS[crack_code]]
+        if crack_code >= 3: alerts.append("진행성 균열(d등급 이상)")
         
         worst_mat = d.material.get_worst_grade()
-        scores['material'] = DefectEvaluator.get_score(worst_mat)
-        if d.material.rebar_grade >= 'e': alerts.append("철근노출 심각(e등급)")
+        scores['material'] = c.score(worst_mat)
+        if d.material.rebar_grade.lower() >= 'e': alerts.append("철근노출 심각(e등급)")
 
-        scores['leakage'] = DefectEvaluator.get_score(d.leakage_grade)
-        scores['breakage'] = DefectEvaluator.get_score(d.breakage_grade)
-        if d.soil_leak and d.leakage_grade >= 'd': alerts.append("토립자 유출 동반 누수")
+        scores['leakage'] = c.score(d.leakage_grade)
+        scores['breakage'] = c.score(d.breakage_grade)
+        if d.soil_leak and d.leakage_grade.lower() >= 'd': alerts.append("토립자 유출 동반 누수")
 
         lining_total = sum(scores.values())
         surround_total = d.sur_drain + d.sur_ground + d.sur_portal + d.sur_util + d.sur_special
         
-        # [안전장치] 분모가 0일 경우 대비 (사실상 없지만 방어코드)
-        denom = t_type.total_denom if t_type.total_denom > 0 else 1
-        f_basic = (lining_total + surround_total) / denom
-        
-        w = 1.0
-        if d.aux_score < 0.15: w = 1.0
-        elif d.aux_score < 0.30: w = 1.0
-        elif d.aux_score < 0.55: w = 1.02
-        elif d.aux_score < 0.75: w = 1.05
-        else: w = 1.10
-        
+        f_basic = (lining_total + surround_total) / c.total_denom[t_type]
+        w = c.aux_weight(d.aux_score)
         f_final = f_basic * w
         
         result = {
-            "f_value": f_final, "grade": self.get_grade_str(f_final),
+            "f_value": f_final, "grade": c.grade_label(f_final),
             "alerts": alerts, "details": {"lining": lining_total, "surround": surround_total, "w": w}
         }
         span.result_cache = result
+        span.result_key = (t_type, d.eval_key(), c.key)
         return result
 
-    def get_grade_str(self, f_value: float) -> str:
-        if f_value < 0.15: return "A (우수)"
-        elif f_value < 0.30: return "B (양호)"
-        elif f_value < 0.55: return "C (보통)"
-        elif f_value < 0.75: return "D (미흡)"
-        else: return "E (불량)"
-
-    def calculate_project_summary(self, sections: List[TunnelSection]):
+    @profiled("calculate_batch")
+    def calculate_batch(self, sections: List[TunnelSection], write_cache: bool = True):
+        # calculate_project_summary 와 같은 형태의 결과를 배열 연산으로 계산
         if not sections: return None
-        all_spans = []
+        meta, keys = SpanColumns.collect(sections)
+        if not meta: return None
+        cols = SpanColumns.from_rows(meta, keys)
+        c = self.criteria
+        r = BatchEvaluator.evaluate(cols, c)
+        f_list, lining, surround, w = r['f_value'].tolist(), r['lining'].tolist(), r['surround'].tolist(), r['w'].tolist()
+        labels = [c.grade_labels[g] for g in r['grade_code'].tolist()]
+        a_crack, a_rebar, a_soil = r['alert_crack'].tolist(), r['alert_rebar'].tolist(), r['alert_soil'].tolist()
+        m_crack, m_rebar, m_soil = BatchEvaluator.ALERT_MSGS
+
+        all_spans, alerts, i = [], [], 0
         for sec in sections:
+            t_type, sec_id, t_label = sec.type, sec.id, sec.type.label
             for span in sec.spans:
-                self.calculate_span(span, sec.type)
+                msgs = []
+                if a_crack[i]: msgs.append(m_crack)
+                if a_rebar[i]: msgs.append(m_rebar)
+                if a_soil[i]: msgs.append(m_soil)
+                result = {
+                    "f_value": f_list[i], "grade": labels[i],
+                    "alerts": msgs, "details": {"lining": lining[i], "surround": surround[i], "w": w[i]}
+                }
+                if write_cache:
+                    span.result_cache = result
+                    span.result_key = (t_type, keys[i], c.key)
                 all_spans.append({
-                    "sec_id": sec.id, "type": sec.type.label,
+                    "sec_id": sec_id, "type": t_label,
                     "span_no": span.span_no, "length": span.length,
-                    "data": span.data, "result": span.result_cache
+                    "data": span.data, "result": result
                 })
-        
+                if msgs: alerts.extend(f"[Sec {sec_id}-No.{span.span_no}] {msg}" for msg in msgs)
+                i += 1
+
+        total_weighted_f = sum((r['f_value'] * cols.length).tolist())
+        total_len = sum(cols.length.tolist())
+        final_f = total_weighted_f / total_len if total_len > 0 else 0
+        return {
+            "final_f": final_f, "final_grade": self.get_grade_str(final_f),
+            "total_length": total_len, "span_results": all_spans, "alerts": alerts
+        }
+
+    def get_grade_str(self, f_value: float) -> str:
+        return self.criteria.grade_label(f_value)
+
+    @profiled("calculate_project_summary")
+    def calculate_project_summary(self, sections: List[TunnelSection]):
+        if not sections: return None
+        state = self._summary_states.pop(id(sections), None)
+        if state is None or state.sections is not sections: state = _SummaryState(sections)
+        self._summary_states[id(sections)] = state
+        while len(self._summary_states) > self.MAX_SUMMARY_STATES:
+            self._summary_states.pop(next(iter(self._summary_states)))
+
+        old_entries, entries = state.entries, {}
+        all_spans, alerts, recalculated = [], [], 0
+        for sec in sections:
+            for span in sec.spans:
+                e = old_entries.pop(id(span), None)
+                dirty = span.is_dirty(sec.type, self.criteria.key)
+                if dirty:
+                    self.calculate_span(span, sec.type)
+                    recalculated += 1
+                # 결과 객체 비교: 요약 밖에서 calculate_span/calculate_batch 로 다시 판정한 스판도 갱신
+                if e is None or dirty or e[1]['result'] is not span.result_cache or e[3] != span.length or e[1]['data'] is not span.data or e[1]['sec_id'] != sec.id:
+                    if e is not None:
+                        state.total_weighted_f -= e[2]
+                        state.total_len -= e[3]
+                    res = span.result_cache
+                    span_result = {
+                        "sec_id": sec.id, "type": sec.type.label,
+                        "span_no": span.span_no, "length": span.length,
+                        "data": span.data, "result": res
+                    }
+                    e = [span, span_result, res['f_value'] * span.length, span.length,
+                         [f"[Sec {sec.id}-No.{span.span_no}] {msg}" for msg in res['alerts']]]
+                    state.total_weighted_f += e[2]
+                    state.total_len += e[3]
+                entries[id(span)] = e
+                all_spans.append(e[1])
+                if e[4]: alerts.extend(e[4])
+        # 삭제된 스판의 기여분 제거
+        for e in old_entries.values():
+            state.total_weighted_f -= e[2]
+            state.total_len -= e[3]
+        state.entries = entries
+        state.calls += 1
+        if state.calls % _SummaryState.RESUM_EVERY == 0:
+            state.total_weighted_f, state.total_len = math.fsum(e[2] for e in entries.values()), math.fsum(e[3] for e in entries.values())
+        count("summary.spans", len(all_spans))
+        count("summary.recalculated", recalculated)
+
         if not all_spans: return None
-        total_weighted_f = sum(s['result']['f_value'] * s['length'] for s in all_spans)
-        total_len = sum(s['length'] for s in all_spans)
-        
+        total_len = state.total_len
         # [안전장치] 총 연장이 0일 경우 대비
-        final_f = total_weighted_f / total_len if total_len > 0 else 0
-        
+        final_f = state.total_weighted_f / total_len if total_len > 0 else 0
+
         return {
             "final_f": final_f, "final_grade": self.get_grade_str(final_f),
             "total_length": total_len, "span_results": all_spans,
-            "alerts": [f"[Sec {s['sec_id']}-No.{s['span_no']}] {msg}" for s in all_spans for msg in s['result']['alerts']]
+            "alerts": alerts
         }
@@ -0,0 +1,96 @@
+import os
+import time
+import threading
+import hashlib
+from io import BytesIO
+from typing import Iterable, Iterator, List, Optional
+
+try:
+    from PIL import Image
+except ModuleNotFoundError: # 썸네일 없이 원본만 저장
+    Image = None
+
+class PhotoStore:
+    # 내용 해시(SHA-256) 기준 사진 저장소. 같은 사진은 한 번만 저장되고 DB에는 해시만 남김
+    ROOT = "smped_photos"
+    THUMB_SIZE = (320, 320)
+
+    def __init__(self, root: str = ROOT):
+        self.root = root
+
+    def _path(self, kind: str, digest: str) -> str:
+        return os.path.join(self.root, kind, digest[:2], digest[2:])
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        obj = self._path("objects", digest)
+        if not os.path.exists(obj):
+            self._write(obj, data)
+        else:
+            os.utime(obj) # 다시 올린 사진도 최근 업로드로 (collect_garbage 의 min_age 보호가 수정 시각 기준)
+        if not os.path.exists(self._path("thumbs", digest)):
+            thumb = self.make_thumbnail(data)
+            if thumb is not None: self._write(self._path("thumbs", digest), thumb)
+        return digest
+
+    def make_thumbnail(self, data: bytes) -> Optional[bytes]:
+        # 업로드 시 한 번만 생성 (JPEG). PIL 이 없거나 이미지가 아니면 None
+        if Image is None: return None
+        try:
+            img = Image.open(BytesIO(data))
+            img.thumbnail(self.THUMB_SIZE)
+            out = BytesIO()
+            img.convert("RGB").save(out, format="JPEG", quality=80)
+            return out.getvalue()
+        except Exception:
+            return None
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self._path("objects", digest))
+
+    def thumbnail(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._path("thumbs", digest), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def load(self, digest: str) -> Optional[bytes]:
+        # 원본은 스판 화면에서 직접 열거나 보고서를 내보낼 때만 읽음
+        try:
+            with open(self._path("objects", digest), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _all_digests(self) -> Iterator[str]:
+        obj_root = os.path.join(self.root, "objects")
+        for prefix in os.listdir(obj_root) if os.path.isdir(obj_root) else []:
+            for rest in os.listdir(os.path.join(obj_root, prefix)):
+                if not rest.endswith(".tmp"): yield prefix + rest
+
+    def collect_garbage(self, referenced: Iterable[str], min_age: float = 0, candidates: Iterable[str] = None) -> List[str]:
+        # 어느 스판에서도 참조하지 않는 사진(원본/썸네일) 삭제. min_age 초보다 최근에 올린 사진은 남김
+        # candidates: 검사할 사진 (생략 시 저장소 전체를 훑음)
+        keep, removed, cutoff = set(referenced), [], time.time() - min_age
+        for digest in self._all_digests() if candidates is None else candidates:
+            if digest in keep: continue
+            try:
+                if os.path.getmtime(self._path("objects", digest)) > cutoff and min_age > 0: continue
+            except FileNotFoundError:
+                continue
+            for kind in ("objects", "thumbs"):
+                try:
+                    os.remove(self._path(kind, digest))
+                except FileNotFoundError:
+                    pass
+            removed.append(digest)
+        return removed
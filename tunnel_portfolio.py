@@ -0,0 +1,138 @@
+import os
+import json
+from typing import Dict, List, Optional
+import numpy as np
+from tunnel_master_logic import ProjectMetadata, SpanColumns, BatchEvaluator, GradingCriteria, WriteLock, JsonStore
+from tunnel_profile import profiled
+
+class PortfolioIndex:
+    # 전체 터널 요약 색인. 프로젝트마다 등급 분포/종합 F/총 연장/경보 건수를 summary.json 에,
+    # 경보 목록(구간, 스판, 종류, F)은 alerts/<pid>.json 에 열 형식으로 보관
+    # → 순위표·경보 검색은 프로젝트를 열거나 판정하지 않고 이 파일들만 읽음
+    # 저장 시 DataManager.save_project 가 갱신. 저널 압축/스판 단위 저장처럼 우회한 경로는 저장소 버전과 비교해 refresh 에서 보정
+    # 기본이 아닌 판정 기준은 root/criteria/<기준 key> 아래 별도 색인 → 기준 버전별 재판정 결과를 캐시하고 바뀐 프로젝트만 다시 판정
+    ROOT = "smped_tunnel_portfolio"
+    ALERT_TYPES = BatchEvaluator.ALERT_MSGS # 코드 0, 1, 2
+    ALERT_KEYS = ("alert_crack", "alert_rebar", "alert_soil")
+
+    def __init__(self, root: str = ROOT, criteria: GradingCriteria = None):
+        self.criteria = criteria or GradingCriteria.default()
+        self.root = root if self.criteria is GradingCriteria.default() else os.path.join(root, "criteria", self.criteria.key)
+
+    def _summary_path(self) -> str: return os.path.join(self.root, "summary.json")
+    def _alerts_path(self, pid: str) -> str: return os.path.join(self.root, "alerts", f"{pid}.json")
+    def lock(self) -> WriteLock: return WriteLock.get(os.path.join(self.root, "locks", "summary.lock"))
+
+    def load(self) -> Dict[str, dict]:
+        try:
+            with open(self._summary_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {} # [안전장치] 깨졌으면 비워 두고 refresh 에서 다시 채움
+
+    @staticmethod
+    @profiled("PortfolioIndex.evaluate")
+    def evaluate(project: ProjectMetadata, criteria: GradingCriteria = None) -> tuple:
+        # (요약 항목, 경보 열) – 전체 스판을 한 번에 배열 판정
+        cols = SpanColumns.from_sections(project.sections)
+        entry = {"name": project.name, "inspector": project.inspector, "date_str": project.date_str, "version": project.version,
+                 "section_count": len(project.sections), "span_count": len(cols), "total_length": 0.0,
+                 "final_f": 0.0, "grade_counts": [0] * 5, "grade_length": [0.0] * 5, "alert_counts": [0] * len(PortfolioIndex.ALERT_TYPES),
+                 "photos": sorted({h for sec in project.sections for sp in sec.spans for h in sp.data.photos})} # 사진 정리 시 참조 확인용
+        alerts = {"sec_id": [], "span_no": [], "type": [], "f_value": []}
+        if not len(cols): return entry, alerts
+        r = BatchEvaluator.evaluate(cols, criteria)
+        total = float(cols.length.sum())
+        entry["total_length"] = total
+        entry["final_f"] = float((r['f_value'] * cols.length).sum() / total) if total > 0 else 0.0
+        entry["grade_counts"] = np.bincount(r['grade_code'], minlength=5).tolist()
+        entry["grade_length"] = np.bincount(r['grade_code'], weights=cols.length, minlength=5).tolist()
+        # 경보: 종류별 위치를 모아 (구간, 스판) 순으로 정렬
+        hits = [np.flatnonzero(r[k]) for k in PortfolioIndex.ALERT_KEYS]
+        entry["alert_counts"] = [len(h) for h in hits]
+        idx = np.concatenate(hits)
+        kind = np.repeat(np.arange(len(hits)), [len(h) for h in hits])
+        order = np.lexsort((kind, idx))
+        idx, kind = idx[order], kind[order]
+        alerts = {"sec_id": cols.sec_id[idx].tolist(), "span_no": cols.span_no[idx].tolist(),
+                  "type": kind.tolist(), "f_value": r['f_value'][idx].round(4).tolist()}
+        return entry, alerts
+
+    @profiled("PortfolioIndex.update")
+    def update(self, project: ProjectMetadata):
+        # 저장 직후 호출 (project.version = 저장된 버전)
+        entry, alerts = self.evaluate(project, self.criteria)
+        with self.lock():
+            JsonStore._write_json(self._alerts_path(project.id), alerts)
+            summary = self.load()
+            summary[project.id] = entry
+            JsonStore._write_json(self._summary_path(), summary)
+
+    def remove(self, pid: str):
+        with self.lock():
+            summary = self.load()
+            if summary.pop(pid, None) is not None: JsonStore._write_json(self._summary_path(), summary)
+            try:
+                os.remove(self._alerts_path(pid))
+            except FileNotFoundError:
+                pass
+
+    @profiled("PortfolioIndex.refresh")
+    def refresh(self, store) -> Dict[str, dict]:
+        # 저장소 인덱스의 버전과 다른 프로젝트(다른 경로로 저장됨/색인 이전 데이터/새 기준)만 다시 판정. 삭제된 프로젝트는 제거
+        # 일괄 재판정 시 summary.json 은 끝에 한 번만 씀
+        index = store.load_index()
+        summary = self.load()
+        stale = [pid for pid, e in index.items() if pid not in summary or summary[pid].get('version') != e.get('version', 0) or 'photos' not in summary[pid]]
+        gone = set(summary) - set(index)
+        if not stale and not gone: return summary
+        fresh = {}
+        for pid in stale:
+            p = store.load_project(pid)
+            if p is None: continue
+            entry, alerts = self.evaluate(p, self.criteria)
+            JsonStore._write_json(self._alerts_path(pid), alerts)
+            fresh[pid] = entry
+        with self.lock():
+            summary = self.load()
+            summary.update(fresh)
+            for pid in gone:
+                summary.pop(pid, None)
+                try:
+                    os.remove(self._alerts_path(pid))
+                except FileNotFoundError:
+                    pass
+            JsonStore._write_json(self._summary_path(), summary)
+            if not os.path.exists(os.path.join(self.root, "criteria.json")):
+                JsonStore._write_json(os.path.join(self.root, "criteria.json"), self.criteria.spec) # 어떤 기준의 결과인지 함께 보관
+        return summary
+
+    def alerts(self, pid: str) -> dict:
+        try:
+            with open(self._alerts_path(pid), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"sec_id": [], "span_no": [], "type": [], "f_value": []}
+
+    @staticmethod
+    def ranking(summary: Dict[str, dict], key: str = "final_f") -> List[tuple]:
+        # 위험도 순 (pid, 항목). key: final_f | bad_share (D/E 연장 비율) | alerts (경보 수)
+        def score(e):
+            if key == "bad_share": return sum(e['grade_length'][3:]) / e['total_length'] if e['total_length'] > 0 else 0.0
+            if key == "alerts": return sum(e['alert_counts'])
+            return e['final_f']
+        return sorted(summary.items(), key=lambda kv: -score(kv[1]))
+
+    def find_alerts(self, summary: Dict[str, dict], types: Optional[List[int]] = None, limit: int = None) -> List[dict]:
+        # 경보 종류로 전체 터널 검색. 요약의 건수로 해당 경보가 없는 프로젝트는 파일을 열지 않음
+        types = list(range(len(self.ALERT_TYPES))) if types is None else list(types)
+        rows = []
+        for pid, e in summary.items():
+            if not any(e['alert_counts'][t] for t in types): continue
+            a = self.alerts(pid)
+            kind = np.array(a['type'], dtype=np.int64)
+            for i in np.flatnonzero(np.isin(kind, types)).tolist():
+                rows.append({"pid": pid, "name": e['name'], "sec_id": a['sec_id'][i], "span_no": a['span_no'][i],
+                             "type": self.ALERT_TYPES[a['type'][i]], "f_value": a['f_value'][i]})
+                if limit is not None and len(rows) >= limit: return rows
+        return rows
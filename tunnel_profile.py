@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import logging
+import functools
+import threading
+from logging.handlers import RotatingFileHandler
+from typing import Optional
+
+LOG_FILE = os.environ.get("SMPED_PROFILE_LOG", "smped_profile.jsonl") # 빈 문자열이면 로그 파일 기록 안 함
+LOG_MAX_BYTES = 1_000_000
+LOG_BACKUPS = 3
+
+_local = threading.local() # Streamlit 세션마다 스크립트 스레드가 다르므로 실행 중인 기록은 스레드별로 보관 (데코레이터가 참조)
+_open = {}                 # 세션 → 아직 마감되지 않은 실행. st.stop()/st.rerun() 뒤 다음 rerun 은 새 스레드라 스레드별 보관으로는 찾을 수 없음
+_open_lock = threading.Lock()
+MAX_OPEN = 256             # 닫힌 브라우저 세션의 실행이 쌓이지 않도록 오래된 것부터 '중단됨'으로 마감
+_log = None
+
+class RunProfile:
+    # 한 번의 rerun(또는 CLI 실행) 동안의 구간별 시간 / 함수별 호출 수·시간 / 카운터
+    __slots__ = ("started", "meta", "phases", "calls", "counters", "_phase", "_phase_t", "_t0")
+
+    def __init__(self, **meta):
+        self.started = time.time()
+        self._t0 = time.perf_counter_ns()
+        self.meta = meta
+        self.phases = {}   # 이름 → ns (스크립트 단계, 순서 유지)
+        self.calls = {}    # 이름 → [호출 수, 누적 ns, 최대 ns]
+        self.counters = {} # 이름 → 값
+        self._phase, self._phase_t = None, 0
+
+    def add(self, name: str, ns: int):
+        c = self.calls.get(name)
+        if c is None: self.calls[name] = [1, ns, ns]
+        else:
+            c[0] += 1
+            c[1] += ns
+            if ns > c[2]: c[2] = ns
+
+    def mark(self, phase: Optional[str]):
+        # 이전 단계를 닫고 새 단계 시작 (None 이면 닫기만)
+        now = time.perf_counter_ns()
+        if self._phase is not None: self.phases[self._phase] = self.phases.get(self._phase, 0) + now - self._phase_t
+        self._phase, self._phase_t = phase, now
+
+    def to_dict(self, interrupted: bool = False) -> dict:
+        ms = lambda ns: round(ns / 1e6, 3)
+        return {
+            "ts": round(self.started, 3), **self.meta, "interrupted": interrupted,
+            "total_ms": ms(time.perf_counter_ns() - self._t0),
+            "phases": {k: ms(v) for k, v in self.phases.items()},
+            "calls": {k: [c[0], ms(c[1]), ms(c[2])] for k, c in sorted(self.calls.items(), key=lambda kv: -kv[1][1])},
+            "counters": dict(self.counters),
+        }
+
+def _logger() -> Optional[logging.Logger]:
+    global _log
+    if _log is None and LOG_FILE:
+        log = logging.getLogger("smped.profile")
+        if not log.handlers:
+            handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8')
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            log.addHandler(handler)
+            log.setLevel(logging.INFO)
+            log.propagate = False
+        _log = log
+    return _log
+
+def current() -> Optional[RunProfile]:
+    return getattr(_local, 'run', None)
+
+def begin_run(**meta) -> Optional[dict]:
+    # 새 실행 시작. 같은 세션(meta['session'], CLI 는 None)에서 st.rerun()/st.stop() 으로 끝나지 못한 이전 실행이 있으면 마감해서 반환
+    key, run = meta.get("session"), RunProfile(**meta)
+    with _open_lock:
+        prev = _open.pop(key, None)
+        _open[key] = run
+        evicted = [_open.pop(next(iter(_open))) for _ in range(len(_open) - MAX_OPEN)]
+    for old in evicted: _finish(old, True)
+    _local.run = run
+    return _finish(prev, True) if prev is not None else None
+
+def end_run(interrupted: bool = False) -> Optional[dict]:
+    run = current()
+    if run is None: return None
+    _local.run = None
+    with _open_lock:
+        if _open.get(run.meta.get("session")) is run: del _open[run.meta.get("session")]
+    return _finish(run, interrupted)
+
+def _finish(run: RunProfile, interrupted: bool) -> dict:
+    run.mark(None)
+    record = run.to_dict(interrupted)
+    log = _logger()
+    if log is not None:
+        try:
+            log.info(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        except Exception:
+            pass # [안전장치] 진단 로그 실패가 화면을 막지 않도록
+    return record
+
+def mark(phase: Optional[str]):
+    run = current()
+    if run is not None: run.mark(phase)
+
+def count(name: str, n: int = 1):
+    run = current()
+    if run is not None: run.counters[name] = run.counters.get(name, 0) + n
+
+def annotate(**meta):
+    run = current()
+    if run is not None: run.meta.update(meta)
+
+def profiled(name: str):
+    # 함수 시간 측정 데코레이터. 실행 기록이 없을 때는 속성 조회 한 번만 추가됨
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            run = getattr(_local, 'run', None)
+            if run is None: return fn(*args, **kwargs)
+            t = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                run.add(name, time.perf_counter_ns() - t)
+        return inner
+    return wrap
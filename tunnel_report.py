@@ -0,0 +1,199 @@
+import os
+import sys
+import glob
+import json
+import base64
+import threading
+import hashlib
+import argparse
+from html import escape
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from tunnel_master_logic import ProjectMetadata, TunnelSafetySystem, DataManager
+from tunnel_charts import build_heatmap_svg, GRADE_COLORS
+from tunnel_photos import PhotoStore
+from tunnel_profile import profiled
+
+REPORT_FORMAT = 1 # 보고서 양식을 바꾸면 올려서 기존 캐시를 무효화
+
+REPORT_CSS = """
+body { font-family: 'Malgun Gothic', 'Noto Sans KR', sans-serif; color: #000; margin: 24px; }
+h1 { text-align: center; text-decoration: underline; font-size: 22px; }
+h2 { font-size: 16px; border-bottom: 2px solid #002b5c; padding-bottom: 4px; margin-top: 28px; }
+table { width: 100%; border-collapse: collapse; font-size: 11px; }
+th, td { border: 1px solid #444; padding: 3px 5px; text-align: center; }
+th { background: #f0f0f0; }
+thead { display: table-header-group; }
+tr { page-break-inside: avoid; }
+.grade-box { border: 2px solid; padding: 16px; text-align: center; margin: 16px 0; border-radius: 6px; }
+.grade-box span { font-size: 28px; font-weight: 800; }
+.opinion { border: 1px solid #444; padding: 12px; white-space: pre-wrap; min-height: 60px; }
+.photos { display: flex; flex-wrap: wrap; gap: 8px; }
+.photos figure { margin: 0; width: 160px; font-size: 10px; text-align: center; }
+.photos img { width: 160px; height: 120px; object-fit: cover; border: 1px solid #999; }
+.legend span { display: inline-block; padding: 0 8px; margin-right: 4px; color: #fff; font-size: 11px; }
+@page { size: A4; margin: 15mm; }
+"""
+
+class ReportBuilder:
+    # 정밀안전진단 결과보고서를 단독 HTML(또는 PDF) 파일로 생성. 프로젝트 내용 해시를 파일 이름으로 써서
+    # 내용이 같으면 디스크의 파일을 그대로 재사용 (저장 토큰처럼 내용과 무관한 값은 해시에서 제외)
+    FORMATS = ("html", "pdf")
+
+    def __init__(self, root: str = None, photo_store: Optional[PhotoStore] = None):
+        self.root = root or DataManager.REPORT_DIR
+        self.photo_store = photo_store or PhotoStore(DataManager.PHOTO_DIR)
+
+    @staticmethod
+    @profiled("ReportBuilder.content_hash")
+    def content_hash(project: ProjectMetadata) -> str:
+        d = project.to_dict(compact=True)
+        for k in ("version", "structure_version", "journal_seq"): d.pop(k, None)
+        for sec in d['sections']: sec['span_columns'].pop('version', None)
+        raw = json.dumps([REPORT_FORMAT, d], ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+    def path(self, pid: str, digest: str, fmt: str) -> str:
+        return os.path.join(self.root, pid, f"{digest}.{fmt}")
+
+    def cached(self, project: ProjectMetadata, fmt: str = "html", digest: str = None) -> Optional[str]:
+        p = self.path(project.id, digest or self.content_hash(project), fmt)
+        return p if os.path.exists(p) else None
+
+    @profiled("ReportBuilder.build")
+    def build(self, project: ProjectMetadata, fmt: str = "html", summary: dict = None, digest: str = None) -> str:
+        # 생성된(또는 캐시된) 파일 경로 반환. PDF 는 weasyprint 가 없으면 ModuleNotFoundError
+        if fmt not in self.FORMATS: raise ValueError(f"지원하지 않는 형식: {fmt}")
+        digest = digest or self.content_hash(project)
+        out = self.path(project.id, digest, fmt)
+        if os.path.exists(out): return out
+        if summary is None: summary = TunnelSafetySystem().calculate_batch(project.sections)
+        html = self.render_html(project, summary)
+        data = self.html_to_pdf(html) if fmt == "pdf" else html.encode('utf-8')
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        tmp = f"{out}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, out)
+        # 같은 형식의 이전 내용 보고서는 다시 쓰일 일이 없으므로 정리
+        for old in glob.glob(os.path.join(self.root, project.id, f"*.{fmt}")):
+            if old != out: os.remove(old)
+        return out
+
+    @staticmethod
+    def html_to_pdf(html: str) -> bytes:
+        from weasyprint import HTML
+        return HTML(string=html).write_pdf()
+
+    def _img(self, digest: str) -> str:
+        # 썸네일을 data URI 로 포함 (썸네일이 없으면 원본)
+        data = self.photo_store.thumbnail(digest) or self.photo_store.load(digest)
+        return f"data:image/jpeg;base64,{base64.b64encode(data).decode('ascii')}" if data else ""
+
+    @profiled("ReportBuilder.render_html")
+    def render_html(self, project: ProjectMetadata, summary: Optional[dict]) -> str:
+        e = lambda v: escape(str(v))
+        no = iter(range(1, 10))
+        h2 = lambda title: f'<h2>{next(no)}. {title}</h2>'
+        parts = [f'<!DOCTYPE html><html lang="ko"><head><meta charset="utf-8"><title>{e(project.name)} 정밀안전진단 결과보고서</title>',
+                 f'<style>{REPORT_CSS}</style></head><body>', f'<h1>{e(project.name)} 정밀안전진단 결과보고서</h1>']
+        total_len = summary['total_length'] if summary else 0.0
+        parts.append(f"""<table>
+<tr><th width="20%">시설물명</th><td width="30%">{e(project.name)}</td><th width="20%">점검일자</th><td width="30%">{e(project.date_str)}</td></tr>
+<tr><th>점검자</th><td>{e(project.inspector)}</td><th>소속</th><td>{e(project.company)} ({e(project.position)})</td></tr>
+<tr><th>총 연장</th><td>{total_len:,.1f} m</td><th>구간 수</th><td>{len(project.sections)} 개</td></tr></table>""")
+        if not summary:
+            parts.append("<p>(평가할 스판이 없습니다)</p></body></html>")
+            return "".join(parts)
+
+        fg = summary['final_grade']
+        color = "#e74c3c" if fg[0] in "DE" else "#3498db"
+        parts.append(f'<div class="grade-box" style="border-color:{color}"><strong>종합 안전등급</strong><br>'
+                     f'<span style="color:{color}">{e(fg)}</span><br>(종합 결함지수 F = {summary["final_f"]:.4f})</div>')
+
+        parts.append(h2('터널 상태 분포도'))
+        parts.append(build_heatmap_svg(project.sections))
+        parts.append('<div class="legend">' + "".join(f'<span style="background:{c}">{g}</span>' for g, c in GRADE_COLORS.items()) + '</div>')
+
+        # 구간별 집계
+        parts.append(h2('구간별 평가') + '<table><thead><tr><th>구간</th><th>형식</th><th>연장(m)</th><th>스판 수</th>'
+                     + "".join(f"<th>{g}</th>" for g in "ABCDE") + '<th>구간 F</th><th>구간 등급</th></tr></thead><tbody>')
+        agg, grade_of = {}, TunnelSafetySystem().get_grade_str
+        for s in summary['span_results']:
+            a = agg.setdefault(s['sec_id'], [s['type'], 0.0, 0.0, [0] * 5])
+            a[1] += s['length']
+            a[2] += s['result']['f_value'] * s['length']
+            a[3]["ABCDE".find(s['result']['grade'][0])] += 1
+        for sec_id, (t, length, wf, counts) in agg.items():
+            f = wf / length if length > 0 else 0.0
+            parts.append(f"<tr><td>{sec_id}</td><td>{e(t)}</td><td>{length:,.1f}</td><td>{sum(counts):,}</td>"
+                         + "".join(f"<td>{c:,}</td>" for c in counts) + f"<td>{f:.4f}</td><td>{e(grade_of(f))}</td></tr>")
+        parts.append('</tbody></table>')
+
+        parts.append(h2('종합 의견 및 조치사항') + f'<div class="opinion">{e(project.opinion) or "(작성된 의견이 없습니다)"}</div>')
+
+        if summary['alerts']:
+            parts.append(h2(f'경보 ({len(summary["alerts"]):,}건)') + '<table><tbody>')
+            parts.extend(f"<tr><td style='text-align:left'>{e(a)}</td></tr>" for a in summary['alerts'])
+            parts.append('</tbody></table>')
+
+        parts.append(h2('스판별 세부 평가 내역') + '<table><thead><tr><th>구간</th><th>형식</th><th>Span</th><th>길이(m)</th><th>손상위치</th>'
+                     '<th>균열폭(mm)</th><th>누수</th><th>파손</th><th>재질열화</th><th>결함지수(F)</th><th>안전등급</th><th>경보</th></tr></thead><tbody>')
+        for s in summary['span_results']:
+            d, r = s['data'], s['result']
+            parts.append(f"<tr><td>{s['sec_id']}</td><td>{e(s['type'])}</td><td>{s['span_no']}</td><td>{s['length']:.2f}</td><td>{e(d.location)}</td>"
+                         f"<td>{d.crack_width:.2f}</td><td>{d.leakage_grade}</td><td>{d.breakage_grade}</td><td>{d.material.get_worst_grade()}</td>"
+                         f"<td>{r['f_value']:.4f}</td><td>{e(r['grade'])}</td><td>{e(' / '.join(r['alerts']))}</td></tr>")
+        parts.append('</tbody></table>')
+
+        photos = [(s, h) for s in summary['span_results'] for h in s['data'].photos]
+        if photos:
+            parts.append(h2(f'사진 기록 ({len(photos):,}장)') + '<div class="photos">')
+            for s, h in photos:
+                src = self._img(h)
+                if src: parts.append(f'<figure><img src="{src}"><figcaption>Sec {s["sec_id"]} - No.{s["span_no"]}</figcaption></figure>')
+            parts.append('</div>')
+        parts.append('</body></html>')
+        return "".join(parts)
+
+def _build_one(args) -> tuple:
+    # 작업 프로세스: 프로젝트를 직접 불러와 생성 (큰 프로젝트 객체를 프로세스 간에 넘기지 않음)
+    # 아직 압축되지 않은 자동 저장까지 반영해 화면과 같은 내용으로
+    pid, fmt, root = args
+    try:
+        project = DataManager.load_latest(pid)
+        if project is None: return pid, None, "프로젝트를 불러올 수 없습니다."
+        return pid, ReportBuilder(root).build(project, fmt), None
+    except Exception as e:
+        return pid, None, f"{type(e).__name__}: {e}"
+
+@profiled("build_reports")
+def build_reports(pids: List[str], fmt: str = "html", workers: int = None, root: str = None) -> Dict[str, tuple]:
+    # 여러 프로젝트 보고서를 프로세스 풀로 병렬 생성. 반환: pid → (경로, 오류 메시지)
+    # 작업 프로세스도 부모와 같은 저장소/저널/사진 위치를 보도록 DataManager 설정 복사
+    jobs = [(pid, fmt, root or DataManager.REPORT_DIR) for pid in pids]
+    if not jobs: return {}
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1: results = map(_build_one, jobs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=DataManager.configure, initargs=(DataManager.config(),)) as pool:
+            results = list(pool.map(_build_one, jobs))
+    return {pid: (path, err) for pid, path, err in results}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="SM-PED Tunnel 결과보고서 일괄 생성")
+    ap.add_argument("pids", nargs="*", help="프로젝트 id (생략하면 전체)")
+    ap.add_argument("--format", choices=ReportBuilder.FORMATS, default="html")
+    ap.add_argument("--workers", type=int, default=None, help="작업 프로세스 수 (기본: CPU 수)")
+    ap.add_argument("--root", default=DataManager.REPORT_DIR, help="보고서 저장 폴더")
+    args = ap.parse_args(argv)
+
+    pids = args.pids or list(DataManager.load_index())
+    failed = 0
+    for pid, (path, err) in build_reports(pids, args.format, args.workers, args.root).items():
+        print(f"{pid}\t{path or 'ERROR: ' + err}")
+        failed += err is not None
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import os
+import json
+import sqlite3
+from contextlib import closing
+from typing import Dict, List, Optional
+from tunnel_master_logic import (TunnelType, MaterialDefects, InspectionData, TunnelSpan, TunnelSection,
+                                 ProjectMetadata, TunnelSafetySystem, JsonStore, WriteLock, ProjectMerge)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY, name TEXT, inspector TEXT, position TEXT, company TEXT, date_str TEXT,
+    opinion TEXT, next_section_id INTEGER, section_count INTEGER, span_count INTEGER, journal_seq INTEGER DEFAULT 0,
+    version INTEGER DEFAULT 0, structure_version INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS sections (
+    project_id TEXT NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    sec_id INTEGER NOT NULL, seq INTEGER NOT NULL, type TEXT, total_length REAL, unit_length REAL,
+    PRIMARY KEY (project_id, sec_id)
+);
+CREATE TABLE IF NOT EXISTS spans (
+    project_id TEXT NOT NULL, sec_id INTEGER NOT NULL, seq INTEGER NOT NULL,
+    span_no INTEGER, length REAL,
+    location TEXT, crack_width REAL, leakage_grade TEXT, breakage_grade TEXT, soil_leak INTEGER,
+    spalling_grade TEXT, efflorescence_grade TEXT, rebar_grade TEXT, carbonation_grade TEXT,
+    sur_drain INTEGER, sur_ground INTEGER, sur_portal INTEGER, sur_util INTEGER, sur_special INTEGER,
+    aux_score REAL, photo_name TEXT, photos TEXT,
+    f_value REAL, grade TEXT, version INTEGER DEFAULT 0,
+    PRIMARY KEY (project_id, sec_id, seq),
+    FOREIGN KEY (project_id, sec_id) REFERENCES sections(project_id, sec_id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_spans_grade ON spans(grade);
+CREATE INDEX IF NOT EXISTS idx_spans_f_value ON spans(f_value);
+CREATE INDEX IF NOT EXISTS idx_spans_section ON spans(project_id, sec_id);
+"""
+
+SPAN_COLUMNS = ("project_id", "sec_id", "seq", "span_no", "length",
+                "location", "crack_width", "leakage_grade", "breakage_grade", "soil_leak",
+                "spalling_grade", "efflorescence_grade", "rebar_grade", "carbonation_grade",
+                "sur_drain", "sur_ground", "sur_portal", "sur_util", "sur_special",
+                "aux_score", "photo_name", "photos", "f_value", "grade", "version")
+SPAN_INSERT = f"INSERT INTO spans ({', '.join(SPAN_COLUMNS)}) VALUES ({', '.join('?' * len(SPAN_COLUMNS))})"
+SPAN_UPDATE = f"UPDATE spans SET {', '.join(c + ' = ?' for c in SPAN_COLUMNS[3:])} WHERE project_id = ? AND sec_id = ? AND seq = ?"
+
+class SQLiteStore:
+    # 프로젝트/구간/스판 테이블 기반 저장소. 저널 압축으로 바뀐 스판은 해당 행만 UPDATE 로 처리
+    def __init__(self, path: str, import_from: JsonStore = None):
+        self.path = path
+        self._system = TunnelSafetySystem()
+        with closing(self._connect()) as con, con:
+            con.executescript(SCHEMA)
+            # 구버전 DB 호환: 나중에 추가된 컬럼
+            for table, column in (("projects", "journal_seq INTEGER DEFAULT 0"), ("spans", "photos TEXT"), ("projects", "version INTEGER DEFAULT 0"),
+                                  ("projects", "structure_version INTEGER DEFAULT 0"), ("spans", "version INTEGER DEFAULT 0")):
+                try:
+                    con.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+                except sqlite3.OperationalError:
+                    pass
+            empty = con.execute("SELECT COUNT(*) FROM projects").fetchone()[0] == 0
+        # [안전장치] 비어 있는 새 DB 이면 기존 JSON 저장소(구버전 단일 파일 포함)의 데이터를 자동으로 가져옴
+        if empty and import_from is not None:
+            json_store = import_from
+            for pid in json_store.load_index():
+                p = json_store.load_project(pid)
+                if p is not None: self.save_project(p)
+
+    def lock(self, name: str) -> WriteLock:
+        # SQLite 자체 잠금은 트랜잭션 단위이므로, 읽기 → 병합 → 쓰기 전체를 프로젝트 잠금으로 묶음
+        return WriteLock.get(os.path.join(f"{self.path}.locks", f"{name}.lock"))
+
+    def stored_version(self, pid: str) -> Optional[int]:
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT version FROM projects WHERE id = ?", (pid,)).fetchone()
+        return (row[0] or 0) if row is not None else None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Streamlit 세션 스레드마다 별도 연결을 쓰도록 호출 단위로 연결
+        con = sqlite3.connect(self.path)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA foreign_keys=ON")
+        return con
+
+    def _span_values(self, pid: str, sec: TunnelSection, seq: int, span: TunnelSpan) -> tuple:
+        res = span.result_cache if not span.is_dirty(sec.type, self._system.criteria.key) else self._system.calculate_span(span, sec.type)
+        d, m = span.data, span.data.material
+        return (pid, sec.id, seq, span.span_no, span.length,
+                d.location, d.crack_width, d.leakage_grade, d.breakage_grade, int(d.soil_leak),
+                m.spalling_grade, m.efflorescence_grade, m.rebar_grade, m.carbonation_grade,
+                d.sur_drain, d.sur_ground, d.sur_portal, d.sur_util, d.sur_special,
+                d.aux_score, d.photo_name, json.dumps(d.photos), res['f_value'], res['grade'][0], span.version)
+
+    def load_index(self) -> Dict[str, dict]:
+        with closing(self._connect()) as con:
+            rows = con.execute("SELECT id, name, inspector, date_str, section_count, span_count, version FROM projects ORDER BY rowid").fetchall()
+        return {r[0]: {"name": r[1], "inspector": r[2], "date_str": r[3], "section_count": r[4], "span_count": r[5], "version": r[6] or 0} for r in rows}
+
+    def load_project(self, pid: str) -> Optional[ProjectMetadata]:
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT id, name, inspector, position, company, date_str, opinion, next_section_id, journal_seq, version, structure_version "
+                              "FROM projects WHERE id = ?", (pid,)).fetchone()
+            if row is None: return None
+            sec_rows = con.execute("SELECT sec_id, type, total_length, unit_length FROM sections WHERE project_id = ? ORDER BY seq", (pid,)).fetchall()
+            span_rows = con.execute(f"SELECT {', '.join(SPAN_COLUMNS[1:22])}, version FROM spans WHERE project_id = ? ORDER BY sec_id, seq", (pid,)).fetchall()
+        proj = ProjectMetadata(*row[:7], next_section_id=row[7], journal_seq=row[8] or 0, version=row[9] or 0, structure_version=row[10] or 0)
+        sections = {}
+        for sec_id, t_label, total_length, unit_length in sec_rows:
+            sec = TunnelSection(sec_id, TunnelType.from_label(t_label), total_length, unit_length)
+            sections[sec_id] = sec
+            proj.sections.append(sec)
+        for r in span_rows:
+            data = InspectionData(location=r[4], crack_width=r[5], leakage_grade=r[6], breakage_grade=r[7], soil_leak=bool(r[8]),
+                                  material=MaterialDefects(r[9], r[10], r[11], r[12]),
+                                  sur_drain=r[13], sur_ground=r[14], sur_portal=r[15], sur_util=r[16], sur_special=r[17],
+                                  aux_score=r[18], photo_name=r[19], photos=json.loads(r[20] or "[]"))
+            sections[r[0]].spans.append(TunnelSpan(r[2], r[3], data, version=r[21] or 0))
+        return proj
+
+    def save_project(self, project: ProjectMetadata) -> List[str]:
+        # 그 사이 다른 태블릿이 저장했으면 최신본과 병합한 뒤 기록. 반영되지 못한 변경(충돌) 목록 반환
+        with self.lock(project.id):
+            conflicts = ProjectMerge.rebase(self, project) or []
+            ProjectMerge.stamp(project)
+            self._write_project(project)
+        return conflicts
+
+    def _write_project(self, p: ProjectMetadata):
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM spans WHERE project_id = ?", (p.id,))
+            con.execute("DELETE FROM sections WHERE project_id = ?", (p.id,))
+            con.execute("INSERT OR REPLACE INTO projects (id, name, inspector, position, company, date_str, opinion, next_section_id, "
+                        "section_count, span_count, journal_seq, version, structure_version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (p.id, p.name, p.inspector, p.position, p.company, p.date_str, p.opinion, p.next_section_id,
+                         len(p.sections), sum(len(sec.spans) for sec in p.sections), p.journal_seq, p.version, p.structure_version))
+            con.executemany("INSERT INTO sections VALUES (?, ?, ?, ?, ?, ?)",
+                            [(p.id, sec.id, i, sec.type.label, sec.total_length, sec.unit_length) for i, sec in enumerate(p.sections)])
+            con.executemany(SPAN_INSERT, [self._span_values(p.id, sec, i, span) for sec in p.sections for i, span in enumerate(sec.spans)])
+
+    def save_spans(self, project: ProjectMetadata, spans: List[tuple]) -> List[str]:
+        # 저널 압축용: 잠금 안에서 불러와 저널을 적용한 프로젝트의 바뀐 스판 행과 프로젝트 행만 UPDATE (spans = [(구간, 순번, 스판)])
+        with self.lock(project.id):
+            # [안전장치] 불러온 뒤 다른 저장이 끼어들었거나 구성이 달라 행이 없으면 전체 병합 저장으로 대체
+            if self.stored_version(project.id) != project.version: return self.save_project(project)
+            ProjectMerge.stamp(project)
+            rows = {(sec.id, seq): self._span_values(project.id, sec, seq, span) for sec, seq, span in spans}
+            with closing(self._connect()) as con, con:
+                updated = sum(con.execute(SPAN_UPDATE, v[3:] + v[:3]).rowcount for v in rows.values())
+                con.execute("UPDATE projects SET opinion = ?, journal_seq = ?, version = ? WHERE id = ?",
+                            (project.opinion, project.journal_seq, project.version, project.id))
+            if updated != len(rows): self._write_project(project)
+        return []
+
+    def delete_project(self, pid: str):
+        with self.lock(pid), closing(self._connect()) as con, con:
+            con.execute("DELETE FROM projects WHERE id = ?", (pid,))
+
+    def save_all_projects(self, projects: Dict[str, ProjectMetadata]):
+        # 목록에 없는 프로젝트는 프로젝트 잠금을 잡고 하나씩 삭제
+        for p in projects.values(): self.save_project(p)
+        with closing(self._connect()) as con:
+            stale = [r[0] for r in con.execute("SELECT id FROM projects") if r[0] not in projects]
+        for pid in stale: self.delete_project(pid)
+
+    def query_spans(self, grades=None, min_crack: float = None, project_ids=None):
+        # 인덱스를 타는 SQL 질의로 조건에 맞는 행만 읽음 (프로젝트 전체를 메모리에 올리지 않음)
+        where, args = [], []
+        if grades is not None:
+            where.append(f"s.grade IN ({', '.join('?' * len(grades))})"); args.extend(grades)
+        if min_crack is not None:
+            where.append("s.crack_width > ?"); args.append(min_crack)
+        if project_ids is not None:
+            where.append(f"s.project_id IN ({', '.join('?' * len(project_ids))})"); args.extend(project_ids)
+        sql = ("SELECT s.project_id, p.name, s.sec_id, c.type, s.span_no, s.length, s.crack_width, s.grade, s.f_value "
+               "FROM spans s JOIN projects p ON p.id = s.project_id JOIN sections c ON c.project_id = s.project_id AND c.sec_id = s.sec_id")
+        if where: sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY s.project_id, c.seq, s.seq"
+        with closing(self._connect()) as con:
+            for r in con.execute(sql, args):
+                yield {"project_id": r[0], "project_name": r[1], "sec_id": r[2], "type": r[3], "span_no": r[4],
+                       "length": r[5], "crack_width": r[6], "grade": r[7], "f_value": r[8]}
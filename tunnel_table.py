@@ -0,0 +1,55 @@
+import numpy as np
+from typing import List, Optional
+from tunnel_profile import profiled
+
+class SpanResultTable:
+    # 보고서 결과표용 열 배열 + 미리 계산한 정렬 인덱스. 프로젝트 revision 당 한 번만 생성하고
+    # 이후 필터/정렬/페이지 이동은 배열 마스크와 슬라이스로만 처리 (전체 행을 다시 그리지 않음)
+    SORTS = {
+        "결함지수(F) 높은 순": "f_desc",
+        "결함지수(F) 낮은 순": "f_asc",
+        "안전등급 나쁜 순": "grade_desc",
+        "구간/스판 순서": "chainage",
+    }
+
+    @profiled("SpanResultTable.build")
+    def __init__(self, span_results: List[dict]):
+        self.rows = span_results
+        n = len(span_results)
+        self.sec_id = np.fromiter((s['sec_id'] for s in span_results), dtype=np.int64, count=n)
+        self.types = sorted({s['type'] for s in span_results})
+        type_code = {t: i for i, t in enumerate(self.types)}
+        self.type_code = np.fromiter((type_code[s['type']] for s in span_results), dtype=np.int8, count=n)
+        self.grade = np.fromiter(("ABCDE".find(s['result']['grade'][0]) for s in span_results), dtype=np.int8, count=n)
+        self.f_value = np.fromiter((s['result']['f_value'] for s in span_results), dtype=np.float64, count=n)
+        self.has_alert = np.fromiter((bool(s['result']['alerts']) for s in span_results), dtype=bool, count=n)
+        self.sections = sorted(set(self.sec_id.tolist()))
+        # 정렬 순서는 한 번만 계산 (stable 정렬이라 동률은 구간/스판 순서 유지)
+        self.orders = {
+            "chainage": np.arange(n),
+            "f_desc": np.argsort(-self.f_value, kind='stable'),
+            "f_asc": np.argsort(self.f_value, kind='stable'),
+            "grade_desc": np.lexsort((-self.f_value, -self.grade)),
+        }
+
+    def __len__(self): return len(self.rows)
+
+    def query(self, sort: str = "f_desc", sections: Optional[list] = None, types: Optional[list] = None,
+              grades: Optional[str] = None, alert_only: bool = False) -> np.ndarray:
+        # 조건에 맞는 행 번호를 정렬 순서대로 반환
+        mask = np.ones(len(self.rows), dtype=bool)
+        if sections: mask &= np.isin(self.sec_id, list(sections))
+        if types: mask &= np.isin(self.type_code, [self.types.index(t) for t in types if t in self.types])
+        if grades: mask &= np.isin(self.grade, ["ABCDE".find(g) for g in grades])
+        if alert_only: mask &= self.has_alert
+        order = self.orders[sort]
+        return order[mask[order]]
+
+    def page(self, index: np.ndarray, page: int, page_size: int) -> List[dict]:
+        # page 는 1부터. 해당 페이지의 행만 꺼냄
+        start = (page - 1) * page_size
+        return [self.rows[i] for i in index[start:start + page_size].tolist()]
+
+    @staticmethod
+    def page_count(total: int, page_size: int) -> int:
+        return max(1, -(-total // page_size))
@@ -0,0 +1,133 @@
+import os
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+import numpy as np
+from tunnel_master_logic import TunnelSection, SpanColumns, BatchEvaluator, GradingCriteria
+from tunnel_profile import profiled
+
+@dataclass(frozen=True)
+class Tolerance:
+    # 측정 허용오차. 균열폭/부대시설은 ± 균등분포, 등급은 ±단계 정수 균등분포 (a~e 범위로 자름)
+    crack_width: float = 0.1   # mm
+    material_steps: int = 1    # 박리/백태/철근노출/탄산화 각각 독립
+    leakage_steps: int = 0
+    breakage_steps: int = 0
+    aux_score: float = 0.0
+
+class UncertaintyEngine:
+    # 허용오차 안에서 입력값을 무작위로 흔들어 스판별/터널 종합 등급 확률을 구하는 몬테카를로 판정
+    # 입력값을 직접 흔드는 대신 항목별 '등급 코드'의 누적분포를 스판마다 먼저 구하고(균열폭 구간, 재질열화 최대값 등),
+    # 표본마다 균등난수 하나로 코드를 뽑음 → 칸(표본 × 스판)당 연산이 BatchEvaluator 를 그대로 돌리는 것보다 훨씬 적음
+    # 점수/가중치/등급 구간은 GradingCriteria 의 컴파일된 표를 그대로 사용 (허용오차 0 이면 일반 판정과 같은 결과)
+    CHUNK_CELLS = 4_000_000 # 한 번에 평가할 (표본 × 스판) 칸 수 상한
+
+    @staticmethod
+    def _uniform_cdf(x: np.ndarray, tol: float, limits: np.ndarray, strict: bool) -> np.ndarray:
+        # X ~ U(x - tol, x + tol) 일 때 P(X <= limit) (strict: P(X < limit)). limits: (m, k)
+        if tol <= 0: return ((x[:, None] < limits) if strict else (x[:, None] <= limits)).astype(np.float64)
+        return np.clip((limits - (x[:, None] - tol)) / (2 * tol), 0.0, 1.0)
+
+    @staticmethod
+    def _grade_cdf(codes: np.ndarray, steps: int) -> np.ndarray:
+        # P(코드 <= k), k = 0..4. 알 수 없는 등급(코드 5, -1)은 흔들지 않음 → 항상 5 (점수 0)
+        k = np.arange(5)
+        cdf = np.clip((k - codes[:, None] + steps + 1) / (2 * steps + 1), 0.0, 1.0)
+        cdf[:, 4] = 1.0 # e 를 넘는 값은 e 로 자름
+        cdf[(codes > 4) | (codes < 0)] = 0.0
+        return cdf
+
+    @staticmethod
+    def distributions(cols: SpanColumns, tol: Tolerance, criteria: GradingCriteria = None) -> dict:
+        # 스판별 항목 코드의 누적분포 (m, 5). 마지막 열까지 모두 0 이면 코드 5
+        c, ue = criteria or GradingCriteria.default(), UncertaintyEngine
+        one = np.ones((len(cols), 1))
+        crack = np.hstack([ue._uniform_cdf(cols.crack_width, tol.crack_width, c.crack_table[cols.type_code], False), one])
+        # 재질열화 = 네 항목 최대값. 코드 -1('a' 앞 문자)은 최대값에서 지므로 빼고, 네 항목 모두 -1 이면 점수 0 (코드 5)
+        mats = (cols.spalling, cols.efflorescence, cols.rebar, cols.carbonation)
+        material = np.prod([np.where((g < 0)[:, None], 1.0, ue._grade_cdf(g, tol.material_steps)) for g in mats], axis=0)
+        material[np.all([g < 0 for g in mats], axis=0)] = 0.0
+        aux = np.hstack([ue._uniform_cdf(cols.aux_score, tol.aux_score, np.broadcast_to(c.aux_band_table, (len(cols), 4)), True), one])
+        return {"crack": crack, "material": material, "leakage": ue._grade_cdf(cols.leakage, tol.leakage_steps),
+                "breakage": ue._grade_cdf(cols.breakage, tol.breakage_steps), "aux": aux}
+
+    @staticmethod
+    def _draw(cdf: np.ndarray, rng: np.random.Generator, samples: int) -> np.ndarray:
+        # 코드 = P(코드 <= k) <= u 인 k 의 개수 (u ~ U[0, 1)). 모든 스판이 확정값이면 난수 없이 그대로
+        fixed = (cdf == 0) | (cdf == 1)
+        if fixed.all(): return np.broadcast_to((cdf == 0).sum(axis=1).astype(np.uint8), (samples, len(cdf)))
+        u = rng.random((samples, len(cdf)), dtype=np.float32)
+        code = np.zeros(u.shape, dtype=np.uint8)
+        for k in range(cdf.shape[1]):
+            col = cdf[:, k].astype(np.float32)
+            if (col == 1).all(): continue
+            np.add(code, u >= col, out=code, casting='unsafe')
+        return code
+
+    @staticmethod
+    def _chunk(dist: dict, surround: np.ndarray, denom: np.ndarray, length: np.ndarray, samples: int, seed, criteria: GradingCriteria) -> tuple:
+        # 스판 묶음 하나: (스판별 등급 횟수 (m, 5), 표본별 F×길이 합 (samples,))
+        c = criteria
+        rng = np.random.default_rng(seed)
+        codes = [UncertaintyEngine._draw(dist[name], rng, samples) for name in ("crack", "material", "leakage", "breakage")]
+        aux = UncertaintyEngine._draw(dist["aux"], rng, samples)
+        m = len(length)
+        if c.affine is not None and all((dist[name][:, 4] == 1).all() for name in ("crack", "material", "leakage", "breakage")):
+            # 점수가 등간격이고 모든 코드가 a~e 이면 라이닝 점수 = 4 × 첫 점수 + 간격 × (코드 합)
+            # → 스판별 (코드 합 17 × 가중치 5) F/등급 표를 만들어 칸마다 한 번 조회
+            lining = 4.0 * c.affine[0] + c.affine[1] * np.arange(17)
+            table = ((lining[None, :, None] + surround[:, None, None]) / denom[:, None, None]) * c.aux_weight_table[None, None, :] # (m, 17, 5)
+            total = codes[0] + codes[1] + codes[2] + codes[3]
+            flat = (total.astype(np.int32) * 5 + aux) + (np.arange(m, dtype=np.int32) * 85)
+            f_value = table.ravel()[flat]
+            grade = np.searchsorted(c.f_band_table, table, side='right').astype(np.uint8).ravel()[flat]
+        else:
+            score = c.score_table
+            f_value = (score[codes[0]] + score[codes[1]] + score[codes[2]] + score[codes[3]] + surround) / denom * c.aux_weight_table[aux]
+            grade = np.zeros(f_value.shape, dtype=np.uint8)
+            for band in c.f_bands: np.add(grade, f_value >= band, out=grade, casting='unsafe')
+        counts = np.stack([(grade == k).sum(axis=0) for k in range(5)], axis=1)
+        return counts, f_value @ length
+
+    @staticmethod
+    @profiled("UncertaintyEngine.simulate")
+    def simulate(sections: List[TunnelSection], tol: Tolerance, samples: int = 1000, seed: int = 0, workers: int = 1,
+                 criteria: GradingCriteria = None) -> Optional[dict]:
+        # workers > 1 이면 스판 묶음을 프로세스 풀로 나눔. 묶음 크기는 samples/CHUNK_CELLS 로만 정하고 묶음별 난수열은 seed 에서 파생
+        # → workers 수(실행 PC 의 CPU 수)와 무관하게 같은 결과
+        cols = SpanColumns.from_sections(sections)
+        n = len(cols)
+        if n == 0: return None
+        criteria = criteria or GradingCriteria.default()
+        dist = UncertaintyEngine.distributions(cols, tol, criteria)
+        surround = cols.surround.astype(np.float64)
+        denom = criteria.denom_table[cols.type_code]
+        if n * samples <= UncertaintyEngine.CHUNK_CELLS: workers = 1 # 한 묶음이면 프로세스 기동 비용이 더 큼
+        step = max(1, UncertaintyEngine.CHUNK_CELLS // samples)
+        slices = [slice(i, min(i + step, n)) for i in range(0, n, step)]
+        seeds = np.random.SeedSequence(seed).spawn(len(slices))
+        jobs = [({k: v[s] for k, v in dist.items()}, surround[s], denom[s], cols.length[s], samples, sd, criteria) for s, sd in zip(slices, seeds)]
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                parts = list(pool.map(UncertaintyEngine._chunk, *zip(*jobs)))
+        else:
+            parts = [UncertaintyEngine._chunk(*job) for job in jobs]
+
+        counts = np.concatenate([p[0] for p in parts])
+        total_len = float(cols.length.sum())
+        final_f = sum(p[1] for p in parts) / total_len if total_len > 0 else np.zeros(samples)
+        nominal = BatchEvaluator.evaluate(cols, criteria)
+        prob = counts / samples
+        flip = 1.0 - prob[np.arange(n), nominal['grade_code']]
+        return {
+            "sec_id": cols.sec_id, "span_no": cols.span_no, "samples": samples,
+            "nominal_grade": nominal['grade_code'], "nominal_f": nominal['f_value'],
+            "grade_prob": prob,                   # (스판, 5)
+            "flip_prob": flip,                    # 공칭 등급과 다른 등급이 나올 확률
+            "final_f": final_f,                   # 표본별 종합 F
+            "final_grade_prob": np.bincount(np.searchsorted(criteria.f_band_table, final_f, side='right'), minlength=5) / samples,
+            "priority": np.argsort(-flip, kind='stable'), # 재측정 우선순위 (등급이 바뀔 확률 높은 순)
+        }
+
+def default_workers() -> int:
+    return max(1, min(8, os.cpu_count() or 1))
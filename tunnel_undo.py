@@ -0,0 +1,247 @@
+from dataclasses import dataclass, replace, field
+from typing import Iterable, List, Optional
+from tunnel_master_logic import ProjectMetadata, TunnelSection, TunnelSpan, InspectionData, MaterialDefects
+
+class PersistentVector:
+    # 불변 벡터 (32갈래 트라이, 노드 = 튜플). set 은 뿌리~잎 경로의 노드만 복사하고 나머지는 이전 벡터와 공유
+    # → 스판 하나를 바꾼 새 판은 O(log32 n) 개 노드만 새로 만들고, 두 판의 비교도 공유 노드를 건너뜀
+    BITS = 5
+    WIDTH = 1 << BITS
+    MASK = WIDTH - 1
+    __slots__ = ("size", "shift", "root")
+
+    def __init__(self, size: int, shift: int, root: tuple):
+        self.size, self.shift, self.root = size, shift, root
+
+    @staticmethod
+    def from_list(items: list) -> 'PersistentVector':
+        w, pv = PersistentVector.WIDTH, PersistentVector
+        nodes = [tuple(items[i:i + w]) for i in range(0, len(items), w)] or [()]
+        shift = 0
+        while len(nodes) > 1:
+            nodes = [tuple(nodes[i:i + w]) for i in range(0, len(nodes), w)]
+            shift += pv.BITS
+        return PersistentVector(len(items), shift, nodes[0])
+
+    def __len__(self): return self.size
+
+    def __getitem__(self, i: int):
+        if not 0 <= i < self.size: raise IndexError(i)
+        node = self.root
+        for level in range(self.shift, 0, -self.BITS): node = node[(i >> level) & self.MASK]
+        return node[i & self.MASK]
+
+    def __iter__(self):
+        def walk(node, level):
+            if level == 0: yield from node
+            else:
+                for child in node: yield from walk(child, level - self.BITS)
+        return walk(self.root, self.shift)
+
+    def set(self, i: int, value) -> 'PersistentVector':
+        if not 0 <= i < self.size: raise IndexError(i)
+        bits, mask = self.BITS, self.MASK
+        def assoc(node, level):
+            j = (i >> level) & mask
+            child = value if level == 0 else assoc(node[j], level - bits)
+            return node[:j] + (child,) + node[j + 1:]
+        return PersistentVector(self.size, self.shift, assoc(self.root, self.shift))
+
+    def diff(self, other: 'PersistentVector') -> List[int]:
+        # 값이 다른 위치 (길이가 같아야 함). 같은 객체인 노드는 내려가지 않음 → 비용은 바뀐 경로 수에 비례
+        if self.size != other.size: raise ValueError("길이가 다른 벡터는 비교할 수 없습니다.")
+        out, bits = [], self.BITS
+        def walk(a, b, level, base):
+            if a is b: return
+            if level == 0:
+                out.extend(base + j for j, (x, y) in enumerate(zip(a, b)) if x is not y and x != y)
+                return
+            for j, (x, y) in enumerate(zip(a, b)): walk(x, y, level - bits, base + (j << level))
+        walk(self.root, other.root, self.shift, 0)
+        return out
+
+@dataclass(frozen=True)
+class Snapshot:
+    # 프로젝트 편집 상태 한 판. sections 원소 = (구간 id, 형식, 총연장, 단위 길이, 스판 행 PersistentVector)
+    opinion: str
+    next_section_id: int
+    sections: PersistentVector
+
+@dataclass
+class HistoryStep:
+    # 되돌리기/다시 실행/복원 결과: 값이 바뀐 (구간, 스판)과 구간 구성·소견 변경 여부
+    label: str
+    spans: List[tuple] = field(default_factory=list)
+    structure: bool = False
+    opinion: bool = False
+
+class EditHistory:
+    # 열려 있는 프로젝트의 편집 이력 (메모리 전용, 디스크를 읽지 않음)
+    # 편집마다 스냅샷 한 판을 쌓되 바뀐 스판 행과 그 경로 노드만 새로 만들고 나머지는 이전 판과 공유
+    # base = 프로젝트를 연 시점/마지막 저장 시점. 스판·구간·전체를 이 시점 값으로 되돌릴 수 있음 (되돌리기도 이력에 남음)
+    MAX_STEPS = 200
+    HEADER = slice(0, 4)
+
+    def __init__(self, project: ProjectMetadata):
+        self.project = project
+        self.base = self.current = self.capture(project)
+        self.undo_stack: List[tuple] = [] # (라벨, 이전 스냅샷)
+        self.redo_stack: List[tuple] = []
+
+    @staticmethod
+    def _row(span: TunnelSpan) -> tuple:
+        # 스판 행 (version 은 동시 편집 토큰이라 제외). 사진 목록은 튜플로
+        d, m = span.data, span.data.material
+        return (span.span_no, span.length, d.location, d.crack_width, d.leakage_grade, d.breakage_grade, d.soil_leak,
+                m.spalling_grade, m.efflorescence_grade, m.rebar_grade, m.carbonation_grade,
+                d.sur_drain, d.sur_ground, d.sur_portal, d.sur_util, d.sur_special, d.aux_score, d.photo_name, tuple(d.photos))
+
+    @staticmethod
+    def _data(row: tuple) -> InspectionData:
+        (_, _, loc, cw, lg, bg, soil, sp, ef, rb, cb, sd, sg, spo, su, ss, aux, pn, ph) = row
+        return InspectionData(loc, cw, lg, bg, soil, MaterialDefects(sp, ef, rb, cb), sd, sg, spo, su, ss, aux, pn, list(ph))
+
+    @staticmethod
+    def _section(sec: TunnelSection, old: Optional[tuple] = None) -> tuple:
+        # 구간 항목. old 와 같은 스판 행/항목은 그대로 재사용
+        header = (sec.id, sec.type, sec.total_length, sec.unit_length)
+        rows = [EditHistory._row(sp) for sp in sec.spans]
+        if old is not None and len(old[4]) == len(rows):
+            spans = old[4]
+            for j, (a, b) in enumerate(zip(old[4], rows)):
+                if a != b: spans = spans.set(j, b)
+            if spans is old[4] and old[EditHistory.HEADER] == header: return old
+        else:
+            spans = PersistentVector.from_list(rows)
+        return header + (spans,)
+
+    @staticmethod
+    def capture(project: ProjectMetadata) -> Snapshot:
+        return Snapshot(project.opinion, project.next_section_id,
+                        PersistentVector.from_list([EditHistory._section(sec) for sec in project.sections]))
+
+    def _snapshot(self, check: Optional[Iterable[int]]) -> Snapshot:
+        # 현재 판에서 check 구간(None 이면 전체)과 새로 생긴 구간만 다시 읽은 새 판
+        p, old = self.project, self.current.sections
+        n_old, n = len(old), len(p.sections)
+        ks = set(range(n)) if check is None else {k for k in check if k < n}
+        entries = {k: self._section(p.sections[k], old[k] if k < n_old else None) for k in ks | set(range(n_old, n))}
+        if n == n_old:
+            sections = old
+            for k, e in entries.items():
+                if e is not old[k]: sections = sections.set(k, e)
+        else:
+            sections = PersistentVector.from_list([entries[k] if k in entries else old[k] for k in range(n)])
+        return Snapshot(p.opinion, p.next_section_id, sections)
+
+    def _push(self, label: str, snap: Snapshot) -> bool:
+        cur = self.current
+        if snap.sections is cur.sections and snap.opinion == cur.opinion and snap.next_section_id == cur.next_section_id: return False
+        self.undo_stack.append((label, cur))
+        if len(self.undo_stack) > self.MAX_STEPS: del self.undo_stack[0]
+        self.redo_stack.clear()
+        self.current = snap
+        return True
+
+    def record(self, label: str, sections: Optional[Iterable[int]] = None) -> bool:
+        # 편집 직후 호출. sections: 바뀐 구간 순번 (None = 전체 비교, [] = 소견 등 프로젝트 항목만)
+        return self._push(label, self._snapshot(sections))
+
+    def record_span(self, k: int, j: int, label: str = None) -> bool:
+        # 스판 하나 수정 (입력 화면). 바뀐 행과 경로 노드만 새로 만듦
+        sec = self.project.sections[k]
+        cur = self.current
+        if k >= len(cur.sections) or len(cur.sections[k][4]) != len(sec.spans): return self.record(label or "구간 수정", [k])
+        entry = cur.sections[k]
+        row = self._row(sec.spans[j])
+        if entry[4][j] == row: return False
+        sections = cur.sections.set(k, entry[:4] + (entry[4].set(j, row),))
+        return self._push(label or f"Sec {sec.id} No.{sec.spans[j].span_no} 수정", replace(cur, sections=sections))
+
+    def _apply(self, target: Snapshot, label: str) -> HistoryStep:
+        # 현재 판과 target 의 차이만 프로젝트 객체에 반영 (바뀌지 않은 구간/스판 객체는 그대로)
+        p, cur = self.project, self.current.sections
+        step = HistoryStep(label)
+        n_old, n = len(cur), len(target.sections)
+        changed = cur.diff(target.sections) if n_old == n else range(n)
+        del p.sections[n:]
+        step.structure = n != n_old
+        for k in changed:
+            new = target.sections[k]
+            old = cur[k] if k < n_old else None
+            if old is not None and old[self.HEADER] == new[self.HEADER] and len(old[4]) == len(new[4]):
+                sec = p.sections[k]
+                for j in old[4].diff(new[4]):
+                    sp, row = sec.spans[j], new[4][j]
+                    sp.span_no, sp.length, sp.data, sp.edited = row[0], row[1], self._data(row), True
+                    step.spans.append((sec, sp))
+                continue
+            # 구간 구성이 다르면 구간을 새로 만듦 (같은 자리 스판의 저장 토큰은 유지)
+            prev = p.sections[k].spans if k < len(p.sections) else []
+            spans = [TunnelSpan(row[0], row[1], self._data(row), version=prev[j].version if j < len(prev) else 0, edited=True)
+                     for j, row in enumerate(new[4])]
+            sec = TunnelSection(new[0], new[1], new[2], new[3], spans)
+            if k < len(p.sections): p.sections[k] = sec
+            else: p.sections.append(sec)
+            step.structure = True
+        step.opinion = p.opinion != target.opinion
+        p.opinion, p.next_section_id = target.opinion, target.next_section_id
+        if step.structure or step.spans or step.opinion:
+            p.touch(*(["structure"] if step.structure else []), *(["opinion"] if step.opinion else []))
+        self.current = target
+        return step
+
+    def undo(self) -> Optional[HistoryStep]:
+        if not self.undo_stack: return None
+        label, snap = self.undo_stack.pop()
+        self.redo_stack.append((label, self.current))
+        return self._apply(snap, label)
+
+    def redo(self) -> Optional[HistoryStep]:
+        if not self.redo_stack: return None
+        label, snap = self.redo_stack.pop()
+        self.undo_stack.append((label, self.current))
+        return self._apply(snap, label)
+
+    def _goto(self, label: str, snap: Snapshot) -> Optional[HistoryStep]:
+        # 되돌리기 가능한 편집으로 snap 상태로 이동
+        before = self.current
+        if not self._push(label, snap): return None
+        self.current = before
+        return self._apply(snap, label)
+
+    def _base_section(self, k: int) -> Optional[tuple]:
+        # 기준 시점의 같은 구간 (같은 자리에 같은 id 가 없으면 id 로 찾음)
+        sec_id, base = self.project.sections[k].id, self.base.sections
+        if k < len(base) and base[k][0] == sec_id: return base[k]
+        return next((e for e in base if e[0] == sec_id), None)
+
+    def revert_span(self, k: int, j: int) -> Optional[HistoryStep]:
+        # 스판 하나를 기준 시점 값으로. 기준 시점에 없던 스판이면 None
+        sec = self.project.sections[k]
+        base, cur = self._base_section(k), self.current
+        if base is None or j >= len(base[4]) or len(cur.sections[k][4]) != len(sec.spans): return None
+        entry = cur.sections[k]
+        if entry[4][j] == base[4][j]: return None # 값 비교: 고쳤다가 원래 값으로 되돌린 스판도 빈 단계로 남기지 않음
+        sections = cur.sections.set(k, entry[:4] + (entry[4].set(j, base[4][j]),))
+        return self._goto(f"Sec {sec.id} No.{sec.spans[j].span_no} 되돌리기", replace(cur, sections=sections))
+
+    def revert_section(self, k: int) -> Optional[HistoryStep]:
+        # 구간 전체(구성 포함)를 기준 시점 값으로. 기준 시점 이후 생긴 구간이면 None
+        base, cur = self._base_section(k), self.current
+        if base is None: return None
+        entry = cur.sections[k]
+        if base is entry or (base[EditHistory.HEADER] == entry[EditHistory.HEADER] and len(base[4]) == len(entry[4]) and not base[4].diff(entry[4])): return None
+        return self._goto(f"Sec {base[0]} 되돌리기", replace(cur, sections=cur.sections.set(k, base)))
+
+    def revert_all(self) -> Optional[HistoryStep]:
+        return self._goto("저장 시점으로 되돌리기", self.base)
+
+    def mark_saved(self):
+        # 저장 직후: 현재 판을 새 기준 시점으로 (이력은 유지). 이력 없이 바뀐 프로젝트 항목(회차 마감 후 소견 등)도 함께 맞춤
+        snap = self._snapshot([])
+        self.base = self.current = snap
+
+    def labels(self) -> tuple:
+        # (되돌릴 편집 라벨, 다시 실행할 편집 라벨)
+        return (self.undo_stack[-1][0] if self.undo_stack else None, self.redo_stack[-1][0] if self.redo_stack else None)